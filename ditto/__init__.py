@@ -1,2 +1,2 @@
-
 from .ditto import Ditto
+from .streaming import StreamingDitto, WindowedDitto
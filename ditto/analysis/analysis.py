@@ -3,33 +3,35 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 
-def show_cover(C, CT, id_pattern=0, letters=False):
+def show_cover(cover, CT, id_pattern=0, letters=False):
     """
     Colorify the cover for visual interpretation of the patterns.
     """
 
-    _, ax = plt.subplots(figsize=(15, 0.5*C.shape[0]))
+    n_row, n_col = cover.size
 
-    n_row = C.shape[0]
-    n_col = C.shape[1]
+    _, ax = plt.subplots(figsize=(15, 0.5*n_row))
 
     # To plot the legend
     i_label = True
 
-    # CT target pattern id from sorted id
-    target_pattern_id = CT.i_sort[id_pattern]
+    # Cells of the CT target pattern from sorted id
+    occurrences = cover.occurrences(CT[CT.i_sort[id_pattern]])
+    target = np.zeros(cover.size, dtype=bool)
+    target[occurrences.rows, occurrences.cols] = True
 
     # Left to right, top to bottom
-    for i_row, rows in enumerate(C):
+    for i_row, rows in enumerate(target):
         for i_col, c in enumerate(rows):
 
             if letters:
                 # Plot text
-                ax.text(x=(i_col+0.5)/n_col, y=1-(i_row+0.5)/n_row, s=c[-1],
+                ax.text(x=(i_col+0.5)/n_col, y=1-(i_row+0.5)/n_row,
+                        s=CT.vocabulary.values[cover.D[i_row, i_col]],
                         ha='center', va='center', transform=ax.transAxes)
 
             # Color interesting pattern
-            if int(c.split('_')[0]) == target_pattern_id:
+            if c:
                 ax.axhspan(-i_row/n_row, (-i_row-1)/n_row, i_col/n_col, (i_col+1)/n_col,
                            facecolor='royalblue', alpha=0.8,
                            edgecolor='silver', label=CT[CT.i_sort[id_pattern]] if i_label == True else '',
@@ -10,12 +10,12 @@ class CT:
 
     def __init__(self, ST):
 
+        # Vocabulary of the database
+        self.vocabulary = ST.vocabulary
+
         # Patterns
         self.patterns = ST.patterns.copy()
 
-        # Usage
-        self.usage = ST.usage
-
         # Handy variable so that we do not re-compute cover the data
         # again if the CT did not change
         self.has_changed = True
@@ -23,6 +23,9 @@ class CT:
         # Pattern id, useful when adding new candidates to the CT
         self.pattern_id = len(self.patterns)
 
+        # Usage, gaps and fills of the singletons
+        self.update()
+
     def sort_cover_order(self):
         """
         Sort the candidates in the CT in Cover Order.
@@ -36,28 +39,59 @@ class CT:
         to using the indexes of the pattern in the original unsorted CT.
         """
 
-        # Creates a numpy array of tuples (-len(pattern), pattern)
-        temp = np.array([(-len(p), p) for p in self.patterns],
-                        dtype=np.dtype([('len', int),
-                                        ('pattern', np.unicode_, 32)]))
+        # Pad the symbols of the patterns to the same length
+        lengths = np.array([len(p) for p in self.patterns])
+        symbols = np.full((len(self.patterns), np.max(lengths)), -1,
+                          dtype=np.int32)
+        for i, p in enumerate(self.patterns):
+            symbols[i, :len(p)] = p.symbols
 
-        # Sorts the previous array by descending length first and
-        # then lexicographically
-        self.i_sort = np.argsort(temp, kind='stable', order=('len', 'pattern'))
+        # Sorts by descending length first and then lexicographically
+        # on the symbol codes (np.lexsort uses the last key first)
+        self.i_sort = np.lexsort(
+            tuple(symbols[:, ::-1].T) + (-lengths,)
+        )
 
         return
 
-    def update(self):
+    def update(self, stats=None):
         """
         Update pattern usage after the covering step.
+
+        stats is an optional dictionary pattern: (usage, gaps, fills)
+        that takes precedence over the values stored in the patterns,
+        see CTView.
         """
 
-        self.usage = np.array([pattern.usage for pattern in self.patterns])
-        self.gaps = np.array([pattern.gaps for pattern in self.patterns])
-        self.fills = np.array([pattern.fills for pattern in self.patterns])
+        self.usage, self.gaps, self.fills = self._values(stats or {})
 
         return
 
+    def _values(self, stats):
+        """
+        Arrays of the usage, gaps and fills of the patterns.
+        """
+
+        values = np.array([stats.get(pattern) or
+                           (pattern.usage, pattern.gaps, pattern.fills)
+                           for pattern in self.patterns])
+
+        return values[:, 0], values[:, 1], values[:, 2]
+
+    def with_candidate(self, candidate):
+        """
+        Copy-on-write view of the CT with a new candidate.
+        """
+
+        return CTView(self, added=candidate)
+
+    def without_pattern(self, pattern):
+        """
+        Copy-on-write view of the CT without one of its patterns.
+        """
+
+        return CTView(self, removed=pattern)
+
     def add_candidate(self, candidate):
         """
         Add a new candidate to the CT.
@@ -94,3 +128,66 @@ class CT:
 
     def __getitem__(self, item):
         return self.patterns[item]
+
+
+class CTView(CT):
+    """
+    Copy-on-write view of a CT with one pattern added or removed.
+
+    The view shares the patterns of the CT and does not renumber them,
+    so that trying a change never modifies the CT nor the ids written
+    in the cover. The usage, gaps and fills of the trial cover are
+    held by the view, the patterns themselves are only updated if the
+    change is committed to the CT.
+    """
+
+    def __init__(self, CT, added=None, removed=None):
+
+        # CT the view is based on
+        self.base = CT
+        self.vocabulary = CT.vocabulary
+        self.has_changed = CT.has_changed
+
+        # Patterns
+        self.patterns = [pattern for pattern in CT.patterns
+                         if pattern is not removed]
+        self.pattern_id = CT.pattern_id
+
+        # The new candidate gets the id it will have once committed
+        if added is not None:
+            added.id = CT.pattern_id
+            self.patterns.append(added)
+            self.pattern_id += 1
+
+        self.added = added
+        self.removed = removed
+
+    def update(self, stats=None):
+        """
+        Store the usage, gaps and fills of the trial cover.
+
+        The MDL computations only need the values that changed, so the
+        arrays are only built if they are accessed.
+        """
+
+        self.stats = stats or {}
+        self._arrays = None
+
+        return
+
+    @property
+    def usage(self):
+        return self._get_arrays()[0]
+
+    @property
+    def gaps(self):
+        return self._get_arrays()[1]
+
+    @property
+    def fills(self):
+        return self._get_arrays()[2]
+
+    def _get_arrays(self):
+        if self._arrays is None:
+            self._arrays = self._values(self.stats)
+        return self._arrays
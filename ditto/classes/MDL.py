@@ -1,4 +1,6 @@
 
+from .CT import CTView
+
 import numpy as np
 
 
@@ -17,61 +19,106 @@ class MDL:
         # Boolean that determines if the candidate is beneficial
         self.is_beneficial = False
 
+        # Encoded lengths of the CT in use
+        self.lengths = Lengths(ST)
+
     def compare(self, CT, candidate):
         """
         Compare the total encoded length with the new candidate
         compared to a previously computed length.
 
-        If the CT has changed, first cover the data and compute
-        the total encoded length for the new CT.
+        If the CT has changed, first compute the total encoded 
+        length for the new CT. The cover is kept in sync with the
+        CT, so it only has to be computed if it was used for 
+        another CT in the meantime.
 
         Then, cover the data and compute the new encoded length
-        for the CT with the new candidate.
+        for a copy-on-write view of the CT with the new candidate.
 
         If this new candidate leads to a gain in compression, it
-        remains in the CT. Otherwise, it is removed from the CT.
+        is added to the CT. Otherwise, the view and its cover are
+        discarded and the CT is left untouched.
+        """
+
+        # Encoded length of the CT
+        self.update_base(CT)
+
+        # View of the CT with the new candidate
+        trial = CT.with_candidate(candidate)
+
+        # Check if this change leads to a gain in compression
+        if self.evaluate(trial):
+            self.is_beneficial = True
+            CT.add_candidate(candidate)
+            self.cover.commit(CT)
+            self.lengths.commit()
+            CT.has_changed = True
+
+        else:
+            self.is_beneficial = False
+            self.cover.rollback()
+
+        return
+
+    def update_base(self, CT):
+        """
+        Compute the total encoded length of the CT if it has changed.
+
+        The cover is kept in sync with the CT, so it only has to be 
+        computed if it was used for another CT in the meantime.
         """
 
         if CT.has_changed:
 
-            # Cover the data
-            self.base_C = self.cover.cover(CT)
+            # Cover the data and compute total encoded length
+            if self.cover.CT is not CT:
+                self.cover.cover(CT)
+                self.lengths.reset(CT)
 
-            # Compute total encoded length
-            self.base_L_D, self.base_L_CT = self._compute(
-                self.ST, CT, self.base_C
-            )
+            self.base_L_D, self.base_L_CT = self.lengths.L_D, self.lengths.L_CT
+            if not self.cover.is_complete():
+                self.base_L_D, self.base_L_CT = np.inf, np.inf
             self.base_length = self.base_L_D + self.base_L_CT
 
             # Store base pattern usage
             self.base_usage = CT.usage
 
-        # Add the new candidate to the CT
-        CT.add_candidate(candidate)
+            # The base is valid until a change is committed to the CT
+            CT.has_changed = False
+
+        return
+
+    def required_gain(self, CT):
+        """
+        Decrease of the total encoded length of the CT needed for a 
+        change to be accepted, see evaluate().
+        """
+
+        self.update_base(CT)
+
+        return 0.01*self.base_length
+
+    def evaluate(self, trial):
+        """
+        Cover the data with a view of the CT and check whether it 
+        leads to a gain in compression compared to the base length.
+
+        The trial cover is left pending: it must be followed by a
+        commit() or a rollback() of the cover.
+        """
 
-        # Cover the data
-        self.C = self.cover.cover(CT)
+        # Cover the data, only the patterns after the change in
+        # Cover Order are affected
+        self.cover.update(trial)
 
         # Compute total encoded length
-        self.L_D, self.L_CT = self._compute(
-            self.ST, CT, self.C
-        )
+        self.L_D, self.L_CT = self._compute(trial, self.cover)
         self.length = self.L_D + self.L_CT
 
         # print('\tBase length =', self.base_length)
         # print('\tNew length =', self.length)
 
-        # Check if this new candidate leads to a gain in compression
-        if 0.99*self.base_length > self.length:
-            self.is_beneficial = True
-            CT.has_changed = True
-
-        else:
-            self.is_beneficial = False
-            CT.remove_candidate(candidate)
-            CT.has_changed = False
-
-        return
+        return 0.99*self.base_length > self.length
 
     def prune(self, CT, candidate, usage, sort_indexes):
         """
@@ -81,147 +128,187 @@ class MDL:
         The idea is to select the patterns which had their usage 
         decrease after addition of the new pattern to the CT.
 
-        Then, we cover the data with a CT pruned of this pattern 
-        and compare the encoded length with the length when this 
-        pattern was present in the CT.
+        Then, we cover the data with a copy-on-write view of the CT 
+        pruned of this pattern and compare the encoded length with 
+        the length when this pattern was present in the CT.
 
         If removing that pattern leads to a gain in compression, it
         is definitely removed from the CT. Otherwise, it is kept.
         """
 
-        if CT.has_changed:
-
-            # Cover the data
-            self.base_C = self.cover.cover(CT)
-
-            # Compute total encoded length
-            self.base_L_D, self.base_L_CT = self._compute(
-                self.ST, CT, self.base_C
-            )
-            self.base_length = self.base_L_D + self.base_L_CT
-
-            # Store base pattern usage
-            self.base_usage = CT.usage
-
-        # Remove this candidate from the CT
-        CT.remove_candidate(candidate)
+        # Encoded length of the CT
+        self.update_base(CT)
 
-        # Cover the data
-        self.C = self.cover.cover(CT)
+        # View of the CT without this candidate
+        trial = CT.without_pattern(candidate)
 
-        # Compute total encoded length
-        self.L_D, self.L_CT = self._compute(
-            self.ST, CT, self.C
-        )
-        self.length = self.L_D + self.L_CT
-
-        # print('\tBase length =', self.base_length)
-        # print('\tNew length =', self.length)
-
-        # Check if this new candidate leads to a gain in compression
-        if 0.99*self.base_length > self.length:
+        # Check if this change leads to a gain in compression
+        if self.evaluate(trial):
+            self.is_beneficial = True
 
             print(f'Pattern {candidate} will be removed from the CT')
-            CT.has_changed = True
 
             # Modify sort_indexes to take into considerations the changes in CT
             usage = usage[np.arange(len(usage)) != candidate.id]
             sort_indexes[sort_indexes > candidate.id] -= 1
 
+            CT.remove_candidate(candidate)
+            self.cover.commit(CT)
+            self.lengths.commit()
+            CT.has_changed = True
+
         else:
-            CT.add_candidate(candidate)
-            CT.has_changed = False
+            self.is_beneficial = False
+            self.cover.rollback()
 
         return usage, sort_indexes
 
-    @staticmethod
-    def _compute(ST, CT, C):
+    def _compute(self, CT, cover):
         """
-        Compute total encoded length.
+        Compute total encoded length of a CT, or of a CTView from the
+        changes of its trial cover.
         """
 
-        if "" in C:
+        if not cover.is_complete():
             return np.inf, np.inf
 
-        return MDL._L_D_CT(CT), MDL._L_CT_C(ST, CT)
+        if isinstance(CT, CTView):
+            return self.lengths.trial(CT)
 
-    @staticmethod
-    def _L_D_CT(CT):
+        self.lengths.reset(CT)
+
+        return self.lengths.L_D, self.lengths.L_CT
+
+
+class Lengths:
+    """
+    Running sums of the encoded lengths L(D|CT) and L(CT|D) of the CT 
+    in use.
+
+    Writing u, g and f the usage, gaps and fills of the patterns and 
+    S = sum(u), both lengths only depend on a few sums over the patterns:
+        L(D|CT) = S*log(S) - sum(u*log(u)) + sum(-g*log(g/(g+f)))
+        L(CT|D) = K*log(S) - sum(log(u)) + sum(cost)
+    where K is the number of patterns used in the cover and cost is the 
+    code length of a used pattern with the singleton-only code table ST.
+    The sums only run over the used patterns, and over the patterns with 
+    gaps for the gap stream.
+
+    The length of a trial CT is thus computed from the patterns which 
+    usage, gaps or fills changed in the trial cover only.
+    """
+
+    def __init__(self, ST):
+
+        # Code length of each symbol in the ST. Symbols evicted from a 
+        # window have no usage left and an infinite code length, but they 
+        # are in no pattern used
+        with np.errstate(divide='ignore'):
+            self.symbol_cost = -np.log10(ST.usage/ST.usage_sum)
+
+        # Sums of the last trial, applied by commit()
+        self.pending = None
+
+    def reset(self, CT):
+        """
+        Compute the sums from scratch for a CT.
         """
-        Computes the encoded length of the data using the code 
-        table CT.
 
-        This encoded length is the sum of the encoded length of 
-        the pattern stream and the gap stream.
+        costs = np.array([self.cost(pattern) for pattern in CT.patterns])
+        self.sums = self._sums(CT.usage, CT.gaps, CT.fills, costs)
+        self.L_D, self.L_CT = self._lengths(self.sums)
 
-        Both terms are computed similarly, using Shannon's entropy.
+        return
+
+    def trial(self, view):
         """
+        Encoded lengths of a CTView. 
 
-        ########################################
-        # Encoded length of the pattern stream #
-        ########################################
-        L_code = np.sum(
-            CT.usage*(-np.log10(CT.usage/np.sum(CT.usage),
-                                where=CT.usage != 0))
-        )
+        Only the patterns with new values in the trial cover, and the
+        pattern removed from the CT, contribute to the difference with
+        the current sums.
+        """
 
-        ####################################
-        # Encoded length of the gap stream #
-        ####################################
-        # We should only compute the length of gaps and fills for
-        # patterns of size > 1
-        nonzero_indexes = np.nonzero(CT.gaps)
+        changed = list(view.stats)
+        if (view.removed is not None) and (view.removed not in view.stats):
+            changed.append(view.removed)
 
-        # If no gaps, return
-        if nonzero_indexes[0].size == 0:
-            return 0
+        # Previous and new (usage, gaps, fills) of the changed patterns
+        old = np.array([(0, 0, 0) if pattern is view.added else
+                        (pattern.usage, pattern.gaps, pattern.fills)
+                        for pattern in changed]).reshape(-1, 3)
+        new = np.array([view.stats.get(pattern, (0, 0, 0))
+                        for pattern in changed]).reshape(-1, 3)
+        costs = np.array([self.cost(pattern) for pattern in changed])
 
-        nz_gaps = CT.gaps[nonzero_indexes]
-        nz_fills = CT.fills[nonzero_indexes]
+        self.pending = self.sums \
+            - self._sums(old[:, 0], old[:, 1], old[:, 2], costs) \
+            + self._sums(new[:, 0], new[:, 1], new[:, 2], costs)
 
-        # Weird but sometimes the gap value is < 0 which causes
-        # issues with the log!
-        nz_gaps = np.where(nz_gaps > 0, nz_gaps, 0)
+        return self._lengths(self.pending)
 
-        # Careful with log(0)!
-        L_gap = np.sum(nz_gaps*(-np.log10(nz_gaps/(nz_gaps+nz_fills),
-                                          where=nz_gaps > 0)))
+    def commit(self):
+        """
+        Keep the sums of the last trial.
+        """
 
-        # print('\n\t\t ** L(D|CT) **')
-        # print(f'\tPattern length = {L_code}')
-        # print(f'\tGap length = {L_gap}')
+        self.sums = self.pending
+        self.L_D, self.L_CT = self._lengths(self.sums)
 
-        return L_code + L_gap
+        return
+
+    def cost(self, pattern):
+        """
+        Code length of a pattern with the ST. It is not cached: a trial
+        only needs it for the few patterns that changed, and most trial 
+        candidates are rejected.
+        """
+
+        return np.sum(self.symbol_cost[pattern.symbols])
 
     @staticmethod
-    def _L_CT_C(ST, CT):
+    def _sums(usage, gaps, fills, costs):
         """
-        Computes the encoded length of the CT. Encodes:
-            - The pattern codes
-            - The patterns themselves using the codes associated with the 
-            singleton-only code table ST
+        Sums over the patterns needed to compute the encoded lengths:
+        S, sum(u*log(u)), K, sum(log(u)), sum(cost) and the gap term.
         """
 
-        #######################
-        # Pattern code length #
-        #######################
-        L_code = np.sum((-np.log10(CT.usage/np.sum(CT.usage),
-                                   where=CT.usage != 0)))
+        used = usage > 0
+        log_usage = np.log10(usage, out=np.zeros(len(usage)), where=used)
+
+        # Weird but sometimes the gap value is < 0 which causes
+        # issues with the log!
+        gaps = np.where(gaps > 0, gaps, 0)
+        L_gap = -gaps*np.log10(gaps/np.maximum(gaps+fills, 1),
+                               out=np.zeros(len(gaps)), where=gaps > 0)
+
+        return np.array([
+            np.sum(usage),
+            np.sum(usage*log_usage),
+            np.sum(used),
+            np.sum(log_usage),
+            np.sum(costs, where=used),
+            np.sum(L_gap),
+        ], dtype=float)
 
-        ##################
-        # Pattern length #
-        ##################
-        L_pattern = 0
-        for pattern in CT.patterns:
+    @staticmethod
+    def _lengths(sums):
+        """
+        Encoded lengths L(D|CT) and L(CT|D) from the sums.
+
+        L(D|CT) is the sum of the encoded length of the pattern stream 
+        and the gap stream, both computed using Shannon's entropy.
+
+        L(CT|D) encodes the pattern codes and the patterns themselves 
+        using the codes associated with the singleton-only code table ST.
+        """
 
-            # If the pattern is used in the cover
-            if pattern.usage != 0:
+        S, u_log_u, K, log_u, L_pattern, L_gap = sums
 
-                for symbol in pattern.symbols:
-                    L_pattern += -np.log10(ST.usage_dict[symbol]/ST.usage_sum)
+        # Encoded length of the pattern stream
+        L_code = S*np.log10(S) - u_log_u
 
-        # print('\n\t\t ** L(CT|C) **')
-        # print(f'\tPattern code length = {L_code}')
-        # print(f'\tPattern length = {L_pattern}')
+        # Pattern code length
+        L_pattern_code = K*np.log10(S) - log_u
 
-        return L_code + L_pattern
+        return L_code + L_gap, L_pattern_code + L_pattern
@@ -1,4 +1,3 @@
-
 from .pattern import Pattern
 
 import numpy as np
@@ -7,22 +6,33 @@ import numpy as np
 class ST():
     """
     Singleton code table (ST) generated from D.
+
+    The id of each singleton is the code of its symbol in the
+    vocabulary.
     """
 
-    def __init__(self, D, cover):
+    def __init__(self, vocabulary, cover, usage=None):
+        """
+        usage = usage of the singletons in the cover of the database by
+        the ST, e.g. saved by Ditto.save(). If given, the database is 
+        not covered again.
+        """
 
-        # Find all unique singletons
-        self.singletons_list = np.concatenate(
-            [np.unique(time_series)
-             for time_series in D]
-        )
+        # Vocabulary of the database
+        self.vocabulary = vocabulary
 
         # Store singletons objects
-        self.patterns = [Pattern(p, id)
-                         for id, p in enumerate(self.singletons_list)]
+        self.patterns = [Pattern([code], vocabulary, code)
+                         for code in range(len(vocabulary))]
 
         # Get singleton coverage
-        _ = cover.cover(self)
+        if usage is None:
+            cover.cover(self)
+
+        else:
+            for pattern, count in zip(self.patterns, usage):
+                pattern.update(int(count), 0, 0)
+            self.update()
 
     def sort_cover_order(self):
         """
@@ -39,14 +49,32 @@ class ST():
         """
 
         self.usage = np.array([pattern.usage for pattern in self.patterns])
-        self.usage_dict = {
-            s: u for s, u in zip(self.singletons_list, self.usage)
-        }
         self.usage_sum = np.sum(self.usage)
         self.gaps = np.array([pattern.gaps for pattern in self.patterns])
         self.fills = np.array([pattern.fills for pattern in self.patterns])
 
         return
 
+    def extend(self, D):
+        """
+        Update singleton usage with new columns D of the database.
+        """
+
+        self.usage = self.usage + np.bincount(D.ravel(), minlength=len(self.patterns))
+        self.usage_sum = np.sum(self.usage)
+
+        return
+
+    def evict(self, D):
+        """
+        Update singleton usage after columns D were removed from the
+        database.
+        """
+
+        self.usage = self.usage - np.bincount(D.ravel(), minlength=len(self.patterns))
+        self.usage_sum = np.sum(self.usage)
+
+        return
+
     def __getitem__(self, item):
         return self.patterns[item]
@@ -1,79 +1,304 @@
-
 from .pattern import Pattern
 
-from itertools import product
 import numpy as np
 
 
 class Candidates:
 
-    def __init__(self, ST, CT):
+    # Number of candidates sorted in the first block, see __iter__
+    block_size = 64
+
+    # We arbitrarily cap the max number of symbols in the candidates
+    max_length = 5
+
+    def __init__(self, ST, CT, cooccurrences=None, min_support=1):
+
+        # Code length of each symbol with the ST, infinite for the symbols
+        # with no usage left in a window, see Lengths
+        with np.errstate(divide='ignore'):
+            self.symbol_cost = -np.log10(ST.usage/ST.usage_sum)
+        self.vocabulary = CT.vocabulary
+
+        # Co-occurrence counts used to discard the candidates which can 
+        # not occur at least min_support times, see the CoOccurrences 
+        # class and stream()
+        self.cooccurrences = cooccurrences
+        self.min_support = min_support
+
+        # Patterns of the CT, the candidates are all their ordered pairs
+        self.patterns = list(CT.patterns)
+        self.usage = CT.usage.copy()
+        self.cost = self._cost(self.patterns)
+        self.lengths = np.array([len(p) for p in self.patterns])
+        self.first, self.counts = self._first_and_counts(self.patterns)
 
-        # Get a new set of candidates with their estimated usage
-        self._cartesian_product(ST, CT)
+        # Whether each pair can occur at least min_support times: 1 if
+        # it can, 0 if not and -1 if not known yet, see _feasible()
+        self.feasible = None if cooccurrences is None else \
+            np.full((len(self.patterns), len(self.patterns)), -1, dtype=np.int8)
 
-        # Retrieve estimated gain from the candidate objects
-        self._get_estimated_gain()
+        # Compute the estimated gain of all candidates at once
+        self.estimated_gain = self._score()
 
         # Sort the candidates
         self._sort()
 
-    def _cartesian_product(self, ST, CT):
+    def update(self, CT):
         """
-        Computes the cartesian product of an array of letters with itself.
-
-        Returns a new set of candidates from the cartesian product of the CT with itself 
-        and an array of combined usages for these new candidates, that will be useful for 
-        the estimated gain computation.
+        Update the candidates after the CT has changed.
+
+        The estimated gain of every pair depends on the sum of the usage 
+        in the CT, which changes with each accepted candidate, so all the
+        pairs are scored again. What only depends on the patterns is 
+        reused for the patterns still in the CT: their code length, 
+        number of symbols, first symbol and counts per time series, and 
+        the support filter of the pairs already streamed, see 
+        _feasible(). The pairs that involve a pattern no longer in the 
+        CT are dropped.
         """
 
-        # Generators
-        candidates = (''.join([p.name for p in patterns])
-                      for patterns in product(CT.patterns, repeat=2))
-        usage = (i for i in product(CT.usage, repeat=2))
+        # Position of the patterns in the previous grid
+        previous = {id(pattern): i for i, pattern in enumerate(self.patterns)}
+        old = np.array([previous.get(id(pattern), -1)
+                        for pattern in CT.patterns], dtype=np.intp)
+        kept = old >= 0
+        new_patterns = [p for p, k in zip(CT.patterns, kept) if not k]
+
+        # Per-pattern values, only computed for the new patterns
+        cost = np.empty(len(CT.patterns))
+        cost[kept] = self.cost[old[kept]]
+        cost[~kept] = self._cost(new_patterns)
+        lengths = np.empty(len(CT.patterns), dtype=np.intp)
+        lengths[kept] = self.lengths[old[kept]]
+        lengths[~kept] = [len(p) for p in new_patterns]
+        first = np.empty(len(CT.patterns), dtype=np.int32)
+        counts = np.empty((len(CT.patterns), self.counts.shape[1]), dtype=np.intp)
+        first[kept], counts[kept] = self.first[old[kept]], self.counts[old[kept]]
+        first[~kept], counts[~kept] = self._first_and_counts(new_patterns)
+
+        self.patterns = list(CT.patterns)
+        self.usage, self.cost, self.lengths = CT.usage.copy(), cost, lengths
+        self.first, self.counts = first, counts
+
+        # Copy the support filter of the pairs of kept patterns, it is 
+        # not known yet for the pairs of the new patterns
+        if self.feasible is not None:
+            index = np.where(kept, old, 0)
+            self.feasible = self.feasible[np.ix_(index, index)]
+            self.feasible[~kept] = -1
+            self.feasible[:, ~kept] = -1
+
+        self.estimated_gain = self._score()
 
-        # Generate Candidate objects
-        self.candidates = [Candidate(ST, CT, p, u)
-                           for p, u in zip(candidates, usage)]
+        # Sort the candidates
+        self._sort()
 
         return
 
-    def _get_estimated_gain(self):
+    def _score(self):
         """
-        Return an array with the estimated gain of the candidates.
+        Estimated gain of the candidates X U Y for all pairs of patterns
+        X and Y of the CT. 
         """
 
-        self.estimated_gain = np.array([candidate.gain
-                                        for candidate in self.candidates])
+        gain = self._estimated_gain(
+            self.usage[:, None], self.usage[None, :], np.sum(self.usage),
+            self.cost[:, None] + self.cost[None, :],
+            self.lengths[:, None] + self.lengths[None, :]
+        )
 
-        return
+        return gain.ravel()
+
+    def _feasible(self, indexes):
+        """
+        Whether the candidates at given indexes of the grid can occur at
+        least min_support times. The support is only counted for the 
+        pairs not seen yet, and kept in self.feasible.
+        """
+
+        if self.feasible is None:
+            return np.ones(len(indexes), dtype=bool)
+
+        rows, columns = np.divmod(indexes, len(self.patterns))
+        feasible = self.feasible[rows, columns]
+
+        unknown = feasible < 0
+        if np.any(unknown):
+            rows, columns = rows[unknown], columns[unknown]
+
+            # Duration of the candidates and max offset between the first
+            # symbols of X and Y, see CoOccurrences
+            t = np.max(self.counts[rows] + self.counts[columns], axis=-1)
+            support = self.cooccurrences[2*t - 2,
+                                         self.first[rows], self.first[columns]]
+
+            feasible[unknown] = support >= self.min_support
+            self.feasible[rows, columns] = feasible[unknown]
+
+        return feasible == 1
+
+    def _first_and_counts(self, patterns):
+        """
+        First symbol of each pattern and number of symbols of each 
+        pattern in each time series.
+        """
+
+        first = np.array([p.symbols[0] for p in patterns], dtype=np.int32)
+        counts = np.zeros((len(patterns), self.vocabulary.n_channels), dtype=np.intp)
+        for i, p in enumerate(patterns):
+            np.add.at(counts[i], p.channels, 1)
+
+        return first, counts
+
+    def _cost(self, patterns):
+        """
+        Code length of each pattern with the ST.
+        """
+
+        if not patterns:
+            return np.empty(0)
+
+        lengths = np.array([len(p) for p in patterns])
+        starts = np.cumsum(lengths) - lengths
+
+        return np.add.reduceat(
+            self.symbol_cost[np.concatenate([p.symbols for p in patterns])],
+            starts
+        )
+
+    @classmethod
+    def _estimated_gain(cls, x, y, s, cost, lengths):
+        """
+        Compute the estimated gain of candidates.
+
+        The candidates are the cartesian product of the CT with itself:
+        candidate Z = X U Y, where X and Y are two patterns in the CT,
+        is stored at index i_X * len(CT) + i_Y of the flattened
+        (len(CT) x len(CT)) grid of estimated gains.
+
+        The gain only depends on the usage x and y of X and Y, on the 
+        sum s of the usage in the CT, on the code length cost of the 
+        symbols of Z with the ST and on its number of symbols, so it 
+        is computed by broadcasting over the usage grid.
+        """
+
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float),
+                                   np.asarray(y, dtype=float))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            # Case 1: x = y (includes X = Y or equal usage pattern)
+            z = x/2
+            deltaL_D_CT_1 = x*np.log10(x/s) + y*np.log10(y/s) \
+                - z*np.log10(z/(s-x+z))
+            deltaL_CT_D_1 = np.log10(x/s) + np.log10(y/s) \
+                - np.log10(z/(s-x+z))
+
+            # Case 2: X != Y
+            z = np.minimum(x, y)
+            delta_xy = np.maximum(x, y) - z
+            deltaL_D_CT_2 = x*np.log10(x/s) + y*np.log10(y/s) - delta_xy * \
+                np.log10(delta_xy/(s-z)) - z*np.log10(z/(s-z))
+            deltaL_CT_D_2 = np.log10(x/s) + np.log10(y/s) - np.log10(
+                delta_xy/(s-z)) - np.log10(z/(s-z))
+
+            # Total gain ΔL(D, CT)
+            gain = np.where(x == y,
+                            deltaL_D_CT_1 + deltaL_CT_D_1,
+                            deltaL_D_CT_2 + deltaL_CT_D_2) + cost
+
+        # If either X or Y has a usage of 0, the estimated gain is inf
+        gain[(x == 0) | (y == 0)] = np.inf
+
+        # We arbitrarily cap the max number of symbols in the candidates
+        gain[np.broadcast_to(lengths, gain.shape) > cls.max_length] = np.inf
+
+        return gain
 
     def _sort(self):
         """
-        Sort the candidates array in Candidate Order, i.e. by decreasing estimated gain(X).
+        Prepare the candidates for a lazy traversal in Candidate Order, i.e. by
+        decreasing estimated gain(X).
 
         This order preferes the most promising candidates in terms of compression gain.
         However, the compression gain is merely an estimation and may not reflect any
         actual gain.
-        """
 
-        # Decreasing estimated gain
-        sort_indexes = np.argsort(self.estimated_gain)
+        Candidates with an inf gain are removed. The remaining ones are only 
+        sorted block by block when iterating, see __iter__.
+        """
 
         # Add a cutoff to remove candidates with inf gain
-        cutoff = len(self.estimated_gain[self.estimated_gain < np.inf])
+        self.indexes = np.flatnonzero(self.estimated_gain < np.inf)
+
+        return
+
+    def __iter__(self):
+        return self.stream()
+
+    def stream(self, max_gain=np.inf):
+        """
+        Yield the candidates in Candidate Order.
+
+        The candidates are selected in blocks of increasing size with
+        np.argpartition, so that only the consumed candidates are
+        fully sorted. Ties are broken by position in the grid.
+
+        The candidates with an estimated gain above max_gain come last 
+        in Candidate Order, they are skipped and counted in self.skipped.
+
+        The candidates which can not occur at least min_support times 
+        are dropped from each block before it is sorted, so the support 
+        is only counted for the candidates streamed, see _feasible().
+        """
+
+        remaining = self.indexes[self.estimated_gain[self.indexes] <= max_gain]
+        self.skipped = len(self.indexes) - len(remaining)
+        block_size = self.block_size
 
-        # Sort candidates
-        self.candidates = [self.candidates[i] for i in sort_indexes]
-        self.candidates = self.candidates[:cutoff]
+        while len(remaining):
+
+            gain = self.estimated_gain[remaining]
+
+            if len(remaining) > block_size:
+
+                # Gain of the block_size-th best candidate, all candidates
+                # with the same gain go in the same block
+                kth = gain[np.argpartition(gain, block_size-1)[block_size-1]]
+                in_block = gain <= kth
+                block, rest = remaining[in_block], remaining[~in_block]
+
+            else:
+                block, rest = remaining, remaining[:0]
+
+            # Decreasing estimated gain
+            block = block[self._feasible(block)]
+            block = block[np.lexsort((block, self.estimated_gain[block]))]
+
+            for index in block:
+                yield self._candidate(index)
+
+            remaining = rest
+            block_size *= 2
 
         return
 
-    def __getitem__(self, item):
-        return self.candidates[item]
+    def _candidate(self, index):
+        """
+        Create the Candidate object at a given index of the grid.
+        """
+
+        # Position of X and Y in the CT
+        i_x, i_y = divmod(int(index), len(self.patterns))
+        X, Y = self.patterns[i_x], self.patterns[i_y]
+
+        return Candidate(self.vocabulary,
+                         np.concatenate([X.symbols, Y.symbols]),
+                         (self.usage[i_x], self.usage[i_y]),
+                         self.estimated_gain[index])
 
     def __len__(self):
-        return len(self.candidates)
+        return len(self.indexes)
 
 
 class Candidate(Pattern):
@@ -89,73 +314,13 @@ class Candidate(Pattern):
         'gain'
     ]
 
-    def __init__(self, ST, CT, pattern, usage):
+    def __init__(self, vocabulary, symbols, usage, gain):
 
         # Pattern object inheritance
-        Pattern.__init__(self, pattern)
+        Pattern.__init__(self, symbols, vocabulary)
 
         # Usage
         self.usage = usage
 
         # Estimated gain
-        self.gain = self._gain(ST, CT)
-
-    def _gain(self, ST, CT):
-        """
-        Compute the estimated gain for this candidate.
-
-        Current candidate Z is constructed as Z = X U Y,
-        where X and Y are two previous patterns in the CT
-        associated during the cartesian product step.
-        """
-
-        # We arbitrarily cap the max number of symbols in the candidates
-        if len(self.symbols) > 5:
-            return np.inf
-
-        # If either X or Y has a usage of 0, the estimated gain is inf
-        if np.min(self.usage) == 0:
-            return np.inf
-
-        # Otherwise, we can compute the estimated gain of the pattern
-        x, y, s = self.usage[0], self.usage[1], np.sum(CT.usage)
-
-        # Case 1: x = y (includes X = Y or equal usage pattern)
-        if x == y:
-            z = x/2
-
-            # ΔL(D|CT)
-            deltaL_D_CT = x*np.log10(x/s) + y*np.log10(y/s) \
-                - z*np.log10(z/(s-x+z))
-
-            # ΔL(CT|D)
-            deltaL_CT_D = np.log10(
-                x/s) + np.log10(y/s) - np.log10(z/(s-x+z))
-
-            for symbol in self.symbols:
-                deltaL_CT_D += - \
-                    np.log10(ST.usage_dict[symbol]/ST.usage_sum)
-
-            # Total gain ΔL(D, CT)
-            return deltaL_D_CT + deltaL_CT_D
-
-        # Case 2: X != Y
-        else:
-            z = min(x, y)
-            delta_xy = max(x, y) - z
-
-            # ΔL(D|CT)
-            deltaL_D_CT = x*np.log10(x/s) + y*np.log10(y/s) - delta_xy * \
-                np.log10(delta_xy/(s-z)) - \
-                z*np.log10(z/(s-z))
-
-            # ΔL(CT|D)
-            deltaL_CT_D = np.log10(x/s) + np.log10(y/s) - np.log10(
-                delta_xy/(s-z)) - np.log10(z/(s-z))
-
-            for symbol in self.symbols:
-                deltaL_CT_D += - \
-                    np.log10(ST.usage_dict[symbol]/ST.usage_sum)
-
-            # Total gain ΔL(D, CT)
-            return deltaL_D_CT + deltaL_CT_D
+        self.gain = gain
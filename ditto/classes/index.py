@@ -0,0 +1,243 @@
+import numpy as np
+
+
+class SymbolIndex:
+    """
+    Index of the positions of each symbol code in the database.
+
+    The positions are stored in a compressed sparse row layout:
+    the sorted columns at which code c occurs (in the time series
+    of its channel) are positions[indptr[c]:ends[c]].
+
+    The slot positions[indptr[c]:indptr[c+1]] of each code may have 
+    room left after ends[c], filled with the largest position, so that 
+    new columns can be indexed without moving all the positions, see 
+    extend(). Without room left, ends = indptr[1:].
+
+    The index is built once and shared by all the cover passes.
+    """
+
+    # Position of the room left in the slots
+    empty = np.iinfo(np.int32).max
+
+    def __init__(self, indptr, positions, ends=None):
+
+        # Boundaries of the slot of each code
+        self.indptr = indptr
+
+        # Concatenated sorted positions of all codes
+        self.positions = positions
+
+        # End of the positions of each code in its slot
+        self.ends = indptr[1:].copy() if ends is None else ends
+
+        # Sort keys of the positions, see following()
+        self._keys = None
+
+    @classmethod
+    def from_database(cls, D, n_codes):
+        """
+        Build the index of an encoded database D of shape (N x n).
+        """
+
+        codes = D.ravel()
+
+        # Number of occurrences of each code
+        counts = np.bincount(codes, minlength=n_codes)
+        indptr = np.zeros(n_codes+1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+
+        # A stable sort keeps the flat indexes, hence the columns,
+        # sorted within each code
+        order = np.argsort(codes, kind='stable')
+        positions = (order % D.shape[1]).astype(np.int32)
+
+        return cls(indptr, positions)
+
+    def to_arrays(self):
+        """
+        Arrays of the index without the room left in the slots, see 
+        Ditto.save().
+        """
+
+        counts = self.ends - self.indptr[:-1]
+        indptr = np.zeros_like(self.indptr)
+        np.cumsum(counts, out=indptr[1:])
+
+        return {'indptr': indptr, 'positions': self.positions[self._used()]}
+
+    def extend(self, D, start):
+        """
+        Add the positions of new columns D of shape (N x k), appended 
+        at column start of the database. The new positions come after 
+        all the previous ones, so they are written at the end of the 
+        positions of each code, in the room left in its slot.
+
+        If a slot is too small, all the slots are moved to new slots 
+        twice the size they need, so that the cost of the copies is 
+        amortized over the next columns.
+        """
+
+        codes = D.ravel()
+
+        counts = np.bincount(codes, minlength=len(self))
+        order = np.argsort(codes, kind='stable')
+        positions = (order % D.shape[1] + start).astype(self.positions.dtype)
+
+        if np.any(self.ends + counts > self.indptr[1:]):
+            self._grow(2*(self.ends + counts - self.indptr[:-1]))
+
+        # Index of each new position in the slot of its code
+        offsets = np.cumsum(counts) - counts
+        self.positions[np.repeat(self.ends - offsets, counts)
+                       + np.arange(len(positions))] = positions
+        self.ends = self.ends + counts
+        self._keys = None
+
+        return
+
+    def _grow(self, sizes):
+        """
+        Move the positions to new slots of given sizes.
+        """
+
+        indptr = np.zeros_like(self.indptr)
+        np.cumsum(sizes, out=indptr[1:])
+
+        positions = np.full(indptr[-1], self.empty, dtype=self.positions.dtype)
+        used = self._used()
+        codes = np.repeat(np.arange(len(self)), np.diff(self.indptr))[used]
+        positions[np.flatnonzero(used) - self.indptr[codes] + indptr[codes]] = \
+            self.positions[used]
+
+        self.ends = self.ends - self.indptr[:-1] + indptr[:-1]
+        self.indptr, self.positions = indptr, positions
+
+        return
+
+    def evict(self, n):
+        """
+        Remove the positions of the first n columns of the database and
+        shift the others, the database starting at column n. The room 
+        left in the slots is dropped.
+        """
+
+        kept = self._used() & (self.positions >= n)
+        codes = np.repeat(np.arange(len(self)), np.diff(self.indptr))
+
+        self.positions = self.positions[kept] - n
+        self.indptr = np.zeros_like(self.indptr)
+        np.cumsum(np.bincount(codes[kept], minlength=len(self)),
+                  out=self.indptr[1:])
+        self.ends = self.indptr[1:].copy()
+        self._keys = None
+
+        return
+
+    def _used(self):
+        """
+        Whether each entry of positions holds a position.
+        """
+
+        return self.positions != self.empty
+
+    def following(self, codes, columns):
+        """
+        Column of the first occurrence of each code at or after each 
+        column, -1 if the code does not occur after this column.
+
+        The positions are sorted by code and then by column, so the
+        occurrences of all codes are searched at once in the sort keys
+        code * 2**32 + column.
+        """
+
+        if self._keys is None:
+            self._keys = np.repeat(np.arange(len(self), dtype=np.int64) << 32,
+                                   np.diff(self.indptr)) + self.positions
+
+        codes = np.asarray(codes, dtype=np.int64)
+        if not len(self.positions):
+            return np.full(codes.shape, -1)
+
+        i = np.searchsorted(self._keys, (codes << 32) + columns)
+        found = i < self.ends[codes]
+
+        return np.where(found, self.positions[np.where(found, i, 0)], -1)
+
+    def __getitem__(self, code):
+        return self.positions[self.indptr[code]:self.ends[code]]
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+
+class CoOccurrences:
+    """
+    Co-occurrence counts of the symbol codes in the database.
+
+    support[d, c1, c2] is the number of cells of code c1, say at 
+    column a, such that code c2 occurs in some time series at a 
+    column in [a, a+d], the cell itself excluded.
+
+    A candidate Z = X U Y can only occur if the first symbol of Y
+    comes at most 2*t - 2 columns after the first symbol of X, see
+    Cover._prune_occurrences, and two occurrences of Z can not start 
+    on the same cell. Hence, support[2*t - 2, X[0], Y[0]] is an upper
+    bound of the usage of Z in any cover.
+
+    The counts are not stored: they are computed on demand from the
+    SymbolIndex, for the (d, c1, c2) triples requested only, by 
+    looking up the first occurrence of c2 from each cell of c1, see
+    SymbolIndex.following(). They thus follow the changes of the index.
+    """
+
+    # Number of cells of c1 processed at once when counting
+    chunk_size = 2**20
+
+    def __init__(self, index):
+        self.index = index
+
+    def __getitem__(self, item):
+        """
+        Support of arrays of offsets d and codes c1 and c2, broadcast
+        together.
+        """
+
+        offset, c1, c2 = np.broadcast_arrays(*item)
+        shape = offset.shape
+
+        # Each distinct triple is only counted once
+        n_codes = len(self.index)
+        keys = (offset.ravel().astype(np.int64)*n_codes + c1.ravel())*n_codes \
+            + c2.ravel()
+        keys, inverse = np.unique(keys, return_inverse=True)
+        offset, c1, c2 = keys // (n_codes*n_codes), \
+            keys // n_codes % n_codes, keys % n_codes
+
+        # Cells of c1 of each triple
+        sizes = (self.index.ends - self.index.indptr[:-1])[c1]
+        ends = np.cumsum(sizes)
+
+        support = np.zeros(len(keys), dtype=np.int64)
+        i = 0
+        while i < len(keys):
+
+            # Triples of the chunk, at least one
+            j = max(i+1, int(np.searchsorted(
+                ends, ends[i] - sizes[i] + self.chunk_size, side='right')))
+            triple = np.repeat(np.arange(j-i), sizes[i:j])
+
+            # Column a of each cell of c1
+            starts = ends[i:j] - sizes[i:j] - (ends[i] - sizes[i])
+            cells = np.arange(len(triple)) - starts[triple]
+            a = self.index.positions[self.index.indptr[c1[i:j]][triple] + cells]
+
+            # First column of c2 from a, a itself excluded if c2 = c1
+            b = self.index.following(c2[i:j][triple],
+                                     a + (c1[i:j] == c2[i:j])[triple])
+            found = (b >= 0) & (b <= a + offset[i:j][triple])
+
+            support[i:j] = np.bincount(triple[found], minlength=j-i)
+            i = j
+
+        return support[inverse].reshape(shape)
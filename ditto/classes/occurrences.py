@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class Occurrences:
+    """
+    Occurrences of a pattern in the cover.
+
+    Each occurrence is stored as the column of its first symbol and the
+    column offset of each symbol from it, the row of each symbol being
+    given by the channels of the pattern:
+        - start = int32 array of the first column of each occurrence.
+        - offsets = array of shape (n_occurrences x n_symbols), in the
+        smallest unsigned type that holds the span of the pattern.
+        - gaps = number of gaps of each occurrence, i.e. the number of
+        columns it spans in excess of the duration of the pattern.
+
+    The occurrences are sorted by start column.
+
+    The arrays may be the first rows of buffers with room for more 
+    occurrences, see append().
+    """
+
+    __slots__ = ['channels', 'start', 'offsets', 'gaps', '_buffers']
+
+    def __init__(self, pattern, cols):
+        """
+        cols = array of shape (n_occurrences x n_symbols) with the column
+        of each symbol, the first symbol being the earliest.
+        """
+
+        cols = np.asarray(cols).reshape(-1, len(pattern))
+
+        self.channels = pattern.channels
+        self.start = cols[:, 0].astype(np.int32)
+        span = cols[:, -1] - cols[:, 0] if len(cols) else np.empty(0, dtype=int)
+        self.offsets = (cols - cols[:, [0]]).astype(
+            np.min_scalar_type(max(2*pattern.t - 2, 0)))
+        self.gaps = (span - pattern.t + 1).astype(np.int32)
+        self._buffers = None
+
+    def append(self, pattern, cols, keep):
+        """
+        Keep the first keep occurrences and add new ones after them, in
+        place. cols = see __init__(), the new occurrences starting after 
+        the ones kept.
+
+        When the buffers are full, they are replaced by buffers twice the
+        size needed, so that the cost of the copies is amortized over 
+        the next appends, see Cover.extend().
+        """
+
+        new = Occurrences(pattern, cols)
+        n = keep + len(new)
+
+        arrays = (self.start, self.offsets, self.gaps)
+        if (self._buffers is None) or (n > len(self._buffers[0])):
+            self._buffers = tuple(np.empty((2*n,) + array.shape[1:], dtype=array.dtype)
+                                  for array in arrays)
+            for buffer, array in zip(self._buffers, arrays):
+                buffer[:keep] = array[:keep]
+
+        for buffer, array in zip(self._buffers, (new.start, new.offsets, new.gaps)):
+            buffer[keep:n] = array
+        self.start, self.offsets, self.gaps = (buffer[:n] for buffer in self._buffers)
+
+        return
+
+    @property
+    def rows(self):
+        """
+        Row of each symbol of each occurrence.
+        """
+
+        return np.broadcast_to(self.channels, self.offsets.shape)
+
+    @property
+    def cols(self):
+        """
+        Column of each symbol of each occurrence.
+        """
+
+        return self.start[:, None] + self.offsets
+
+    def cells(self, n_columns):
+        """
+        Flat index of the cells of each occurrence in a database of
+        n_columns columns.
+        """
+
+        return self.channels.astype(np.intp) * n_columns + self.cols
+
+    def __getitem__(self, item):
+        """
+        Occurrences of a slice, sharing the arrays.
+        """
+
+        occurrences = Occurrences.__new__(Occurrences)
+        occurrences.channels = self.channels
+        occurrences.start = self.start[item]
+        occurrences.offsets = self.offsets[item]
+        occurrences.gaps = self.gaps[item]
+        occurrences._buffers = None
+
+        return occurrences
+
+    def __len__(self):
+        return len(self.start)
@@ -1,30 +1,31 @@
-
-from collections import defaultdict
 import numpy as np
 
 class Pattern():
     """
     Pattern class.
+
+    A pattern is stored as an int32 array of symbol codes, see the
+    Vocabulary class.
     """
 
-    # We define the allowed attributes to gain memory space 
+    # We define the allowed attributes to gain memory space
     __slots__ = [
-        'id', 'name', 'symbols', 't', 'usage', 'gaps', 'fills'
+        'id', 'symbols', 'channels', 'vocabulary', 't', 'usage', 'gaps', 'fills'
     ]
 
-    def __init__(self, pattern, id=None):
-        
+    def __init__(self, symbols, vocabulary, id=None):
+
         # Basic parameters
         self.id = id
-        self.name = pattern
+        self.vocabulary = vocabulary
 
-        # Symbols
-        self.symbols = [pattern[i:i+2] 
-                        for i in range(0, len(pattern), 2)]
+        # Symbols and the time series they belong to
+        self.symbols = np.asarray(symbols, dtype=np.int32)
+        self.channels = vocabulary.channels[self.symbols]
 
         # Duration
-        self.t = self._t(self.symbols)
-    
+        self.t = self._t(self.channels)
+
     def update(self, counts, gaps, fills):
         """
         Update pattern usage, gaps and fills after the covering step.
@@ -36,22 +37,26 @@ class Pattern():
 
         return
 
+    @property
+    def name(self):
+        """
+        Readable name of the pattern, e.g. 'a0b0c1', or '1_0 11_0 2_1'
+        when the names of the symbols are not compact, see Vocabulary.name().
+        """
+        separator = '' if self.vocabulary.compact else ' '
+        return separator.join(self.vocabulary.name(symbol) for symbol in self.symbols)
+
     @staticmethod
-    def _t(symbols):
+    def _t(channels):
         """
         Computes the length of a pattern. The length is defined as the number of timesteps.
-        Therefore, we can't just do len(pattern), we need to count the number of symbols on each 
-        sequence and remember the max. We use a defaultdict to do just that
+        Therefore, we can't just do len(pattern), we need to count the number of symbols on each
+        sequence and remember the max.
         """
-        lengths = defaultdict(int)
-        for symbol in symbols:
-            lengths[int(symbol[-1])] += 1
-        return np.amax([lengths[key] for key in lengths.keys()])
+        return int(np.bincount(channels).max())
 
     def __repr__(self) -> str:
         return self.name
 
     def __len__(self):
-        return len(self.name)
-
-        
\ No newline at end of file
+        return len(self.symbols)
@@ -0,0 +1,260 @@
+from ..tree.util import QueryTrie
+
+import numpy as np
+
+
+class SuffixArray:
+    """
+    Generalized suffix array of the time series of a database, with
+    the longest common prefix (LCP) of consecutive suffixes.
+
+    The time series are joined into a single text, each one followed
+    by a unique negative separator, so that no match of a motif of
+    symbol codes can span two time series:
+        T = S_0 $_0 S_1 $_1 ... S_N-1 $_N-1
+
+    - sa[r] = start in T of the suffix of rank r.
+    - rank[i] = rank of the suffix starting at i.
+    - lcp[r] = length of the longest common prefix of the suffixes of
+    ranks r-1 and r (lcp[0] = 0).
+
+    The occurrences of a pattern are the suffixes it prefixes, which
+    form a contiguous interval of ranks found by binary search. It
+    exposes the same find_all/find_motifs interface as the Tree class.
+
+    The arrays are built with prefix doubling: after h steps, the
+    suffixes are sorted by their first 2^h symbols. Each step is a
+    single np.argsort and only the ranks of the last step are kept.
+    The LCP array is only computed on first access, from the suffix
+    array and the ranks, see lcp.
+    """
+
+    def __init__(self, text, n_sequences, length):
+
+        # Joined text and size of each time series
+        self.text = text
+        self.n_sequences = n_sequences
+        self.length = length
+
+        # Suffix array and inverse suffix array
+        self.sa, self.rank = self._build(text)
+
+        # LCP array, see lcp
+        self._lcp = None
+
+    @classmethod
+    def from_database(cls, D):
+        """
+        Build the suffix array of an encoded database D of shape (N x n).
+        """
+
+        N, n = D.shape
+
+        # Unique separators, lower than every code
+        separators = -1 - np.arange(N)
+        text = np.concatenate([D, separators[:, None]], axis=1).ravel()
+
+        return cls(text.astype(np.int64), N, n)
+
+    @property
+    def lcp(self):
+        """
+        LCP array, computed on first access since the motif lookups
+        don't use it.
+        """
+        if self._lcp is None:
+            self._lcp = self._kasai(self.text, self.sa, self.rank)
+        return self._lcp
+
+    def to_arrays(self):
+        """
+        Arrays and attributes of the suffix array, see from_arrays().
+        The LCP array is not saved, it is computed again on access.
+        """
+
+        arrays = {'text': self.text, 'sa': self.sa, 'rank': self.rank}
+        attributes = {'n_sequences': self.n_sequences, 'length': self.length}
+
+        return arrays, attributes
+
+    @classmethod
+    def from_arrays(cls, arrays, attributes):
+        """
+        Suffix array from the output of to_arrays(), e.g. memory-mapped
+        arrays, without building it again.
+        """
+
+        self = cls.__new__(cls)
+        self.n_sequences = attributes['n_sequences']
+        self.length = attributes['length']
+        for name in ('text', 'sa', 'rank'):
+            setattr(self, name, arrays[name])
+        self._lcp = None
+
+        return self
+
+    @staticmethod
+    def _build(text):
+        """
+        Prefix doubling construction of the suffix array and of its
+        inverse, the rank of each suffix.
+        """
+
+        L = len(text)
+        if L == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        # Ranks and positions are stored in int32 when possible
+        dtype = np.int32 if L < 2**31 - 1 else np.int64
+
+        # Ranks of the suffixes by their first symbol, dense in [0, L)
+        _, rank = np.unique(text, return_inverse=True)
+        rank = rank.astype(np.int64)
+        sa = np.argsort(rank, kind='stable')
+
+        k = 1
+        while (rank[sa[-1]] < L-1) and (k < L):
+
+            # Sort by (rank of the first k symbols, rank of the next k)
+            second = np.full(L, -1, dtype=np.int64)
+            second[:L-k] = rank[k:]
+            key = rank*(L+1) + (second+1)
+            sa = np.argsort(key, kind='stable')
+
+            # New ranks, equal keys get equal ranks
+            sorted_key = key[sa]
+            new = np.empty(L, dtype=np.int64)
+            new[sa] = np.concatenate(
+                ([0], np.cumsum(sorted_key[1:] != sorted_key[:-1])))
+            rank = new
+            k *= 2
+
+        return sa.astype(dtype), rank.astype(dtype)
+
+    @staticmethod
+    def _kasai(text, sa, rank):
+        """
+        LCP array from the suffix array and its inverse, with Kasai's
+        algorithm. The suffixes are visited in order of position: the
+        LCP of the suffix at i+1 with its predecessor in rank order is
+        at least the one of the suffix at i minus 1, hence at most 2L
+        symbol comparisons and O(L) memory.
+        """
+
+        L = len(text)
+        lcp = [0]*L
+        text, sa, rank = text.tolist(), sa.tolist(), rank.tolist()
+
+        h = 0
+        for i in range(L):
+
+            r = rank[i]
+            if r == 0:
+                h = 0
+                continue
+
+            j = sa[r-1]
+            while (i+h < L) and (j+h < L) and (text[i+h] == text[j+h]):
+                h += 1
+            lcp[r] = h
+
+            if h > 0:
+                h -= 1
+
+        return np.array(lcp, dtype=np.int32 if L < 2**31 - 1 else np.int64)
+
+    def find_interval(self, motif):
+        """
+        Interval [lo, hi) of the ranks of the suffixes prefixed by
+        a motif.
+        """
+
+        motif = np.asarray(motif, dtype=np.int64)
+        lo, hi = 0, len(self.sa)
+
+        # Narrow the interval one symbol at a time, within the interval
+        # the k-th symbols of the suffixes are sorted
+        for k, symbol in enumerate(motif):
+            lo = self._bound(lo, hi, k, symbol, right=False)
+            hi = self._bound(lo, hi, k, symbol, right=True)
+            if lo == hi:
+                break
+
+        return lo, hi
+
+    def _bound(self, lo, hi, k, symbol, right):
+        """
+        Binary search of the first rank in [lo, hi) which k-th symbol
+        is greater (or equal if not right) than symbol.
+        """
+
+        text, sa, L = self.text, self.sa, len(self.text)
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = sa[mid] + k
+            value = text[i] if i < L else -self.n_sequences-1
+            if (value < symbol) or (right and value == symbol):
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return lo
+
+    def find_all(self, motif):
+        """
+        Return the number of times a motif occurs as a substring and
+        the offset of each match in its time series, starting at 1 as
+        in the Tree class.
+        """
+
+        counts, positions = self.find_motifs(motif)
+
+        return counts, positions + 1
+
+    def find_motifs(self, motif):
+        """
+        Finds the number of times a motif is repeated in the database.
+        Returns the counts and the sorted offsets of the matches in
+        their time series, starting at 0.
+        """
+
+        lo, hi = self.find_interval(motif)
+        positions = np.sort(self.sa[lo:hi] % (self.length+1))
+
+        return hi - lo, positions
+
+    def find_motifs_batch(self, motifs):
+        """
+        Same as find_motifs for many motifs at once. The motifs are 
+        gathered in a QueryTrie, so that the interval of a common prefix 
+        is only searched once and then narrowed for each motif.
+
+        Returns a list of (counts, offsets) in the order of the motifs.
+        """
+
+        def step(state, symbol):
+            lo, hi, k = state
+            lo = self._bound(lo, hi, k, symbol, right=False)
+            hi = self._bound(lo, hi, k, symbol, right=True)
+            return (lo, hi, k+1) if lo < hi else None
+
+        def found(state):
+            lo, hi, _ = state
+            return hi - lo, np.sort(self.sa[lo:hi] % (self.length+1))
+
+        return QueryTrie(motifs).walk((0, len(self.sa), 0), step, found,
+                                      (0, np.empty(0, dtype=self.sa.dtype)))
+
+    def find(self, motif):
+        """
+        Return True if the motif is found.
+        """
+
+        lo, hi = self.find_interval(motif)
+
+        return hi > lo
+
+    def __len__(self):
+        return len(self.sa)
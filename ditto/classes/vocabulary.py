@@ -0,0 +1,161 @@
+import numpy as np
+
+
+class Vocabulary:
+    """
+    Vocabulary table of the (channel, symbol) codes of a database.
+
+    Each distinct symbol of each time series (channel) is given an
+    integer code. Codes are contiguous per channel and sorted by
+    channel first and then by symbol, i.e. the codes of channel c
+    are the integers in [offsets[c], offsets[c+1]).
+
+    E.g.
+        D = [['a', 'b', 'a'],
+             ['b', 'c', 'c']]
+        gives the vocabulary
+            code    channel     value
+            0       0           'a'
+            1       0           'b'
+            2       1           'b'
+            3       1           'c'
+        and the encoded database
+            [[0, 1, 0],
+             [2, 3, 3]]
+    """
+
+    def __init__(self, channels, values):
+
+        # Channel and raw symbol of each code
+        self.channels = np.asarray(channels, dtype=np.int32)
+        self.values = np.asarray(values)
+
+        # Number of time series
+        self.n_channels = int(self.channels[-1]) + 1 if len(self.channels) else 0
+
+        # First code of each channel
+        self.offsets = np.searchsorted(
+            self.channels, np.arange(self.n_channels+1)
+        ).astype(np.int32)
+
+        # Names are 'symbol' + 'channel' when every symbol is a single
+        # non-digit character, and 'symbol_channel' otherwise
+        self.compact = all(
+            isinstance(value, str) and (len(value) == 1) and not value.isdigit()
+            for value in self.values.tolist()
+        )
+
+    @classmethod
+    def from_database(cls, D, chunk_size=2**16):
+        """
+        Build the vocabulary of a database D of shape (N x n) and
+        encode it.
+
+        Returns the vocabulary and an int32 array of shape (N x n)
+        containing the code of each cell.
+        """
+
+        def chunks():
+            for start in range(0, D.shape[1], chunk_size):
+                yield D[:, start:start+chunk_size]
+
+        return cls.from_chunks(chunks)
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Build the vocabulary of a database given by blocks of 
+        consecutive columns and encode it.
+
+        chunks = function returning an iterable over the blocks, of 
+        shape (N x k). It is called twice: the distinct symbols of each 
+        time series are gathered in a first pass, and each block is then 
+        encoded with a binary search in a second pass. Only one block 
+        is held in memory at a time, besides the codes.
+
+        Returns the vocabulary and an int32 array of shape (N x n)
+        containing the code of each cell.
+        """
+
+        # Distinct symbols of each time series and length of D
+        uniques, n = None, 0
+        for chunk in chunks():
+            if uniques is None:
+                uniques = [np.unique(time_series) for time_series in chunk]
+            else:
+                uniques = [np.union1d(unique, time_series)
+                           for unique, time_series in zip(uniques, chunk)]
+            n += chunk.shape[1]
+
+        if uniques is None:
+            raise ValueError('Empty database.')
+
+        vocabulary = cls(
+            np.concatenate([np.full(len(unique), i, dtype=np.int32)
+                            for i, unique in enumerate(uniques)]),
+            np.concatenate(uniques)
+        )
+
+        # Encode each block
+        codes = np.empty((len(uniques), n), dtype=np.int32)
+        start = 0
+        for chunk in chunks():
+            end = start + chunk.shape[1]
+            for i, time_series in enumerate(chunk):
+                codes[i, start:end] = vocabulary.offsets[i] + \
+                    np.searchsorted(uniques[i], time_series)
+            start = end
+
+        return vocabulary, codes
+
+    def encode(self, channel, value):
+        """
+        Code of a raw symbol in a given channel.
+        """
+
+        start, end = self.offsets[channel], self.offsets[channel+1]
+        i = start + np.searchsorted(self.values[start:end], value)
+
+        if (i == end) or (self.values[i] != value):
+            raise KeyError(f'Unknown symbol {value!r} in channel {channel}.')
+
+        return int(i)
+
+    def encode_database(self, D):
+        """
+        Codes of the raw symbols of a database D of shape (N x n) with
+        the same time series, e.g. new columns of an encoded database.
+        """
+
+        codes = np.empty(D.shape, dtype=np.int32)
+
+        for channel, time_series in enumerate(D):
+
+            start, end = self.offsets[channel], self.offsets[channel+1]
+            i = start + np.searchsorted(self.values[start:end], time_series)
+
+            unknown = (i == end) | \
+                (self.values[np.minimum(i, len(self) - 1)] != time_series)
+            if np.any(unknown):
+                first = np.argmax(unknown)
+                value = time_series[first:first+1].tolist()[0]
+                raise KeyError(f'Unknown symbol {value!r} in channel {channel}.')
+
+            codes[channel] = i
+
+        return codes
+
+    def name(self, code):
+        """
+        Readable name of a code, i.e. 'symbol' + 'channel', or
+        'symbol_channel' when the symbols are not all single non-digit
+        characters (e.g. value 1 in channel 10 and value 11 in channel 0).
+        """
+
+        if self.compact:
+            return f'{self.values[code]}{self.channels[code]}'
+
+        return f'{self.values[code]}_{self.channels[code]}'
+
+    def __len__(self):
+        return len(self.channels)
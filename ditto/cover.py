@@ -1,19 +1,39 @@
+from .classes.occurrences import Occurrences
+
+from bisect import bisect_left, bisect_right
 
 import numpy as np
 
 
 class Cover:
 
-    def __init__(self, size, tree):
+    def __init__(self, D, index):
+
+        # Basic parameters. D may also be a buffer with room for new 
+        # columns, the database being its first size[1] columns, see 
+        # extend(). The planes and the flat cell indexes have the columns
+        # of D.
+        self.D = D
+        self.size = D.shape
+
+        # Positions of each symbol, see the SymbolIndex class
+        self.index = index
 
-        # Basic parameters
-        self.size = size
-        self.tree = tree
+        # CT the cover is kept in sync with, see commit()
+        self.CT = None
+
+        # Snapshot of the cover before the last update()
+        self._log = None
 
     def cover(self, CT):
         """
         Cover the data using the patterns in the CT in Cover Order.
 
+        The cover is stored in two int32 planes of the size of D:
+            - C = id of the pattern covering each cell (-1 if the cell
+            is not covered).
+            - C_index = index of the symbol in that pattern.
+
         Also computes 3 arrays:
             - usage = number of occurrences of the pattern in the cover.
             - gaps = number of gaps in all occurrences of the pattern.
@@ -30,49 +50,501 @@ class Cover:
         cover rules: 1) the position of the symbol should not overlap with 
         an element already in the cover C, and 2) there is a maximum gap 
         allowed that restricts the potential distance between two symbols. 
-        The cartesian product is computed recursively both in _prune_occurrences 
-        and in _recursive_prune_occurrences. 
+        The cartesian product is computed one symbol at a time as a windowed 
+        join of the sorted position arrays in _prune_occurrences. 
         Using these rules, we can prune the possible occurrences of the pattern.
 
         The final step is to iterate over all of the available positions for 
         the pattern and cover the data.
+
+        Singletons come last in Cover Order and simply cover every cell 
+        left, so they are not stored in the planes: the planes _C and 
+        _C_index only hold the larger patterns and the singleton usage is 
+        counted from the symbols of the uncovered cells. The full planes 
+        are rebuilt on demand by the C and C_index properties.
+
+        The occurrences of each pattern are kept, see the Occurrences 
+        class, so that the cover can then be updated incrementally, see 
+        update(), and the occurrences of a pattern can be retrieved 
+        without scanning the planes, see occurrences().
         """
 
         # Initialize an empty cover
-        self.C = np.zeros(self.size, dtype="<U6")
+        self._C = np.full(self.D.shape, -1, dtype=np.int32)
+        self._C_index = np.full(self.D.shape, -1, dtype=np.int32)
+        self._log = None
 
         # Sort the patterns
         CT.sort_cover_order()
+        patterns = [CT[i] for i in CT.i_sort]
+
+        # Larger patterns in Cover Order, with their occurrences and
+        # the pattern id written in the planes for their cells
+        self.order = [pattern for pattern in patterns if len(pattern) > 1]
+        self.keys = [self._key(pattern) for pattern in self.order]
+        self.store = {}
+        self.written = {}
 
         # Iterate over the sorted patterns
-        for pattern in [CT[i] for i in CT.i_sort]:
+        for pattern in self.order:
+            pattern.update(*self._cover_pattern(pattern))
+
+        # Singletons cover the remaining cells
+        self.singletons = np.full(len(self.index), None, dtype=object)
+        for pattern in patterns[len(self.order):]:
+            self.singletons[pattern.symbols[0]] = pattern
+        self.singleton_ids = np.array(
+            [-1 if pattern is None else pattern.id for pattern in self.singletons],
+            dtype=np.int32
+        )
+        self.singleton_usage = np.bincount(
+            self._uncovered(0, self.size[1]), minlength=len(self.index)
+        )
+        for pattern in self.singletons[self.singleton_ids >= 0]:
+            pattern.update(self.singleton_usage[pattern.symbols[0]], 0, 0)
 
-            # Find all occurrences of the pattern in the database
-            pattern_pos = self._find_occurrences(self.tree, pattern)
+        # Update the CT parameters
+        CT.update()
+        self.CT = CT
 
-            # Prune occurrences using covering rules
-            pruned_pos = self._prune_occurrences(
-                self.C, pattern_pos, pattern)
+        return
 
-            # Cover the data
-            self._assign_occurrences(pruned_pos, pattern)
+    def update(self, CT):
+        """
+        Incrementally update the cover after a single pattern was added 
+        to or removed from the CT, usually a CTView.
+
+        Only the patterns at or after the slot of the change in Cover 
+        Order can be affected. Their cells are freed and they are 
+        covered again, in Cover Order, on top of the cover of the 
+        unaffected patterns. The singleton usage is updated from the 
+        symbols of the cells that changed hands.
+
+        The patterns themselves are not modified: their new usage, gaps 
+        and fills are passed to CT.update(). Every change is recorded as 
+        a snapshot of the previous cover, which is restored with 
+        rollback() or discarded with commit().
+        """
+
+        # Cover Order with the change and slot of the change
+        order, keys, slot = self._cover_order(CT)
+
+        # Snapshot of the cover
+        self._log = log = {
+            'order': self.order,
+            'keys': self.keys,
+            'store': self.store.copy(),
+            'written': self.written.copy(),
+            'singleton_usage': self.singleton_usage.copy(),
+            'stats': {},
+        }
+
+        # Free the cells of the affected patterns
+        freed = self._pattern_cells(self.order[slot:])
+        log['freed'] = (freed, self._C.ravel()[freed], self._C_index.ravel()[freed])
+        self._C.ravel()[freed] = -1
+        self._C_index.ravel()[freed] = -1
+        for pattern in self.order[slot:]:
+            del self.store[pattern]
+            del self.written[pattern]
+
+        # Cover the data again with the affected patterns
+        self.order, self.keys = order, keys
+        for pattern in order[slot:]:
+            log['stats'][pattern] = self._cover_pattern(pattern)
+        taken = self._pattern_cells(order[slot:])
+        log['taken'] = taken
+
+        # Singletons get the freed cells that were not taken again
+        self.singleton_usage += \
+            np.bincount(self.D.ravel()[freed], minlength=len(self.index)) - \
+            np.bincount(self.D.ravel()[taken], minlength=len(self.index))
+        changed = np.nonzero(self.singleton_usage != log['singleton_usage'])[0]
+        for pattern in self.singletons[changed]:
+            if pattern is not None:
+                log['stats'][pattern] = (
+                    self.singleton_usage[pattern.symbols[0]], 0, 0
+                )
+
+        # Update the CT parameters
+        CT.update(log['stats'])
+
+        return
+
+    def _cover_order(self, CT):
+        """
+        Larger patterns of a CT in Cover Order, their sort keys and the 
+        slot of the change in Cover Order, see update().
+
+        The Cover Order of the CT the cover is in sync with is kept, so 
+        that the order of a view of this CT only needs the slot of the 
+        pattern added or removed, found by bisection on the sort keys. 
+        Other CTs are sorted again, see CT.sort_cover_order().
+        """
+
+        if getattr(CT, 'base', None) is self.CT:
+
+            if CT.added is not None and len(CT.added) > 1:
+                key = self._key(CT.added)
+                slot = bisect_right(self.keys, key)
+                return self.order[:slot] + [CT.added] + self.order[slot:], \
+                    self.keys[:slot] + [key] + self.keys[slot:], slot
+
+            if CT.removed is not None and len(CT.removed) > 1:
+                slot = bisect_left(self.keys, self._key(CT.removed))
+                while self.order[slot] is not CT.removed:
+                    slot += 1
+                return self.order[:slot] + self.order[slot+1:], \
+                    self.keys[:slot] + self.keys[slot+1:], slot
+
+            return self.order, self.keys, len(self.order)
+
+        CT.sort_cover_order()
+        order = [CT[i] for i in CT.i_sort if len(CT[i]) > 1]
+        keys = [self._key(pattern) for pattern in order]
+
+        slot = 0
+        while (slot < min(len(order), len(self.order))) and \
+                (order[slot] is self.order[slot]):
+            slot += 1
+
+        return order, keys, slot
+
+    @staticmethod
+    def _key(pattern):
+        """
+        Sort key of a pattern in Cover Order: descending length first,
+        then the symbol codes, see CT.sort_cover_order().
+        """
+
+        return (-len(pattern.symbols), tuple(pattern.symbols.tolist()))
+
+    def commit(self, CT):
+        """
+        Keep the cover computed by the last update() and apply it to the 
+        patterns of the CT the change was committed to.
+
+        Pattern ids may have changed if a pattern was removed from the 
+        CT, in which case the ids in the planes are synchronized.
+        """
+
+        for pattern, stats in self._log['stats'].items():
+            pattern.update(*stats)
+
+        self._log = None
+
+        # Pattern ids may have changed
+        self._sync_ids(self.order)
+
+        # Update the CT parameters
+        CT.update()
+        self.CT = CT
+
+        return
+
+    def rollback(self):
+        """
+        Restore the cover as it was before the last update().
+        """
+
+        log = self._log
+
+        # Restore the planes
+        self._C.ravel()[log['taken']] = -1
+        self._C_index.ravel()[log['taken']] = -1
+        cells, ids, index = log['freed']
+        self._C.ravel()[cells] = ids
+        self._C_index.ravel()[cells] = index
+
+        # Restore the bookkeeping of the patterns
+        self.order = log['order']
+        self.keys = log['keys']
+        self.store = log['store']
+        self.written = log['written']
+        self.singleton_usage = log['singleton_usage']
+
+        self._log = None
+
+        return
+
+    def extend(self, D, CT, n=None):
+        """
+        Extend the cover to new columns appended to the database, 
+        without covering the data again from scratch.
+
+        D = the extended database, its first columns being the previous
+        database. The SymbolIndex must have been extended beforehand.
+        n = if not None, D is a buffer and the extended database is its 
+        first n columns. The planes are only copied when the buffer is 
+        replaced by a larger one.
+
+        The occurrences of the first pattern in Cover Order which start 
+        more than 2*t - 2 columns before the new columns can not reach 
+        them, and nor can the occurrences they compete with, which come 
+        earlier in the greedy order. They are thus the same as with a 
+        cover from scratch. The next pattern only sees a different cover 
+        in the columns after this boundary, so its own boundary is 
+        2*t - 2 columns earlier, and so on. The occurrences that start 
+        after the last boundary are freed and covered again, in Cover 
+        Order, and the singleton usage is updated from the columns after 
+        this boundary only.
+        """
+
+        n_old = self.size[1]
+        start = max(0, n_old - sum(2*pattern.t - 2 for pattern in self.order))
+
+        # Singletons of the columns covered again, before the update
+        singleton_usage = self.singleton_usage - np.bincount(
+            self._uncovered(start, n_old), minlength=len(self.index))
+
+        # Extend the database and the planes
+        self.size = (D.shape[0], D.shape[1] if n is None else n)
+        if D.shape[1] != self.D.shape[1]:
+            for name in ('_C', '_C_index'):
+                plane = np.full(D.shape, -1, dtype=np.int32)
+                plane[:, :n_old] = getattr(self, name)[:, :n_old]
+                setattr(self, name, plane)
+        self.D = D
+
+        # Free the occurrences after the boundary, the occurrences being
+        # sorted by start column
+        kept = {}
+        for pattern in self.order:
+            occurrences = self.store[pattern]
+            kept[pattern] = int(np.searchsorted(occurrences.start, start))
+            freed = occurrences[kept[pattern]:].cells(self.D.shape[1])
+            self._C.ravel()[freed] = -1
+            self._C_index.ravel()[freed] = -1
+
+        # Cover them again, on top of the occurrences kept
+        for pattern in self.order:
+            pattern.update(*self._cover_pattern(pattern, start, kept[pattern]))
+
+        # Singletons cover the remaining cells
+        self.singleton_usage = singleton_usage + np.bincount(
+            self._uncovered(start, self.size[1]), minlength=len(self.index))
+        for pattern in self.singletons[self.singleton_ids >= 0]:
+            pattern.update(self.singleton_usage[pattern.symbols[0]], 0, 0)
+
+        # Update the CT parameters
+        CT.update()
+        self.CT = CT
+
+        return
+
+    def evict(self, D, evicted, CT, n=None):
+        """
+        Remove the first columns of the database from the cover, 
+        without covering the data again from scratch.
+
+        D = the database without its first evicted columns. The 
+        SymbolIndex must have been updated beforehand.
+        n = if not None, D is a buffer and the database is its first n 
+        columns, see extend().
+
+        Removing the first occurrences changes the greedy choices of 
+        the occurrences that overlapped them, which can change the 
+        choices of the following occurrences, and so on. The occurrences 
+        which start in the first columns of the new database are thus 
+        covered again, in Cover Order, see _cover_prefix(). If the cells 
+        after these columns that are covered by these occurrences are 
+        the same as before, the rest of the cover is the same as a cover 
+        from scratch. Otherwise, more columns are covered again.
+        """
+
+        n = D.shape[1] if n is None else n
+        margin = sum(2*pattern.t - 2 for pattern in self.order)
+
+        # Previous occurrences in the columns of the new database
+        old = {pattern: self.store[pattern].cols - evicted for pattern in self.order}
+
+        end = max(margin, 1)
+        while True:
+
+            # The whole database has to be covered again
+            if end >= n:
+                self.D, self.size = D, (D.shape[0], n)
+                self.cover(CT)
+                return
+
+            prefix = self._cover_prefix(n, old, end, margin)
+            if prefix is not None:
+                break
+            end *= 2
+
+        # Only the columns before end + margin changed
+        width = min(n, end + margin)
+        singleton_usage = self.singleton_usage - np.bincount(
+            self._uncovered(0, evicted+width), minlength=len(self.index))
+
+        # Remove the first columns of the database and the planes
+        for name in ('_C', '_C_index'):
+            plane = np.full(D.shape, -1, dtype=np.int32)
+            plane[:, :n] = getattr(self, name)[:, evicted:evicted+n]
+            setattr(self, name, plane)
+        self.D, self.size = D, (D.shape[0], n)
+
+        # Replace the occurrences which start before end
+        for pattern in self.order:
+            rows = np.broadcast_to(pattern.channels, old[pattern].shape)
+            before = old[pattern][:, 0] < end
+            cols = old[pattern][before]
+            self._C[rows[before][cols >= 0], cols[cols >= 0]] = -1
+            self._C_index[rows[before][cols >= 0], cols[cols >= 0]] = -1
+
+        for pattern in self.order:
+            cols = prefix[pattern]
+            rows = np.broadcast_to(pattern.channels, cols.shape)
+            self._C[rows, cols] = pattern.id
+            self._C_index[rows, cols] = np.arange(len(pattern))
+
+            occurrences = Occurrences(pattern, np.concatenate(
+                [cols, old[pattern][old[pattern][:, 0] >= end]]))
+            self.store[pattern] = occurrences
+
+            counts = len(occurrences)
+            pattern.update(counts, int(np.sum(occurrences.gaps)),
+                           (pattern.t-1) * counts)
+
+        # Singletons cover the remaining cells
+        self.singleton_usage = singleton_usage + np.bincount(
+            self._uncovered(0, width), minlength=len(self.index))
+        for pattern in self.singletons[self.singleton_ids >= 0]:
+            pattern.update(self.singleton_usage[pattern.symbols[0]], 0, 0)
 
         # Update the CT parameters
         CT.update()
+        self.CT = CT
+
+        return
+
+    def _cover_prefix(self, n, old, end, margin):
+        """
+        Occurrences of each pattern of the cover starting before column 
+        end of a new database of n columns, given the previous 
+        occurrences old starting after end. See evict().
 
-        return self.C
+        These occurrences can only use the cells of the first end + margin 
+        columns. For each pattern in Cover Order, they are searched 
+        among the cells left by the previous patterns, i.e. by their new 
+        occurrences and their previous occurrences starting after end.
+
+        Returns None if the cells after end covered by these occurrences 
+        are not the same as with the previous ones.
+        """
+
+        width = min(n, end + margin)
+        C = np.full((self.size[0], width), -1, dtype=np.int32)
+
+        prefix = {}
+        for pattern in self.order:
+
+            # Occurrences starting before end, among the cells left
+            pattern_pos = self._find_occurrences(self.index, pattern, stop=width)
+            pattern_pos[0] = (pattern_pos[0][0],
+                              pattern_pos[0][1][pattern_pos[0][1] < end])
+            pruned_pos = self._prune_occurrences(C, pattern_pos, pattern)
+            cells = pattern.channels.astype(np.intp) * width + pruned_pos
+            accepted = self._first_disjoint(cells)
+            C.ravel()[cells[accepted]] = pattern.id
+            prefix[pattern] = cols = pruned_pos[accepted]
+
+            # Same cells after end
+            rows = np.broadcast_to(pattern.channels, cols.shape)
+            new_cells = np.sort((rows * width + cols)[cols >= end])
+            previous = old[pattern][(old[pattern][:, 0] >= 0) &
+                                    (old[pattern][:, 0] < end)]
+            rows = np.broadcast_to(pattern.channels, previous.shape)
+            old_cells = np.sort((rows * width + previous)[previous >= end])
+            if not np.array_equal(new_cells, old_cells):
+                return None
+
+            # The occurrences after end are the same as before
+            kept = old[pattern][old[pattern][:, 0] >= end]
+            rows = np.broadcast_to(pattern.channels, kept.shape)
+            in_prefix = kept < width
+            C[rows[in_prefix], kept[in_prefix]] = pattern.id
+
+        return prefix
+
+    @property
+    def C(self):
+        """
+        Id of the pattern covering each cell (-1 if not covered).
+        """
+
+        C, D = self._C[:, :self.size[1]], self.D[:, :self.size[1]]
+
+        return np.where(C >= 0, C, self.singleton_ids[D])
+
+    @property
+    def C_index(self):
+        """
+        Index of the symbol covering each cell in its pattern.
+        """
+
+        C, D = self._C[:, :self.size[1]], self.D[:, :self.size[1]]
+
+        return np.where(C >= 0, self._C_index[:, :self.size[1]],
+                        np.where(self.singleton_ids[D] >= 0, 0, -1))
+
+    def _cover_pattern(self, pattern, start=0, kept=None):
+        """
+        Cover the data with a single pattern, on top of the current cover.
+
+        Only the occurrences starting at or after column start are 
+        searched, on top of the first kept occurrences of the pattern in
+        the store, see extend().
+
+        Returns the usage, gaps and fills of the pattern.
+        """
+
+        # Find all occurrences of the pattern in the database
+        pattern_pos = self._find_occurrences(self.index, pattern, start)
+
+        # Prune occurrences using covering rules
+        pruned_pos = self._prune_occurrences(self._C, pattern_pos, pattern)
+
+        # Cover the data
+        return self._assign_occurrences(pruned_pos, pattern, kept)
+
+    def _pattern_cells(self, patterns):
+        """
+        Flat index of all the cells covered by a list of patterns.
+        """
+
+        if len(patterns) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        return np.concatenate([self.store[pattern].cells(self.D.shape[1]).ravel()
+                               for pattern in patterns])
+
+    def _sync_ids(self, patterns):
+        """
+        Rewrite the cells of the patterns which id changed since they 
+        were written in the planes.
+        """
+
+        for pattern in patterns:
+            if self.written[pattern] != pattern.id:
+                self._C.ravel()[self.store[pattern].cells(self.D.shape[1])] = \
+                    pattern.id
+                self.written[pattern] = pattern.id
+
+        return
 
     @staticmethod
-    def _find_occurrences(tree, pattern):
+    def _find_occurrences(index, pattern, start=0, stop=None):
         """
         Find all occurences of a specific pattern in a sequence using 
-        a suffix tree.
+        the symbol position index, at or after column start and before
+        column stop.
 
-        Return a list of tuples like (id_seq, list(pos)) where pos are 
-        the positions of the symbols in the sequence.
+        Return a list of tuples like (id_seq, pos) where pos is the sorted 
+        array of the positions of the symbol in the sequence.
 
         E.g. 
-            if the pattern is "a0a0" and "a0" occurs at 
+            if the pattern is "a0a0" (codes [0, 0]) and "a0" occurs at 
             positions = [0, 1, 2, 4]
             the function will return
             pattern_pos = [
@@ -83,16 +555,15 @@ class Cover:
 
         # Retrieve the occurrences of each symbol in the pattern
         pattern_pos = []
-        for symbol in pattern.symbols:
-
-            # Which time series this symbol belongs to
-            id_seq = int(symbol[-1])
+        for symbol, id_seq in zip(pattern.symbols, pattern.channels):
 
-            # Find occurences of the symbol
-            _, positions = tree.find_motifs(symbol)
-
-            # Store the results
-            pattern_pos.append((id_seq, [pos // 2 for pos in positions]))
+            # Store the (already sorted) occurences of the symbol
+            positions = index[symbol]
+            if start > 0:
+                positions = positions[np.searchsorted(positions, start):]
+            if stop is not None:
+                positions = positions[:np.searchsorted(positions, stop)]
+            pattern_pos.append((id_seq, positions))
 
         return pattern_pos
 
@@ -108,11 +579,19 @@ class Cover:
         The cartesian product is only computed if the symbol does not overlap
         with already covered data in C.
 
-        Here we use a recursive function called recursive pruning to loop 
-        over lists of size > 2. 
-        _prune_occurrences cannot be used as a recursive function by itself 
-        because of a mismatch in shape between the pattern_pos and 
-        the returned pruned_pos.
+        The product is built as a join, one symbol at a time. The partial 
+        occurrences are kept in an array of shape (n_occurrences x k) and, 
+        for each of them, the valid positions of the next symbol form a 
+        contiguous slice of its sorted position array: they must come at 
+        or after the position of the previous symbol and strictly before 
+        first position + 2*t - 1. Both slice bounds are found with 
+        np.searchsorted. A cell can not be used twice by the same occurrence.
+
+        Returns an int array of shape (n_occurrences x n_symbols) with the 
+        column of each symbol, in lexicographic order. The row of each 
+        symbol is given by pattern.channels. The occurrences thus come in 
+        order of position, and no longer in the order in which the suffix 
+        tree returned the positions, see _assign_occurrences().
 
         If we suppose that the cover C is empty, here are two examples.
         E.g. 1:
@@ -123,10 +602,10 @@ class Cover:
             ]
             the function should return
             pruned_pos = [
-                [(0, 0), (0, 1)],
-                [(0, 0), (0, 2)], # gap between the 1st symbol and 2nd symbol
-                [(0, 1), (0, 2)],
-                [(0, 2), (0, 4)], # gap between the 1st symbol and 2nd symbol
+                [0, 1],
+                [0, 2], # gap between the 1st symbol and 2nd symbol
+                [1, 2],
+                [2, 4], # gap between the 1st symbol and 2nd symbol
             ]
 
         E.g. 2:
@@ -137,179 +616,160 @@ class Cover:
             ]
             the function should return
             pruned_pos = [
-                [(0, 0), (1, 0)],
-                [(0, 0), (1, 1)],
-                [(0, 1), (1, 1)],
-                [(0, 1), (1, 2)],
-                [(0, 2), (1, 2)]
+                [0, 0],
+                [0, 1],
+                [1, 1],
+                [1, 2],
+                [2, 2]
             ]
 
         """
 
-        # If there is only one symbol in the pattern, then we have nothing to do
-        if len(pattern_pos) == 1:
-            return [[(pattern_pos[0][0], pos)] for pos in pattern_pos[0][1]]
-
-        # Otherwise we start to prune the positions
-        else:
-            pruned_pos = []
-
-            # Iterate over the positions of the first symbol
-            for off1 in pattern_pos[0][1]:
-                id_off1 = pattern_pos[0][0]
-
-                # Check if the position of the symbol does not overlap with elements in the cover
-                if C[id_off1, off1] != '':
-                    # If it overlaps, move on to the next position
-                    continue
-
-                # Iterate over the positions of the second symbol
-                for off2 in pattern_pos[1][1]:
-                    id_off2 = pattern_pos[1][0]
-
-                    # Check if the position of the symbol does not overlap with elements in the cover
-                    if C[id_off2, off2] != '':
-                        # If it overlaps, move on to the next position
-                        continue
-
-                    # Assure directed pattern + Maximum gap criteria
-                    if (off2-off1 >= 0) and ((off2-off1+1) < 2*pattern.t):
-
-                        # If both symbol are in the same sequence, their position cannot match
-                        if id_off1 == id_off2:
-                            pruned_pos += [[(id_off1, off1),
-                                            (id_off2, off2)]] if off1 != off2 else []
-                        else:
-                            pruned_pos += [[(id_off1, off1),
-                                            (id_off2, off2)]]
-
-        # If there are only two symbols or if we couldn't find any pattern, we stop here
-        if (len(pattern_pos) == 2) or (pruned_pos == []):
-            return pruned_pos
-
-        # Otherwise we continue with a recursive function
-        else:
-            return Cover._recursive_prune_occurrences(C, pattern_pos[2:], pruned_pos, pattern)
-
-    @staticmethod
-    def _recursive_prune_occurrences(C, pattern_pos, pruned_pos, pattern):
-        """
-        Actual recursive function used by _prune_occurrences for lists of size > 2.
-        See _prune_occurrences for details on the process. 
-        """
-
-        if pattern_pos == []:
-            return pruned_pos
-
-        else:
-            # Iterate over the positions of the pruned list: the position of interest is
-            # the position of the last symbol in the pattern
+        # Position of the first symbol that can not be reached anymore
+        # from the first symbol of an occurrence
+        max_gap = 2*pattern.t - 1
 
-            new_pruned_pos = []
+        # Remove the positions that overlap with elements in the cover
+        positions = [pos[C[id_seq, pos] < 0] for id_seq, pos in pattern_pos]
+        rows = pattern.channels
 
-            for _, pruned in enumerate(pruned_pos):
+        # Partial occurrences, one row per occurrence
+        pruned_pos = positions[0][:, None]
 
-                # Iterate over the second symbol positions
-                for off in pattern_pos[0][1]:
-                    id_off = pattern_pos[0][0]
+        for k in range(1, len(positions)):
 
-                    # Check if the position of the symbol does not overlap with elements in the cover
-                    if C[id_off, off] != '':
-                        # If it overlaps, move on to the next position
-                        continue
+            # If we couldn't find any pattern, we stop here
+            if len(pruned_pos) == 0:
+                return np.empty((0, len(positions)), dtype=pruned_pos.dtype)
 
-                    # Assure directed pattern + maximum gap criteria
-                    try:
-                        if (off-pruned[1][1] >= 0) and ((off-pruned[0][1]+1) < 2*pattern.t):
+            # Slice of valid positions for each partial occurrence
+            # Assure directed pattern + maximum gap criteria
+            lo = np.searchsorted(positions[k], pruned_pos[:, -1], side='left')
+            hi = np.searchsorted(positions[k], pruned_pos[:, 0] + max_gap,
+                                 side='left')
+            counts = np.maximum(hi - lo, 0)
 
-                            # If both symbol are in the same sequence, their positions cannot match
-                            if id_off == pruned[1][0]:
-                                new_pruned_pos += [pruned +
-                                                   [(id_off, off)]] if off != pruned[1][1] else []
-                            else:
-                                new_pruned_pos += [pruned +
-                                                   [(id_off, off)]]
+            # Expand each partial occurrence with its slice
+            parent = np.repeat(np.arange(len(pruned_pos)), counts)
+            offset = np.arange(len(parent)) - \
+                np.repeat(np.cumsum(counts) - counts, counts)
+            pruned_pos = np.column_stack(
+                (pruned_pos[parent], positions[k][lo[parent] + offset])
+            )
 
-                    except:
-                        print('Something went wrong here')
+            # If two symbols are in the same sequence, their positions cannot match
+            same_seq = np.nonzero(rows[:k] == rows[k])[0]
+            if same_seq.size:
+                pruned_pos = pruned_pos[np.all(
+                    pruned_pos[:, same_seq] != pruned_pos[:, [k]], axis=1
+                )]
 
-            # Recursion
-            return Cover._recursive_prune_occurrences(C, pattern_pos[1:], new_pruned_pos, pattern)
+        return pruned_pos
 
-    def _assign_occurrences(self, pruned_pos, pattern):
+    def _assign_occurrences(self, pruned_pos, pattern, kept=None):
         """
         Iterate over all available positions of the pattern and cover 
-        the data (using the index of the pattern in the CT). 
+        the data (using the index of the pattern in the CT). If kept is
+        not None, the first kept occurrences of the pattern in the store
+        are kept from the previous cover and come first. The others are 
+        replaced, their cells must have been freed, see extend().
 
-        Iteratively updates the usage, gaps and fills arrays.
+        Returns the usage, gaps and fills of the pattern.
 
         E.g.
             For the first pattern in the CT with:
             pruned_pos = [
-                [(0, 0), (0, 1)],
-                [(0, 0), (0, 2)],
-                [(0, 1), (0, 2)],
-                [(0, 2), (0, 4)],
+                [0, 1],
+                [0, 2],
+                [1, 2],
+                [2, 4],
             ]
             Then, the cover for this part of the data is:
-            C = ["0", "0", "0", "", "0"]
+            C = [0, 0, 0, -1, 0]
                 |____|    |________|
                 1st         2nd        occurrences
+
+        The occurrences are tried in the order of pruned_pos, i.e. the 
+        leftmost first. When two occurrences overlap, the cover thus keeps 
+        the one that starts first, while it used to keep the one found 
+        first in the suffix tree. The cover of patterns with overlapping 
+        occurrences may differ from the one of the previous versions.
         """
 
+        # Flat index of the cells used by each occurrence
+        cells = pattern.channels.astype(np.intp) * self.D.shape[1] + pruned_pos
+
+        # The occurrences only contain cells that were not covered before this
+        # pattern, but two occurrences of the pattern may overlap
+        accepted = self._first_disjoint(cells)
+
+        # Cover the data
+        self._C.ravel()[cells[accepted]] = pattern.id
+        self._C_index.ravel()[cells[accepted]] = np.arange(len(pattern))
+        if kept is None:
+            occurrences = Occurrences(pattern, pruned_pos[accepted])
+            gap = int(np.sum(occurrences.gaps))
+
+        # The gaps of the occurrences kept are those of the pattern but 
+        # the gaps of the occurrences replaced
+        else:
+            occurrences = self.store[pattern]
+            gap = pattern.gaps - int(np.sum(occurrences.gaps[kept:]))
+            occurrences.append(pattern, pruned_pos[accepted], kept)
+            gap += int(np.sum(occurrences.gaps[kept:]))
+
+        self.store[pattern] = occurrences
+        self.written[pattern] = pattern.id
+
         # Keep track of interesting values for the MDL principle
-        counts, gap = 0, 0
-
-        for positions in pruned_pos:
-
-            # We can't directly append each position to C because one of the position could
-            # overlap with the previous so we need to keep track of the symbol positions and
-            # then, once we're sure that the whole pattern can be placed, add the pattern to
-            # the cover
-            ok_to_append = True
-            to_append = []
-            symbol_count = 0
-
-            for i, position in positions:
-
-                # If the cover is not empty, we should not cover the data with the pattern
-                if self.C[i, position] != "":
-                    ok_to_append = False
-                    break
-
-                else:
-                    # Heren there is a case that is actually pretty common (and took me a while to figure
-                    # out that it was a problem...). The idea is that for instance with the pattern a0a1a0
-                    # with a layout like this : a0 a0
-                    #                           a1
-                    # the _recursive_prune_occurrences function, when given
-                    # pruned_pos = [[(0, 0), (1, 0)]] has no problem giving a result like
-                    # new_pruned_pos = [[(0, 0), (1, 0), (0, 0)]] when adding the last a0 since
-                    # it only checks if the two last symbols belong to different time series
-                    # This condition prevents just that
-                    to_append_limited = []
-                    for ii, jj, _ in to_append:
-                        to_append_limited.append((ii, jj))
-                    if (i, position) in to_append_limited:
-                        ok_to_append = False
-                        break
-
-                    else:
-                        to_append += [(i, position,
-                                       pattern.name[symbol_count % (len(pattern))])]
-                        symbol_count += 2
-
-            # If we're clear to append
-            if ok_to_append == True:
-                for i, position, symbol in to_append:
-                    self.C[i, position] = str(pattern.id) + '_' + symbol
-
-                # Update interesting variables
-                counts += 1
-                if len(to_append) > 1:
-                    gap += to_append[-1][1] - to_append[0][1] - pattern.t + 1
-
-        # Update pattern parameters
-        pattern.update(counts, gap, (pattern.t-1) * counts)
+        counts = len(occurrences)
 
-        return
+        return counts, gap, (pattern.t-1) * counts
+
+    @staticmethod
+    def _first_disjoint(cells):
+        """
+        Index of the occurrences kept when two occurrences overlap: we
+        greedily keep the first one.
+        """
+
+        if np.unique(cells).size == cells.size:
+            return np.arange(len(cells))
+
+        used = set()
+        accepted = []
+        for i, occurrence_cells in enumerate(cells.tolist()):
+            if used.isdisjoint(occurrence_cells):
+                used.update(occurrence_cells)
+                accepted.append(i)
+
+        return np.array(accepted, dtype=np.intp)
+
+    def _uncovered(self, start, stop):
+        """
+        Symbols of the cells of the columns start to stop which are not
+        covered by the larger patterns.
+        """
+
+        return self.D[:, start:stop][self._C[:, start:stop] < 0]
+
+    def is_complete(self):
+        """
+        Return True if every cell of the data is covered, i.e. if there
+        is a singleton for every symbol left.
+        """
+
+        return not np.any(self.singleton_usage[self.singleton_ids < 0])
+
+    def occurrences(self, pattern):
+        """
+        Occurrences of a pattern in the cover, see the Occurrences class.
+        """
+
+        # Singletons cover the cells left by the other patterns
+        if len(pattern) == 1:
+            cols = self.index[pattern.symbols[0]]
+            cols = cols[self._C[pattern.channels[0], cols] < 0]
+            return Occurrences(pattern, cols)
+
+        return self.store[pattern]
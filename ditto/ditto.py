@@ -4,10 +4,19 @@ from .classes.candidates import Candidates
 from .variations import variations
 from .cover import Cover
 from .prune import prune
-from .tree import Tree
+from .tree import Tree, CompactTree
 from .classes.MDL import MDL
 from .classes.ST import ST
+from .classes.vocabulary import Vocabulary
+from .classes.index import SymbolIndex, CoOccurrences
+from .classes.suffix_array import SuffixArray
 from .classes.CT import CT
+from .parallel import SpeculativeEvaluator
+from .storage import save_index, load_index
+from .ingest import array_chunks, frame_chunks, file_chunks
+
+from itertools import islice
+from pathlib import Path
 
 import pandas as pd
 import numpy as np
@@ -15,23 +24,49 @@ import numpy as np
 
 class Ditto:
 
-    def __init__(self, D):
+    def __init__(self, D, suffix_index='tree', chunk_size=2**16):
         """
-        D = database to process.
+        D = database to process, see _get_D().
+        suffix_index = index of the substrings of D, either 'tree' for 
+        a generalized suffix tree, 'compact_tree' for the same tree 
+        stored as arrays or 'suffix_array' for a suffix array, which is
+        much lighter on long time series.
+        chunk_size = number of timesteps of D read and encoded at once.
         """
 
-        # Store D as a numpy array
-        self.D = self._get_D(D)
+        # Store D as a numpy array of (channel, symbol) codes
+        self.vocabulary, self.D = Vocabulary.from_chunks(
+            self._get_D(D, chunk_size))
         self.size = self.D.shape
 
-        # Create a generalized suffix tree from D
-        self.tree = self._get_tree(self.D)
+        # Generalized suffix tree or suffix array of D, only built on
+        # first access since the mining doesn't use it, see tree
+        self.suffix_index = suffix_index
+        self.tree = None
+
+        # Index the positions of each symbol, shared by all cover passes
+        self.index = SymbolIndex.from_database(self.D, len(self.vocabulary))
+
+        # Co-occurrences of the symbols within the max gap of the 
+        # candidates, used to discard candidates that can't occur. They
+        # are counted from the index for the candidates streamed only
+        self.cooccurrences = CoOccurrences(self.index)
+
+        self._init_tables()
+
+    def _init_tables(self, usage=None):
+        """
+        Initiate the cover, the code tables and the MDL object.
+
+        usage = usage of the singletons in the cover by the ST, if 
+        already known, see ST.
+        """
 
         # Initiate an empty cover
-        self.cover = Cover(self.size, self.tree)
+        self.cover = Cover(self.D, self.index)
 
         # Initiate the singleton code table (ST)
-        self.ST = ST(self.D, self.cover)
+        self.ST = ST(self.vocabulary, self.cover, usage)
 
         # Initiate the code table (CT)
         self.CT = CT(self.ST)
@@ -39,62 +74,238 @@ class Ditto:
         # Initiate a MDL object for the encoded length computations
         self.MDL = MDL(self.ST, self.cover)
 
-    def process(self):
+        return
+
+    @property
+    def tree(self):
+        """
+        Suffix structure of D, see suffix_index.
+        """
+        if self._tree is None:
+            self._tree = self._get_tree(self.D, self.suffix_index)
+        return self._tree
+
+    @tree.setter
+    def tree(self, tree):
+        self._tree = tree
+
+    def save(self, path):
+        """
+        Save the index of the database in a directory: the encoded 
+        database and its vocabulary, the suffix structure, the symbol 
+        positions and the usage of the singletons.
+
+        Only the array-based suffix indexes, i.e. 'compact_tree' and 
+        'suffix_array', can be saved.
+        """
+
+        if self.suffix_index == 'tree':
+            raise ValueError(
+                "The 'tree' suffix index can't be saved, use 'compact_tree' "
+                "or 'suffix_array' instead."
+            )
+
+        tree, attributes = self.tree.to_arrays()
+
+        arrays = {
+            'D': self.D,
+            'channels': self.vocabulary.channels,
+            'values': self.vocabulary.values,
+            'usage': self.ST.usage
+        }
+        arrays.update(self.index.to_arrays())
+        arrays.update({f'tree.{name}': array for name, array in tree.items()})
+
+        save_index(path, {'suffix_index': self.suffix_index, 'tree': attributes},
+                   arrays)
+
+        return
+
+    @classmethod
+    def load(cls, path):
+        """
+        Ditto object of a database from an index saved by save(), 
+        without building the suffix structure and covering the 
+        database again. The arrays are memory-mapped, see load_index().
+        """
+
+        manifest, arrays = load_index(path)
+
+        self = cls.__new__(cls)
+        self.vocabulary = Vocabulary(arrays['channels'], arrays['values'])
+        self.D = arrays['D']
+        self.size = self.D.shape
+
+        # Suffix structure
+        self.suffix_index = manifest['suffix_index']
+        Index = {'compact_tree': CompactTree, 'suffix_array': SuffixArray}
+        self.tree = Index[self.suffix_index].from_arrays(
+            {name[len('tree.'):]: array for name, array in arrays.items()
+             if name.startswith('tree.')},
+            manifest['tree']
+        )
+
+        # Symbol positions and co-occurrences
+        self.index = SymbolIndex(arrays['indptr'], arrays['positions'])
+        self.cooccurrences = CoOccurrences(self.index)
+
+        self._init_tables(arrays['usage'])
+
+        return self
+
+    def process(self, n_jobs=1, gain_bound=None, min_support=1,
+                max_variation_depth=None, variation_budget=None):
         """
         Run the Ditto algorithm, inspired by Bertens et. al. (2016).
+
+        n_jobs = number of processes used to evaluate the candidates.
+        With n_jobs > 1, the next candidates are evaluated speculatively
+        in parallel and the first beneficial one in Candidate Order is
+        accepted, so the results are the same as with n_jobs = 1.
+
+        gain_bound = if not None, the candidates which estimated gain is
+        lower than gain_bound times the decrease of the encoded length 
+        required by the MDL are not evaluated. The estimated gain is 
+        not a true bound on the actual gain, hence this is disabled by
+        default. The number of skipped evaluations is stored in 
+        self.skipped_covers.
+
+        min_support = the candidates which can not occur at least 
+        min_support times, according to the co-occurrences of their
+        symbols in D, are discarded. A candidate that can't occur can't 
+        be beneficial, so the default of 1 does not change the results.
+
+        max_variation_depth, variation_budget = if not None, maximum 
+        depth of the variants of variants explored and maximum number 
+        of variants evaluated after each accepted candidate, see 
+        variations().
         """
 
         # Generate a set of candidate patterns of all pairwise combinations of
         # singletons and sort the candidates in 'Candidate Order'
         print('\n*** Generating and sorting candidates ***')
-        candidates = Candidates(self.ST, self.CT)
+        candidates = Candidates(self.ST, self.CT, self.cooccurrences, min_support)
 
-        # Loop over all candidates
-        print('*** Iterating through potential candidates ***')
-        i_candidate = 0
-        while i_candidate < len(candidates):
+        evaluator = SpeculativeEvaluator(self.MDL, n_jobs) if n_jobs > 1 else None
 
-            # Current candidate
-            candidate = candidates[i_candidate]
+        try:
 
-            print('\tCandidate being investigated =', candidate)
-
-            # MDL computations
-            self.MDL.compare(self.CT, candidate)
-
-            # If adding this new candidate decreases the total encoded length, we keep it
-            if self.MDL.is_beneficial:
+            # Loop over all candidates
+            print('*** Iterating through potential candidates ***')
+            stream = self._stream(candidates, gain_bound)
+            candidate = self._next_beneficial(stream, evaluator)
+            while candidate is not None:
 
+                # Adding this new candidate decreases the total encoded length, we keep it
                 print(f"-> Retained candidate = '{candidate}'")
 
                 # Prune CT
                 print('*** Pruning ***')
-                prune(self.CT, self.MDL)
+                prune(self.CT, self.MDL, evaluator)
 
                 # Test whether to add variations
                 print('*** Variations ***')
                 variations(self.MDL, self.CT, candidate,
-                           candidates=[], candidates_usage=[])
+                           max_depth=max_variation_depth, budget=variation_budget,
+                           evaluator=evaluator)
 
                 # Update the candidate set
                 print('\n*** Generating and sorting new set of candidates ***')
-                candidates = Candidates(self.ST, self.CT)
+                candidates.update(self.CT)
                 # print('Candidate set after sorting =', candidates, '\n')
 
                 print('*** Iterating through potential candidates ***')
                 self.CT.has_changed = True
-                i_candidate = 0
+                stream = self._stream(candidates, gain_bound)
+                candidate = self._next_beneficial(stream, evaluator)
+
+        finally:
+            if evaluator is not None:
+                evaluator.close()
 
-            else:
-                i_candidate += 1
+        # The candidates skipped in the last pass were never evaluated
+        self.skipped_covers = candidates.skipped
+        if gain_bound is not None:
+            print(f'{self.skipped_covers} evaluations skipped by the gain bound.')
 
         print('\nNo more gain in the compression with the current set of candidates.')
 
         return
 
+    def _stream(self, candidates, gain_bound=None):
+        """
+        Stream of the candidates to evaluate in Candidate Order.
+
+        With a gain_bound, the stream stops at the first candidate 
+        which estimated gain is lower than gain_bound times the gain 
+        required by the MDL. The estimated gains are negative, i.e. 
+        decreases of the encoded length.
+        """
+
+        if gain_bound is None:
+            return candidates.stream()
+
+        # Any complete cover is accepted if the base is not complete
+        required = self.MDL.required_gain(self.CT)
+        if not np.isfinite(required):
+            return candidates.stream()
+
+        return candidates.stream(max_gain=-gain_bound*required)
+
+    def _next_beneficial(self, stream, evaluator=None):
+        """
+        Consume the candidates until one leads to a gain in compression.
+        This candidate is added to the CT and returned. Returns None if
+        no candidate is beneficial.
+        """
+
+        # Serial evaluation
+        if evaluator is None:
+
+            for candidate in stream:
+
+                print('\tCandidate being investigated =', candidate)
+
+                # MDL computations
+                self.MDL.compare(self.CT, candidate)
+
+                if self.MDL.is_beneficial:
+                    return candidate
+
+            return None
+
+        # Speculative evaluation of the next candidates in parallel
+        pending = []
+        while True:
+
+            batch = pending + list(islice(stream, evaluator.batch_size - len(pending)))
+            pending = []
+            if not batch:
+                return None
+
+            i = evaluator.first_beneficial(self.CT, batch)
+
+            for candidate in batch[:len(batch) if i is None else i]:
+                print('\tCandidate being investigated =', candidate)
+
+            if i is not None:
+
+                # Add the candidate to the CT
+                candidate = batch[i]
+                print('\tCandidate being investigated =', candidate)
+                self.MDL.compare(self.CT, candidate)
+
+                if self.MDL.is_beneficial:
+                    return candidate
+
+                # The candidate was not accepted against the CT, the scan
+                # goes on with the candidates after it
+                pending = batch[i+1:]
+
     def get_results(self):
         """
-        Get cover with the final CT.
+        Get cover with the final CT, i.e. the id of the pattern
+        covering each cell of D.
         Also return a DataFrame with the patterns in the CT 
         in Cover Order.
         """
@@ -128,56 +339,88 @@ class Ditto:
         by id_pattern.
         """
 
-        show_cover(self.get_cover(self.CT), self.CT, id_pattern, letters)
+        self.get_cover(self.CT)
+
+        show_cover(self.cover, self.CT, id_pattern, letters)
 
         return
 
     @staticmethod
-    def _get_D(D):
+    def _get_D(D, chunk_size=2**16):
         """
         Type checking for input database D.
 
-        Also encodes each symbol as 'symbol_i' where 'i'
-        is the index of the time series in D.
+        The symbols are encoded afterwards as integer
+        (channel, symbol) codes, see the Vocabulary class.
 
         Accepts either:
-            - a list of strings.
+            - a list of strings, or of lists of symbols.
             - a numpy array of shape (N x n) with N the number 
             of time series and n the length of each time series.
             - a pandas DataFrame. In that case, all columns except
             a potential column 't' are kept.
-
-        Always returns a numpy array of shape (N x n).
+            - the path of a .npy file containing an array of shape 
+            (N x n), which is memory-mapped.
+            - the path of a .csv or .parquet file, with the same 
+            layout as a DataFrame, which is read chunk_size rows at 
+            a time.
+
+        Always returns a function returning an iterable over blocks 
+        of chunk_size columns of D, as numpy arrays of shape (N x k), 
+        see Vocabulary.from_chunks().
         """
 
         # List
         if isinstance(D, list):
-            return np.array([[symbol+str(i) for symbol in l]
-                             for i, l in enumerate(D)])
+
+            # Split strings of the same length into characters at once
+            if D and all(isinstance(l, str) for l in D):
+                if len(set(map(len, D))) > 1:
+                    raise ValueError('Expected time series of the same length.')
+                D = np.array(D)
+                return array_chunks(D.view('<U1').reshape(len(D), -1), chunk_size)
+
+            return array_chunks(np.array([list(l) for l in D]), chunk_size)
 
         # Numpy array
         elif isinstance(D, np.ndarray):
             assert D.shape[0] < D.shape[1], 'Expected D of shape (N x n).'
-            return np.array([[symbol+str(i) for symbol in l]
-                             for i, l in enumerate(D)])
+            return array_chunks(D, chunk_size)
 
         # Pandas DataFrame
         elif isinstance(D, pd.core.frame.DataFrame):
-            return np.array([[symbol+str(i) for i, symbol in enumerate(symbols)]
-                             for key, symbols in D.iteritems() if key != 't'])
+            return frame_chunks(D, chunk_size)
+
+        # File on disk
+        elif isinstance(D, (str, Path)):
+            return file_chunks(D, chunk_size)
 
         else:
             raise RuntimeError('Invalid input type for D.')
             return
 
     @staticmethod
-    def _get_tree(D):
+    def _get_tree(D, suffix_index='tree'):
         """
         Constructs a generalized suffix tree from D.
 
-        First converts each row of an array of characters into a string,
-        i.e. ['a', 'b', 'c'] --> 'abc'.
+        Each row of codes is added as a sequence of integers,
+        i.e. [0, 1, 2] --> (0, 1, 2).
+
+        With suffix_index='compact_tree', the tree is stored as arrays.
+        With suffix_index='suffix_array', a suffix array with the 
+        same find_all/find_motifs interface is built instead.
         """
 
-        return Tree({f'S{i}': ''.join(symbol for symbol in time_series)
+        if suffix_index == 'suffix_array':
+            return SuffixArray.from_database(D)
+
+        if suffix_index == 'compact_tree':
+            return CompactTree({f'S{i}': time_series.tolist()
+                                for i, time_series in enumerate(D)})
+
+        if suffix_index != 'tree':
+            raise ValueError(f'Unknown suffix index {suffix_index!r}.')
+
+        return Tree({f'S{i}': time_series.tolist()
                      for i, time_series in enumerate(D)})
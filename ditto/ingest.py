@@ -0,0 +1,100 @@
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+
+def array_chunks(D, chunk_size):
+    """
+    Blocks of chunk_size columns of an array D of shape (N x n),
+    e.g. a memory-mapped .npy file.
+    """
+
+    def chunks():
+        for start in range(0, D.shape[1], chunk_size):
+            yield np.asarray(D[:, start:start+chunk_size])
+
+    return chunks
+
+
+def frame_chunks(D, chunk_size):
+    """
+    Blocks of chunk_size rows of a DataFrame, as arrays of shape (N x k).
+    """
+
+    def chunks():
+        for start in range(0, len(D), chunk_size):
+            yield _frame_to_array(D.iloc[start:start+chunk_size])
+
+    return chunks
+
+
+def csv_chunks(path, chunk_size):
+    """
+    Blocks of chunk_size rows of a CSV file, read one at a time.
+
+    The symbols are read as strings: pandas infers the type of each
+    column per block, so e.g. a column of digits with letters further
+    down would otherwise give blocks of ints and blocks of strings.
+    """
+
+    def chunks():
+        with pd.read_csv(path, chunksize=chunk_size, dtype=str,
+                         keep_default_na=False) as reader:
+            for frame in reader:
+                yield _frame_to_array(frame)
+
+    return chunks
+
+
+def parquet_chunks(path, chunk_size):
+    """
+    Blocks of chunk_size rows of a Parquet file, read one at a time.
+    Requires pyarrow.
+    """
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Reading Parquet files requires pyarrow.')
+
+    def chunks():
+        file = pq.ParquetFile(path)
+        columns = [key for key in file.schema_arrow.names if key != 't']
+        for batch in file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas().to_numpy().T
+
+    return chunks
+
+
+def file_chunks(path, chunk_size):
+    """
+    Blocks of columns of a database stored in a .npy, .csv or .parquet
+    file. A .npy file contains an array of shape (N x n) and is
+    memory-mapped. In CSV and Parquet files, each column is a time
+    series, except a potential column 't'.
+    """
+
+    suffix = Path(path).suffix.lower()
+
+    if suffix == '.npy':
+        D = np.load(path, mmap_mode='r')
+        assert D.shape[0] < D.shape[1], 'Expected D of shape (N x n).'
+        return array_chunks(D, chunk_size)
+
+    if suffix == '.csv':
+        return csv_chunks(path, chunk_size)
+
+    if suffix in ('.parquet', '.pq'):
+        return parquet_chunks(path, chunk_size)
+
+    raise ValueError(f'Unsupported file type {suffix!r} for D.')
+
+
+def _frame_to_array(frame):
+    """
+    Time series of a DataFrame, all columns except a potential column
+    't', as an array of shape (N x k).
+    """
+
+    return frame[[key for key in frame.columns if key != 't']].to_numpy().T
@@ -0,0 +1,289 @@
+from .classes.index import SymbolIndex
+from .classes.pattern import Pattern
+
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+import pickle
+import io
+
+
+class SharedState:
+    """
+    Data and base state of the algorithm in shared memory.
+
+    The database D and the SymbolIndex never change, they are copied
+    once into shared memory blocks that the workers attach to.
+
+    The base state, i.e. the MDL object (with its cover, in sync with
+    the CT) and the CT, changes every time a change is committed to
+    the CT. It is pickled into a new shared memory block, without D
+    and the SymbolIndex, and given a new version number. Each worker
+    only unpickles it once per version.
+    """
+
+    def __init__(self, MDL):
+
+        self.MDL = MDL
+        self.blocks = {}
+
+        # Constant arrays, see _attach() for the worker side
+        self.arrays = {
+            name: self._share(array) for name, array in [
+                ('D', MDL.cover.D),
+                ('indptr', MDL.cover.index.indptr),
+                ('positions', MDL.cover.index.positions),
+                ('ends', MDL.cover.index.ends)
+            ]
+        }
+
+        # Base state
+        self.version = 0
+        self.state = None
+
+    def publish(self, CT):
+        """
+        Pickle the base state into shared memory.
+        """
+
+        buffer = io.BytesIO()
+        _Pickler(buffer, self.MDL.cover).dump((self.MDL, CT))
+        data = buffer.getbuffer()
+
+        # Replace the previous base state
+        if self.state is not None:
+            self._release(self.state[0])
+
+        self.version += 1
+        self.state = (self._share(np.frombuffer(data, dtype=np.uint8))[0],
+                      len(data))
+
+        return
+
+    def close(self):
+        """
+        Release all shared memory blocks.
+        """
+
+        for name in list(self.blocks):
+            self._release(name)
+
+        return
+
+    def _share(self, array):
+        """
+        Copy an array into a new shared memory block.
+        """
+
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self.blocks[block.name] = block
+
+        return block.name, array.shape, array.dtype.str
+
+    def _release(self, name):
+        block = self.blocks.pop(name)
+        block.close()
+        block.unlink()
+
+
+class SpeculativeEvaluator:
+    """
+    Evaluate the next candidates concurrently in a pool of processes.
+
+    Each candidate is tested by a worker against the same base state,
+    see SharedState. The candidates are then scanned in Candidate Order
+    and the first beneficial one is returned, i.e. the same candidate
+    as the one the serial algorithm would have accepted. The candidates
+    after it are cancelled, their evaluation was speculative.
+
+    The removal of patterns from the CT during the pruning step is 
+    evaluated the same way, in Pruning Order.
+    """
+
+    def __init__(self, MDL, n_jobs, batch_size=None):
+
+        self.MDL = MDL
+        self.batch_size = batch_size or 4*n_jobs
+
+        self.shared = SharedState(MDL)
+        self.pool = ProcessPoolExecutor(
+            n_jobs, initializer=_init_worker, initargs=(self.shared.arrays,)
+        )
+
+        # CT, patterns and base length of the published base state
+        self.published = None
+
+    def first_beneficial(self, CT, candidates):
+        """
+        Index of the first beneficial candidate of a batch, None if no
+        candidate is beneficial.
+        """
+
+        return self._first(CT, _evaluate_candidate,
+                           [candidate.symbols for candidate in candidates])
+
+    def first_removal(self, CT, patterns):
+        """
+        Index of the first pattern of the CT which removal is beneficial,
+        None if no removal is beneficial.
+        """
+
+        return self._first(CT, _evaluate_removal,
+                           [pattern.id for pattern in patterns])
+
+    def _first(self, CT, function, arguments):
+        """
+        Evaluate the trials in parallel and return the index of the 
+        first beneficial one.
+        """
+
+        # Same base length as the serial algorithm
+        self.MDL.update_base(CT)
+
+        # The base state must be published again after any change
+        if not self._is_published(CT):
+            self.shared.publish(CT)
+            self.published = (CT, list(CT.patterns), self.MDL.base_length)
+
+        futures = [
+            self.pool.submit(function, self.shared.version, self.shared.state,
+                             argument)
+            for argument in arguments
+        ]
+
+        try:
+            for i, future in enumerate(futures):
+                if future.result():
+                    return i
+
+        finally:
+
+            # Wait for the running evaluations, the base state can't be
+            # released while a worker may still be reading it
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+        return None
+
+    def _is_published(self, CT):
+        """
+        Whether the published base state is the current one. The cover
+        and the encoded lengths are kept in sync with the patterns of 
+        the CT, so comparing them and the base length is enough.
+        """
+
+        if self.published is None:
+            return False
+
+        published_CT, patterns, base_length = self.published
+
+        return (published_CT is CT) and (base_length == self.MDL.base_length) \
+            and (len(patterns) == len(CT.patterns)) \
+            and all(p is q for p, q in zip(patterns, CT.patterns))
+
+    def close(self):
+
+        self.pool.shutdown()
+        self.shared.close()
+
+        return
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Pickle the base state without the arrays already in shared memory.
+    """
+
+    def __init__(self, file, cover):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.cover = cover
+
+    def persistent_id(self, obj):
+        if obj is self.cover.D:
+            return 'D'
+        if obj is self.cover.index:
+            return 'index'
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def persistent_load(self, pid):
+        return _worker[pid]
+
+
+# State of a worker process, see _init_worker()
+_worker = {}
+
+
+def _attach(name, shape, dtype):
+    """
+    Array view of a shared memory block.
+    """
+
+    block = shared_memory.SharedMemory(name=name)
+    _worker.setdefault('blocks', []).append(block)
+
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _init_worker(arrays):
+    """
+    Attach a worker to the constant arrays in shared memory.
+    """
+
+    _worker['D'] = _attach(*arrays['D'])
+    _worker['index'] = SymbolIndex(_attach(*arrays['indptr']),
+                                   _attach(*arrays['positions']),
+                                   _attach(*arrays['ends']))
+    _worker['version'] = None
+
+    return
+
+
+def _load(version, state):
+    """
+    Base state of a given version, only unpickled once per version.
+    """
+
+    if _worker['version'] != version:
+        name, size = state
+        block = shared_memory.SharedMemory(name=name)
+        try:
+            _worker['MDL'], _worker['CT'] = _Unpickler(
+                io.BytesIO(bytes(block.buf[:size]))).load()
+        finally:
+            block.close()
+        _worker['version'] = version
+
+    return _worker['MDL'], _worker['CT']
+
+
+def _evaluate_candidate(version, state, symbols):
+    """
+    Test whether adding a candidate to the base state is beneficial.
+    """
+
+    MDL, CT = _load(version, state)
+
+    # Same trial as MDL.compare(), always rolled back
+    beneficial = MDL.evaluate(CT.with_candidate(Pattern(symbols, CT.vocabulary)))
+    MDL.cover.rollback()
+
+    return beneficial
+
+
+def _evaluate_removal(version, state, id_pattern):
+    """
+    Test whether removing a pattern from the base state is beneficial.
+    """
+
+    MDL, CT = _load(version, state)
+
+    # Same trial as MDL.prune(), always rolled back
+    beneficial = MDL.evaluate(CT.without_pattern(CT[id_pattern]))
+    MDL.cover.rollback()
+
+    return beneficial
@@ -2,7 +2,7 @@
 import numpy as np
 
 
-def prune(CT, MDL):
+def prune(CT, MDL, evaluator=None):
     """
     After the acceptance of a new pattern in our code table other patterns may have become
     redundant if their role has been overtaken by the newer pattern. Therefore, each
@@ -12,6 +12,11 @@ def prune(CT, MDL):
     First, we sort the patterns with decreased usage. Then, for each pattern, we check if
     the encoded length is smaller or greater without the pattern. If the encoded length is
     smaller when the pattern is absent, we remove the pattern from CT.
+
+    If a SpeculativeEvaluator is given, the removals are evaluated in
+    parallel against the same CT and the first beneficial one in Pruning 
+    Order is applied. The following removals are then evaluated again
+    against the pruned CT, so the result is the same as the serial one.
     """
 
     print('\tCT before pruning =', CT.patterns)
@@ -34,20 +39,46 @@ def prune(CT, MDL):
     CT.has_changed = False
 
     # Iterate over the patterns in 'Prune Order'
-    for id_pattern in sort_indexes:
-        # print('Pattern =', CT[id_pattern], 'id_pattern =', id_pattern, 'usage =', usage[id_pattern])
+    if evaluator is None:
+
+        for id_pattern in sort_indexes:
+            # print('Pattern =', CT[id_pattern], 'id_pattern =', id_pattern, 'usage =', usage[id_pattern])
+
+            # We force singletons to stay in the CT
+            if len(CT[id_pattern]) > 1:
+
+                # If the pattern has a usage of zero, we can't remove it but we don't compute the length
+                # The length should be the same with or without it anyway
+                if usage[id_pattern] == 0:
+                    continue
 
-        # We force singletons to stay in the CT
-        if len(CT[id_pattern]) > 2:
+                # Encoded length computations
+                usage, sort_indexes = MDL.prune(CT, CT[id_pattern],
+                                                usage, sort_indexes)
 
-            # If the pattern has a usage of zero, we can't remove it but we don't compute the length
-            # The length should be the same with or without it anyway
-            if usage[id_pattern] == 0:
-                continue
+    else:
+
+        # Same selection as above
+        patterns = [CT[id_pattern] for id_pattern in sort_indexes
+                    if (len(CT[id_pattern]) > 1) and (usage[id_pattern] != 0)]
+
+        while patterns:
+
+            # First beneficial removal against the current CT
+            i = evaluator.first_removal(CT, patterns)
+            if i is None:
+                break
 
             # Encoded length computations
-            usage, sort_indexes = MDL.prune(CT, CT[id_pattern],
-                                            usage, sort_indexes)
+            pattern = patterns[i]
+            usage, sort_indexes = MDL.prune(CT, pattern, usage, sort_indexes)
+
+            # Each pattern is tried once, as in the serial pruning. If
+            # the removal was not accepted against the CT, the CT is
+            # unchanged and the scan goes on after the pattern
+            if not MDL.is_beneficial:
+                print(f'\tPattern {pattern} is kept in the CT')
+            patterns = patterns[i+1:]
 
     print('\tCT after pruning =', CT.patterns)
 
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import numpy as np
+import json
+
+
+# Version of the on-disk layout, increased on any incompatible change
+FORMAT_VERSION = 1
+
+
+def save_index(path, manifest, arrays):
+    """
+    Save an index in a directory:
+        - manifest.json = format version and the attributes of the index.
+        - <name>.npy = each array of the index.
+    """
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    for name, array in arrays.items():
+        np.save(path / f'{name}.npy', np.asarray(array))
+
+    manifest = dict(manifest, format='ditto-index', version=FORMAT_VERSION,
+                    arrays=sorted(arrays))
+    with open(path / 'manifest.json', 'w') as file:
+        json.dump(manifest, file, indent=1)
+
+    return
+
+
+def load_index(path, mmap_mode='r'):
+    """
+    Load an index saved by save_index().
+
+    The arrays are memory-mapped, so only the pages actually read are
+    loaded from the disk. Arrays of Python objects, e.g. the symbols of
+    a DataFrame, can't be memory-mapped and are read in memory.
+
+    Returns the manifest and a dictionary of arrays.
+    """
+
+    path = Path(path)
+
+    with open(path / 'manifest.json') as file:
+        manifest = json.load(file)
+
+    if manifest.get('format') != 'ditto-index':
+        raise ValueError(f'{path} is not a Ditto index.')
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported index version {manifest.get('version')} in {path}, "
+            f'expected version {FORMAT_VERSION}. The index must be built again.'
+        )
+
+    arrays = {}
+    for name in manifest['arrays']:
+        try:
+            arrays[name] = np.load(path / f'{name}.npy', mmap_mode=mmap_mode)
+        except ValueError:
+            arrays[name] = np.load(path / f'{name}.npy', allow_pickle=True)
+
+    return manifest, arrays
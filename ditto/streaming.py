@@ -0,0 +1,275 @@
+from .ditto import Ditto
+from .classes.MDL import Lengths
+
+import numpy as np
+
+
+class StreamingDitto(Ditto):
+    """
+    Ditto on a database which grows with new timesteps.
+
+    New columns are appended to every time series with append(). The
+    symbol position index, the singleton usage and the cover are 
+    extended for the new columns only, see Cover.extend(), and the CT 
+    is kept as it is.
+
+    The candidate search, i.e. process(), is only run again when the
+    compression ratio of the CT, see compression_ratio(), drifted by
+    more than a fraction drift of its value at the end of the last
+    search.
+
+    The symbols of the new columns must already be in the vocabulary
+    of the database, which is fixed by the first columns.
+
+    The suffix structure is not used by the search, it is built again
+    from the whole database on first access after an append, see 
+    Ditto.tree.
+    """
+
+    def __init__(self, D, drift=0.05, **kwargs):
+        """
+        D = first columns of the database, see Ditto.
+        drift = relative change of the compression ratio above which the
+        candidate search is run again after an append.
+        The other arguments are passed to Ditto.
+        """
+
+        super().__init__(D, **kwargs)
+
+        self._init_stream(drift)
+
+    @classmethod
+    def load(cls, path, drift=0.05):
+        """
+        StreamingDitto object of a database from an index saved by 
+        save(), see Ditto.load().
+        drift = see __init__().
+        """
+
+        self = super().load(path)
+        self._init_stream(drift)
+
+        return self
+
+    def _init_stream(self, drift):
+        """
+        Initiate the state kept between the appends.
+        """
+
+        self.drift = drift
+
+        # Arguments and compression ratio of the last search
+        self.process_kwargs = None
+        self.ratio = None
+
+        # The database is the first columns of a buffer with room for 
+        # the next ones, see _extend()
+        self._buffer = self.D
+
+        return
+
+    def process(self, **kwargs):
+        """
+        Run the Ditto algorithm, see Ditto.process(). The arguments are
+        kept for the next searches triggered by append().
+        """
+
+        super().process(**kwargs)
+
+        self.process_kwargs = kwargs
+        self.ratio = self.compression_ratio()
+
+        return
+
+    def append(self, D):
+        """
+        Append new columns to the database.
+
+        D = new timesteps of every time series, either a numpy array of
+        shape (N x k) or any other input accepted by Ditto.
+
+        Returns True if the candidate search was run again.
+        """
+
+        self._extend(self.vocabulary.encode_database(self._get_columns(D)))
+
+        # Search for new candidates if the compression drifted
+        if self.ratio is None:
+            return False
+
+        ratio = self.compression_ratio()
+        if abs(ratio - self.ratio) <= self.drift*self.ratio:
+            return False
+
+        print(f'\nCompression ratio drifted from {self.ratio:.4f} to {ratio:.4f}.')
+        self.process(**self.process_kwargs)
+
+        return True
+
+    def _extend(self, codes):
+        """
+        Append new encoded columns to the database, its indexes and the 
+        cover of the CT.
+
+        The columns are written in the room left in the buffer of the 
+        database. A full buffer is replaced by one twice the size needed,
+        so that the cost of the copies is amortized over the next appends.
+        The cover planes and the symbol index grow the same way.
+        """
+
+        n, k = self.size[1], codes.shape[1]
+
+        # The cover is extended from the cover of the CT
+        if self.cover.CT is not self.CT:
+            self.cover.cover(self.CT)
+
+        # Extend the database and its indexes
+        if n + k > self._buffer.shape[1]:
+            buffer = np.empty((self.size[0], 2*(n + k)), dtype=self.D.dtype)
+            buffer[:, :n] = self.D
+            self._buffer = buffer
+        self._buffer[:, n:n+k] = codes
+        self.D = self._buffer[:, :n+k]
+        self.size = self.D.shape
+        self.index.extend(codes, n)
+        self.tree = None
+
+        self.ST.extend(codes)
+        self.cover.extend(self._buffer, self.CT, n + k)
+        self._reset_lengths()
+
+        return
+
+    def _reset_lengths(self):
+        """
+        Encoded lengths of the CT after a change of the database. The 
+        code lengths of the symbols depend on the singleton usage.
+        """
+
+        self.MDL.lengths = Lengths(self.ST)
+        self.MDL.lengths.reset(self.CT)
+        self.CT.has_changed = True
+
+        return
+
+    def compression_ratio(self):
+        """
+        Total encoded length of the database with the CT divided by the
+        total encoded length with the ST only.
+        """
+
+        # The encoded lengths are those of the CT in the cover
+        if self.cover.CT is not self.CT:
+            self.cover.cover(self.CT)
+            self.MDL.lengths.reset(self.CT)
+
+        ST_lengths = Lengths(self.ST)
+        ST_lengths.reset(self.ST)
+
+        return (self.MDL.lengths.L_D + self.MDL.lengths.L_CT) / \
+            (ST_lengths.L_D + ST_lengths.L_CT)
+
+    def _get_columns(self, D):
+        """
+        New columns as a numpy array of shape (N x k).
+        """
+
+        if not isinstance(D, np.ndarray):
+            D = np.concatenate(list(self._get_D(D)()), axis=1)
+
+        if (D.ndim != 2) or (D.shape[0] != self.size[0]):
+            raise ValueError(f'Expected new columns of shape ({self.size[0]} x k).')
+
+        return D
+
+
+class WindowedDitto(StreamingDitto):
+    """
+    Ditto on the last timesteps of a stream, see StreamingDitto.
+
+    The database, its indexes and the cover only hold the last columns
+    of the stream: when more than window + slack columns are held, the
+    oldest ones are evicted down to window columns. The CT is kept
+    across slides, and the cover is only computed again for the first
+    columns left, see Cover.evict().
+
+    Evicting columns costs a copy of the window, hence the slack: the
+    cost of an eviction is spread over the slack columns it evicts.
+    With slack = 0, the window is exact but each append copies it.
+    """
+
+    def __init__(self, D, window, slack=None, **kwargs):
+        """
+        D = first columns of the stream, only the last window columns
+        are kept.
+        window = number of columns mined.
+        slack = number of columns held on top of the window before an
+        eviction, a quarter of the window by default.
+        The other arguments are passed to StreamingDitto.
+        """
+
+        super().__init__(D, **kwargs)
+
+        self._init_window(window, slack)
+
+    @classmethod
+    def load(cls, path, window, slack=None, drift=0.05):
+        """
+        WindowedDitto object of a stream from an index saved by save(),
+        see Ditto.load(). Only the last window columns are kept.
+        window, slack, drift = see __init__().
+        """
+
+        self = super().load(path, drift)
+        self._init_window(window, slack)
+
+        return self
+
+    def _init_window(self, window, slack):
+        """
+        Set the window and evict the columns before it.
+        """
+
+        self.window = window
+        self.slack = window // 4 if slack is None else slack
+
+        if self.size[1] > window:
+            self._evict(self.size[1] - window)
+
+        return
+
+    def _extend(self, codes):
+
+        super()._extend(codes)
+
+        if self.size[1] > self.window + self.slack:
+            self._evict(self.size[1] - self.window)
+
+        return
+
+    def _evict(self, n):
+        """
+        Remove the first n columns of the database, its indexes and the
+        cover of the CT.
+        """
+
+        # The cover is updated from the cover of the CT
+        if self.cover.CT is not self.CT:
+            self.cover.cover(self.CT)
+
+        # Columns left, in a new buffer of the same size
+        m = self.size[1] - n
+        buffer = np.empty(self._buffer.shape, dtype=self.D.dtype)
+        buffer[:, :m] = self.D[:, n:]
+
+        self.ST.evict(self.D[:, :n])
+        self.index.evict(n)
+        self.cover.evict(buffer, n, self.CT, m)
+
+        self._buffer = buffer
+        self.D = buffer[:, :m]
+        self.size = self.D.shape
+        self.tree = None
+        self._reset_lengths()
+
+        return
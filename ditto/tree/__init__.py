@@ -4,5 +4,6 @@
 """ Package """
 
 from .tree import Tree, Path
+from .compact import CompactTree
 
 __title__ = "suffix-tree"
@@ -5,8 +5,6 @@
 
 """
 
-from .util import Path
-
 
 class Builder (object):
     """Base class for all builders."""
@@ -24,16 +22,7 @@ class Builder (object):
         For Ukkonen-style builders.
         """
 
-        def f (node):
-            """ helper """
-            if node.is_leaf ():
-                # Turn the variable :math:`e` into a constant because
-                # the next string added will use :math:`e` again.
-                # pylint: disable=protected-access
-                if node.path._end == Path.inf:
-                    node.path._end = M
-
-        self.tree.root.pre_order (f)
+        self.tree.fixup_e (M)
 
 
     def build (self):
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+#
+
+"""
+A Generalized Suffix Tree stored as a structure of arrays.
+
+The object tree allocates an :class:`Internal` or :class:`Leaf` object per
+node, each with its own ``__dict__``, a :class:`Path` and a ``children``
+dict.  Here the nodes are integers indexing a few flat arrays:
+
+- ``parent``, ``suffix_link``: node index, -1 for none.
+- ``edge_start``, ``edge_end``: the label of the edge going into the node,
+  as a slice of ``text``, the concatenation of all the strings.
+- ``string_id``: the string the node label was taken from.
+- ``child_ptr``, ``child_symbol``, ``child_node``: a CSR child table, the
+  children of node ``v`` are ``child_node[child_ptr[v]:child_ptr[v+1]]``,
+  sorted by the first symbol of their edge.
+
+The strings must be sequences of non-negative integers.  The unique end
+character of the :math:`k`-th string is stored as :math:`-(k+1)`.
+
+The tree is filled by the usual builders through :class:`NodeRef` handles,
+which expose the interface of the node objects on top of growable arrays.
+The child table is compacted once all the strings are added.
+
+>>> tree = CompactTree ({ 'A' : [0, 1, 2, 0, 1, 3] })
+>>> tree.find ([1, 2, 0])
+True
+>>> tree.find ([1, 2, 3])
+False
+>>> tree.find_motifs ([0, 1])
+(2, array([0, 3]))
+
+"""
+
+import array
+import numpy as np
+
+from . import ukkonen
+from .util import Path, QueryTrie, UniqueEndChar
+
+
+class CompactTree (object):
+    """ A generalized suffix tree stored as a structure of arrays. """
+
+    def __init__ (self, d = None, builder = ukkonen.Builder):
+        """ Initialize and build the tree from a dict of iterables.
+
+        :param dict d: a dictionary of id: iterable of non-negative integers
+        """
+
+        d = d or {}
+
+        # Strings, the root path refers to the empty string 0
+        self.ids     = [None]
+        self.strings = [tuple ()]
+        self._sid    = { id (self.strings[0]) : 0 }
+
+        # Node arrays, filled while building
+        self._string = array.array ('q')
+        self._start  = array.array ('q')
+        self._end    = array.array ('q')
+        self._parent = array.array ('q')
+        self._link   = array.array ('q')
+        self._leaf   = array.array ('b')
+
+        # (node, symbol) => child, compacted by _freeze ()
+        self._children = {}
+
+        self.root = self.new_internal (None, Path (self.strings[0], 0, 0), name = 'root')
+
+        for id_, S in d.items ():
+            path = Path.from_iterable (list (S) + [UniqueEndChar (id_)])
+            self.ids.append (id_)
+            self.strings.append (path.S)
+            self._sid[id (path.S)] = len (self.strings) - 1
+            builder (self, id_, path).build ()
+
+        self._freeze ()
+
+    # Builder interface
+
+    def new_leaf (self, parent, str_id, path): # pylint: disable=unused-argument
+        """ Create a leaf, used by the builders. """
+        return self._new_node (parent, path, True)
+
+    def new_internal (self, parent, path, **kw): # pylint: disable=unused-argument
+        """ Create an internal node, used by the builders. """
+        return self._new_node (parent, path, False)
+
+    def _new_node (self, parent, path, is_leaf):
+        i = len (self._start)
+        self._string.append (self._sid[id (path.S)])
+        self._start.append (path.start)
+        self._end.append (path._end) # pylint: disable=protected-access
+        self._parent.append (-1 if parent is None else parent.i)
+        self._link.append (-1)
+        self._leaf.append (is_leaf)
+        return NodeRef (self, i)
+
+    def fixup_e (self, M):
+        """ Turn the open end :math:`e` of the leaves into the constant M. """
+        end = np.frombuffer (self._end, dtype = np.int64)
+        end[end == Path.inf] = M
+        del end
+
+    def _freeze (self):
+        """ Compact the nodes into flat numpy arrays and a CSR child table. """
+
+        # Concatenated strings, the end characters are negative
+        lengths = [len (S) for S in self.strings]
+        self.offsets = np.concatenate (([0], np.cumsum (lengths)))
+        self.text = np.empty (self.offsets[-1], dtype = np.int64)
+        for k, S in enumerate (self.strings[1:], start = 1):
+            self.text[self.offsets[k]:self.offsets[k+1]-1] = S[:-1]
+            self.text[self.offsets[k+1]-1] = -k
+
+        string = np.frombuffer (self._string, dtype = np.int64)
+        start  = np.frombuffer (self._start,  dtype = np.int64)
+        end    = np.frombuffer (self._end,    dtype = np.int64)
+        parent = np.frombuffer (self._parent, dtype = np.int64)
+
+        # String depth of each node and label of its incoming edge
+        depth = end - start
+        parent_depth = np.where (parent >= 0, depth[np.maximum (parent, 0)], 0)
+        self.string_id  = string.astype (np.int32)
+        self.edge_start = (self.offsets[string] + start + parent_depth).astype (np.int64)
+        self.edge_end   = (self.offsets[string] + end).astype (np.int64)
+        self.depth      = depth.astype (np.int32)
+        self.parent     = parent.astype (np.int32)
+        self.suffix_link = np.frombuffer (self._link, dtype = np.int64).astype (np.int32)
+        self.is_leaf    = np.frombuffer (self._leaf, dtype = np.int8).astype (bool)
+
+        # CSR child table sorted by node, then by first symbol
+        n_nodes = len (self.depth)
+        nodes   = np.fromiter ((k[0] for k in self._children), dtype = np.int64,
+                               count = len (self._children))
+        child   = np.fromiter (self._children.values (), dtype = np.int64,
+                               count = len (self._children))
+        symbol  = self.text[self.edge_start[child]]
+        order   = np.lexsort ((symbol, nodes))
+        self.child_node   = child[order].astype (np.int32)
+        self.child_symbol = symbol[order]
+        self.child_ptr    = np.zeros (n_nodes + 1, dtype = np.int64)
+        np.cumsum (np.bincount (nodes, minlength = n_nodes), out = self.child_ptr[1:])
+
+        # Release the build structures
+        del self._string, self._start, self._end, self._parent, self._link, self._leaf
+        del self._children, self._sid
+        self.strings = None
+        self.root = 0
+
+        self._index_leaves ()
+
+    # Persistence
+
+    _arrays = ('text', 'offsets', 'string_id', 'edge_start', 'edge_end', 'depth',
+               'parent', 'suffix_link', 'is_leaf', 'child_ptr', 'child_symbol',
+               'child_node', 'leaf_lo', 'leaf_hi', 'leaf_positions')
+
+    def to_arrays (self):
+        """ Arrays and attributes of the tree, see :meth:`from_arrays`. """
+
+        return { name : getattr (self, name) for name in self._arrays }, \
+            { 'ids' : list (self.ids) }
+
+    @classmethod
+    def from_arrays (cls, arrays, attributes):
+        """ Tree from the output of :meth:`to_arrays`, e.g. memory-mapped
+        arrays, without building it again. """
+
+        self = cls.__new__ (cls)
+        for name in cls._arrays:
+            setattr (self, name, arrays[name])
+        self.ids = list (attributes['ids'])
+        self.strings = None
+        self.root = 0
+        return self
+
+    # Queries
+
+    def find_path (self, path):
+        """Find a path of integers in the tree.
+
+        Returns the deepest node on the path, the matched length of the path,
+        and also the next deeper node if the matched length is longer than the
+        string-depth of the deepest node on the path (None otherwise).
+
+        """
+
+        node = 0
+        matched_len = 0
+        while matched_len < len (path):
+            # find the edge to follow
+            lo, hi = self.child_ptr[node], self.child_ptr[node + 1]
+            j = lo + np.searchsorted (self.child_symbol[lo:hi], path[matched_len])
+            if j == hi or self.child_symbol[j] != path[matched_len]:
+                # no edge to follow
+                return node, matched_len, None
+            child = self.child_node[j]
+
+            # follow the edge
+            edge = self.text[self.edge_start[child]:self.edge_end[child]]
+            query = path[matched_len:matched_len + len (edge)]
+            mismatch = np.flatnonzero (edge[:len (query)] != query)
+            matched_len += mismatch[0] if len (mismatch) else len (query)
+            if matched_len < self.depth[child]:
+                # the path ends between node and child
+                return node, matched_len, child
+            # we reached child, loop
+            node = child
+        # path exhausted
+        return node, matched_len, None
+
+    def find (self, iterable):
+        """ Return True if the path of integers is found. """
+
+        path = np.asarray (iterable, dtype = np.int64)
+        dummy_node, matched_len, dummy_child = self.find_path (path)
+        return bool (matched_len == len (path))
+
+    def _index_leaves (self):
+        """Number the leaves in depth-first order.
+
+        The offsets of the leaves in their string are stored in
+        ``leaf_positions`` in depth-first order, and the leaves below node
+        ``v`` are ``leaf_positions[leaf_lo[v]:leaf_hi[v]]``.
+
+        """
+
+        n_nodes = len (self.depth)
+        self.leaf_lo = np.zeros (n_nodes, dtype = np.int64)
+        self.leaf_hi = np.zeros (n_nodes, dtype = np.int64)
+        child_ptr = self.child_ptr.tolist ()
+        child_node = self.child_node.tolist ()
+        is_leaf = self.is_leaf.tolist ()
+
+        leaves = []
+        stack = [(0, False)]
+        while stack:
+            node, visited = stack.pop ()
+            if visited:
+                self.leaf_hi[node] = len (leaves)
+                continue
+            self.leaf_lo[node] = len (leaves)
+            if is_leaf[node]:
+                leaves.append (node)
+                self.leaf_hi[node] = len (leaves)
+            else:
+                # push the children in reverse order to pop them in order
+                stack.append ((node, True))
+                stack.extend ((child, False) for child in
+                              reversed (child_node[child_ptr[node]:child_ptr[node + 1]]))
+
+        leaves = np.array (leaves, dtype = np.int64)
+        self.leaf_positions = self.edge_end[leaves] - self.depth[leaves] \
+            - self.offsets[self.string_id[leaves]]
+        self.leaf_positions.flags.writeable = False
+
+    def find_motifs (self, motif):
+        """
+        Finds the number of times a motif is repeated in the tree.
+        Returns the counts and the offset of the matches in their string,
+        starting at 0, as a read-only slice of ``leaf_positions``.
+        """
+
+        path = np.asarray (motif, dtype = np.int64)
+        node, matched_len, child = self.find_path (path)
+
+        # We fell off the tree: zero occurrence of the motif
+        if matched_len < len (path):
+            return 0, self.leaf_positions[:0]
+
+        if child is not None:
+            node = child
+
+        return int (self.leaf_hi[node] - self.leaf_lo[node]), \
+            self.leaf_positions[self.leaf_lo[node]:self.leaf_hi[node]]
+
+    def find_motifs_batch (self, motifs):
+        """
+        Same as :meth:`find_motifs` for many motifs at once.  The motifs are
+        gathered in a :class:`QueryTrie`, so that the traversal of their
+        common prefixes in the tree is shared.
+
+        Returns a list of (counts, offsets) in the order of the motifs.
+        """
+
+        def step (state, symbol):
+            """ Extend the match of a prefix by one symbol. """
+            node, matched_len, child = state
+            if child is None:
+                # we are on a node, find the edge to follow
+                lo, hi = self.child_ptr[node], self.child_ptr[node + 1]
+                j = lo + np.searchsorted (self.child_symbol[lo:hi], symbol)
+                if j == hi or self.child_symbol[j] != symbol:
+                    return None
+                child = self.child_node[j]
+            elif self.text[self.edge_end[child] - self.depth[child] + matched_len] != symbol:
+                # we are on an edge
+                return None
+            matched_len += 1
+            if matched_len == self.depth[child]:
+                return child, matched_len, None
+            return node, matched_len, child
+
+        def found (state):
+            node, matched_len, child = state
+            node = node if child is None else child
+            return int (self.leaf_hi[node] - self.leaf_lo[node]), \
+                self.leaf_positions[self.leaf_lo[node]:self.leaf_hi[node]]
+
+        return QueryTrie (motifs).walk ((0, 0, None), step, found,
+                                        (0, self.leaf_positions[:0]))
+
+    def find_all (self, motif):
+        """
+        Return the number of times a motif occurs as a substring and the
+        offset of each match, starting at 1 as in the :class:`Tree`.
+        """
+
+        counts, positions = self.find_motifs (motif)
+        return counts, positions + 1
+
+    def __len__ (self):
+        """ The number of nodes. """
+        return len (self.depth)
+
+
+class NodeRef (object):
+    """A handle on a node of a :class:`CompactTree` under construction.
+
+    Exposes the interface of the node objects used by the builders.  Handles
+    are created on the fly, so they are compared with ``==``.
+    """
+
+    __slots__ = ('tree', 'i')
+
+    def __init__ (self, tree, i):
+        self.tree = tree
+        self.i    = i
+
+    def __eq__ (self, other):
+        return isinstance (other, NodeRef) and self.i == other.i and self.tree is other.tree
+
+    def __ne__ (self, other):
+        return not self == other
+
+    def __hash__ (self):
+        return hash (self.i)
+
+    def _node (self, i):
+        return None if i < 0 else NodeRef (self.tree, i)
+
+    @property
+    def parent (self):
+        return self._node (self.tree._parent[self.i])
+
+    @parent.setter
+    def parent (self, node):
+        self.tree._parent[self.i] = -1 if node is None else node.i
+
+    @property
+    def suffix_link (self):
+        return self._node (self.tree._link[self.i])
+
+    @suffix_link.setter
+    def suffix_link (self, node):
+        self.tree._link[self.i] = -1 if node is None else node.i
+
+    @property
+    def path (self):
+        tree = self.tree
+        return Path (tree.strings[tree._string[self.i]], tree._start[self.i], tree._end[self.i])
+
+    @property
+    def children (self):
+        return _Children (self)
+
+    def __len__ (self):
+        """ We define the length of a node as its string depth. """
+        end = self.tree._end[self.i]
+        return (end if end != Path.inf else Path.e) - self.tree._start[self.i]
+
+    def is_leaf (self):
+        return bool (self.tree._leaf[self.i])
+
+    def is_internal (self):
+        return not self.tree._leaf[self.i]
+
+    def split_edge (self, new_len, child):
+        """Split edge
+
+        Split self --> child into self --> new_node --> child and return the new node.
+        new_len is the string-depth of the new node.
+
+        """
+        p1 = self.path
+        p2 = child.path
+        assert len (p1) < new_len < len (p2), "split length %d->%d->%d" % (
+            len (p1), new_len, len (p2))
+        edge_start = p2.start + len (p1)
+        edge_end   = p2.start + new_len
+        # it is always safe to shorten a path
+        new_node = self.tree.new_internal (self, Path (p2.S, p2.start, edge_end))
+
+        self.children[p2.S[edge_start]] = new_node     # substitute new node
+        new_node.children [p2.S[edge_end  ]] = child
+        child.parent = new_node
+
+        return new_node
+
+    def __str__ (self):
+        return str (self.path)
+
+
+class _Children (object):
+    """ The children of a node under construction, as a mapping. """
+
+    __slots__ = ('node',)
+
+    def __init__ (self, node):
+        self.node = node
+
+    def get (self, symbol, default = None):
+        i = self.node.tree._children.get ((self.node.i, symbol))
+        return default if i is None else NodeRef (self.node.tree, i)
+
+    def __getitem__ (self, symbol):
+        return NodeRef (self.node.tree, self.node.tree._children[(self.node.i, symbol)])
+
+    def __setitem__ (self, symbol, node):
+        self.node.tree._children[(self.node.i, symbol)] = node.i
+
+    def __contains__ (self, symbol):
+        return (self.node.i, symbol) in self.node.tree._children
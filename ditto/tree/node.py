@@ -35,6 +35,12 @@ class Node (lca_mixin.Node):
 
         """
 
+        self.leaf_lo = 0
+        self.leaf_hi = 0
+        """ Interval of the leaves of the subtree in depth-first order. See
+        Tree.index_leaves.
+        """
+
         self.is_left_diverse = None
         r"""A node :math:`v` of :math:`\mathcal{T}` is called *left diverse* if at least
         two leaves in :math:`v`'s subtree have different left characters.  By
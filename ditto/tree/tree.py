@@ -8,10 +8,12 @@ A Generalized Suffix Tree
 import collections
 import itertools
 
+import numpy as np
+
 from . import ukkonen
 from . import lca_mixin
-from .node import Internal
-from .util import Path, UniqueEndChar, is_debug
+from .node import Internal, Leaf
+from .util import Path, QueryTrie, UniqueEndChar, is_debug
 
 
 class Tree (lca_mixin.Tree):
@@ -59,6 +61,9 @@ class Tree (lca_mixin.Tree):
 
         self.root = Internal(None, Path(tuple(), 0, 0), name='root')
 
+        # Offsets of the leaves in depth-first order, see index_leaves
+        self.leaf_positions = None
+
         for id_, S in d.items():
             self.add(id_, S, builder)
 
@@ -84,6 +89,7 @@ class Tree (lca_mixin.Tree):
         path = Path.from_iterable(itertools.chain(S, [UniqueEndChar(id_)]))
 
         self.builder = builder(self, id_, path)
+        self.leaf_positions = None
 
         try:
             self.builder.build()
@@ -93,6 +99,28 @@ class Tree (lca_mixin.Tree):
                     tmp.write(self.to_dot())
             raise
 
+    def new_leaf(self, parent, str_id, path):
+        """ Create a leaf, used by the builders. """
+        return Leaf(parent, str_id, path)
+
+    def new_internal(self, parent, path, **kw):
+        """ Create an internal node, used by the builders. """
+        return Internal(parent, path, **kw)
+
+    def fixup_e(self, M):
+        """ Turn the open end :math:`e` of the leaves into the constant M. """
+
+        def f(node):
+            """ helper """
+            if node.is_leaf():
+                # Turn the variable :math:`e` into a constant because
+                # the next string added will use :math:`e` again.
+                # pylint: disable=protected-access
+                if node.path._end == Path.inf:
+                    node.path._end = M
+
+        self.root.pre_order(f)
+
     def find_path(self, path):
         """Find a path in the tree.
 
@@ -117,73 +145,128 @@ class Tree (lca_mixin.Tree):
         dummy_node, matched_len, dummy_child = self.find_path(path)
         return matched_len == len(path)
 
+    def index_leaves(self):
+        """
+        ***** Added *****
+        Number the leaves in depth-first order.
+
+        Stores the offset of each leaf in its string in leaf_positions,
+        in depth-first order, and the interval [leaf_lo, leaf_hi) of 
+        the leaves below each node, so that the leaves of a subtree are 
+        a slice of leaf_positions.
+
+        Called by find_all after the tree has been built or modified.
+        """
+
+        positions = []
+        stack = [(self.root, False)]
+
+        while stack:
+            node, visited = stack.pop()
+
+            if visited:
+                # All the leaves below the node have been numbered
+                node.leaf_hi = len(positions)
+                continue
+
+            node.leaf_lo = len(positions)
+
+            if node.is_leaf():
+                positions.append(node.path.start)
+                node.leaf_hi = len(positions)
+
+            else:
+                # Visit the children in order after the node
+                stack.append((node, True))
+                stack.extend((child, False)
+                             for child in reversed(list(node.children.values())))
+
+        self.leaf_positions = np.array(positions, dtype=np.int64)
+        self.leaf_positions.flags.writeable = False
+
     def find_all(self, s):
         """
         ***** Modified *****
         Return the number of times a string s occurs as a substring 
-        and return the offset of each match.
+        and return the offset of each match, starting at 1.
+
+        The offsets are read from the leaf interval of the node below
+        the match, see index_leaves.
         """
 
-        def leaf_finder(node, counts, offsets):
-            """
-            Recursive function to find all the leaves starting from a node.
-            Return the number of leaves and their offset.
-            """
+        counts, positions = self.find_motifs(s)
 
-            for key in node.children:
-                child = node.children[key]
+        return counts, positions + 1
 
-                if child.is_leaf():
-                    counts += 1
-                    offsets.append(str(child).split(':')[1])
+    def find_motifs(self, motif):
+        """
+        Finds the number of times a motif is repeated in a tree or generalized tree. 
+        Returns the counts and the offset of the matches, starting at 0.
 
-                else:
-                    counts, offsets = leaf_finder(child, counts, offsets)
+        The offsets are a read-only slice of leaf_positions, in depth-first 
+        order.
+        """
 
-            return counts, offsets
+        if self.leaf_positions is None:
+            self.index_leaves()
 
-        path = Path.from_iterable(s)
+        path = Path.from_iterable(motif)
         node, matched_len, child = self.find_path(path)
 
+        # We fell off the tree: zero occurrence of the motif
+        if matched_len < len(path):
+            return 0, self.leaf_positions[:0]
+
         # Node and child refer the nodes above and below an edge:
-        # if the string lands on a node, then node=string and child=None
+        # if the motif lands on a node, then node=motif and child=None
+        if child is not None:
+            node = child
 
-        counts = 0
-        offsets = []
+        return node.leaf_hi - node.leaf_lo, \
+            self.leaf_positions[node.leaf_lo:node.leaf_hi]
 
-        # We fell off the tree: zero occurrence of the string
-        if matched_len < len(path):
-            return counts, offsets
+    def find_motifs_batch(self, motifs):
+        """
+        ***** Added *****
+        Same as find_motifs for many motifs at once. The motifs are 
+        gathered in a QueryTrie, so that the traversal of their common 
+        prefixes in the tree is shared.
 
-        if child == None:
-            # We are on an internal node
-            return leaf_finder(node, counts, offsets)
+        Returns a list of (counts, offsets) in the order of the motifs.
+        """
 
-        elif child.is_leaf():
-            # If we are on a leaf, it is trivial
-            counts += 1
-            offsets.append(str(child).split(':')[1])
-            return counts, offsets
+        if self.leaf_positions is None:
+            self.index_leaves()
 
-        else:
-            # We are on an edge
-            return leaf_finder(child, counts, offsets)
+        def step(state, symbol):
+            """ Extend the match of a prefix by one symbol. """
 
-    def find_motifs(self, motif):
-        """
-        Finds the number of times a motif is repeated in a tree or generalized tree. 
-        Returns the counts and the offset of the matches.
+            node, matched_len, child = state
 
-        Similar to find_all function but the positions of the
-        motif are corrected.
-        """
+            if child is None:
+                # We are on a node, find the edge to follow
+                child = node.children.get(symbol)
+                if child is None:
+                    return None
+
+            elif child.path.S[child.path.start + matched_len] != symbol:
+                # We are on an edge
+                return None
+
+            matched_len += 1
+            if matched_len == len(child):
+                return child, matched_len, None
 
-        counts, positions = self.find_all(motif)
+            return node, matched_len, child
 
-        # Convert to int and start indexing at 0
-        positions = [int(s)-1 for s in positions]
+        def found(state):
+            node, matched_len, child = state
+            node = node if child is None else child
+            return node.leaf_hi - node.leaf_lo, \
+                self.leaf_positions[node.leaf_lo:node.leaf_hi]
 
-        return counts, positions
+        return QueryTrie(motifs).walk((self.root, 0, None), step, found,
+                                      (0, self.leaf_positions[:0]))
 
     def find_id(self, id_, iterable):
         """ Return True if string is found with corresponding id
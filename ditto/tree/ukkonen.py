@@ -28,7 +28,6 @@ https://stackoverflow.com/questions/9452701/
 """
 
 from .util import Path, debug, debug_dot
-from .node import Internal, Leaf
 from . import builder
 
 class Builder (builder.Builder):
@@ -54,7 +53,7 @@ class Builder (builder.Builder):
         assert s.is_internal ()
         assert k >= 0
 
-        if s is self.aux:
+        if s == self.aux:
             # simulates line 2. from *Algorithm 2*.
             return self.root, Path (self.path.S, 0, 1)
 
@@ -96,7 +95,7 @@ class Builder (builder.Builder):
             debug ('SPLIT! return False, new node "%s"', r)
             return False, r
         else:
-            if s is self.aux:
+            if s == self.aux:
                 debug ('not split 2 return True, node "%s"', s)
                 return True, s
             if t in s.children:
@@ -175,11 +174,11 @@ class Builder (builder.Builder):
         while not is_end_point:
             start = path.p - len (r)
 
-            r_prime = Leaf (r, self.id, Path (self.path.S, start, Path.inf))
+            r_prime = self.tree.new_leaf (r, self.id, Path (self.path.S, start, Path.inf))
             debug ('adding leaf "%s"', str (r_prime))
             r.children[t_i] = r_prime
 
-            if oldr is not self.root:
+            if oldr != self.root:
                 oldr.suffix_link = r
             oldr = r
 
@@ -192,7 +191,7 @@ class Builder (builder.Builder):
             s, act_path = self.canonize (s.suffix_link, act_path)
             is_end_point, r = self.test_and_split (s, act_path, t_i)
 
-        if oldr is not self.root:
+        if oldr != self.root:
             oldr.suffix_link = s
 
         self.debug_dot (act_path.k, act_path.p)
@@ -212,7 +211,7 @@ class Builder (builder.Builder):
         debug ('string "%s"', self.path)
 
         # create the auxiliary node only needed for Ukkonen's algorithm
-        aux = Internal (None, Path (tuple (), 0, 0), name = 'aux')
+        aux = self.tree.new_internal (None, Path (tuple (), 0, 0), name = 'aux')
         self.root.parent      = aux
         self.root.suffix_link = aux
         self.aux              = aux
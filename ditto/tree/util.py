@@ -180,3 +180,56 @@ class Path (object):
     def ukko_str (self):
         """ Debug path in Ukkonen's notation """
         return 'k=%d p=%d k..p="%s"' % (self.k, self.p, self)
+
+
+class QueryTrie (object):
+    """A trie of query motifs, to look them up in a single walk.
+
+    Each motif is a path from the root of the trie, and the motifs sharing a
+    prefix share the corresponding trie nodes.  Walking the trie depth-first
+    alongside an index only matches each common prefix once.
+
+    >>> trie = QueryTrie ([[0, 1], [0, 1, 2], [3]])
+    >>> sorted (trie.root)
+    [0, 3]
+    """
+
+    def __init__ (self, motifs):
+        self.n_motifs = len (motifs)
+        self.root = {}
+        """ symbol => subtrie, the motifs ending at a node are listed under None """
+
+        for i, motif in enumerate (motifs):
+            node = self.root
+            for symbol in motif:
+                node = node.setdefault (symbol, {})
+            node.setdefault (None, []).append (i)
+
+    def walk (self, state, step, found, missing):
+        """Walk the trie alongside an index.
+
+        :param state: the state of the index for the empty prefix
+        :param step: a function (state, symbol) => state of the index for the
+                     prefix extended by symbol, or None if it does not occur
+        :param found: a function state => result for the motifs ending there
+        :param missing: the result of the motifs that do not occur
+
+        Returns the results in the order of the motifs.
+        """
+
+        results = [missing] * self.n_motifs
+
+        stack = [(self.root, state)]
+        while stack:
+            node, state = stack.pop ()
+            for symbol, child in node.items ():
+                if symbol is None:
+                    result = found (state)
+                    for i in child:
+                        results[i] = result
+                    continue
+                child_state = step (state, symbol)
+                if child_state is not None:
+                    stack.append ((child, child_state))
+
+        return results
@@ -1,12 +1,16 @@
 
+from .classes.pattern import Pattern
 from .prune import prune
 
+from collections import Counter
+
 import numpy as np
+import heapq
 
 
-def variations(MDL, CT, pattern, candidates=[], candidates_usage=[]):
+def variations(MDL, CT, pattern, max_depth=None, budget=None, evaluator=None):
     """
-    Recursively test whether to add variations of the accepted pattern in the CT.
+    Test whether to add variations of the accepted pattern in the CT.
 
     That is, when a pattern leads to a gain in compression, we consider all ways by which
     we can extend it using events that occur in the gaps of its usages. This way we
@@ -16,168 +20,60 @@ def variations(MDL, CT, pattern, candidates=[], candidates_usage=[]):
     For example, consider the dataset {a, b, a, b, c, a, c, a} where pattern {a, a} occurs
     twice with a gap of length one. After adding pattern {a, a} to CT we consider the
     patterns {a, b, a} and {a, c, a} for addition to CT.
+
+    The variants are kept in a worklist, most frequent first. When a variant is added
+    to the CT, its own variants join the worklist, and the counts of the variants
+    found from several patterns are summed. A variant is only evaluated again once
+    the CT has changed.
+
+    max_depth = if not None, the variants of variants are only explored up to 
+    max_depth levels, the variants of the accepted pattern being the first level.
+    budget = if not None, maximum number of variants evaluated.
+    evaluator = if not None, SpeculativeEvaluator used to prune the CT 
+    after a variant is added, see prune().
     """
 
-    print(f'\tVariations on pattern = {pattern}')
+    # Worklist of (-count, insertion number, variant), see _push()
+    worklist = []
+    counts = {}
 
-    # If the length of the pattern is 1, we can't compute variations
-    if pattern.t == 1:
-        print('No variations: pattern size is 1.')
-        return
+    # Insertion number and depth of each variant
+    entries = {}
 
-    # If the length of the pattern is >= 5 we stop creating variants (UNJUSTIFIED CAP FOR NOW)
-    if len(pattern.symbols) >= 5:
-        print('Pattern has >= 5 symbols, we do not allow more variations.')
-        return
-
-    #################
-    # Find variants #
-    #################
-
-    else:
-
-        # Find the occurrences in the cover of all symbols in the pattern
-        occurrences = np.where(np.char.startswith(
-            MDL.C, str(pattern.id), start=0, end=1)
-        )
-
-        # print('Occurrences position OG =', occurrences)
-
-        # Reorder the positions (right now it's ordered row by row)
-        array1, array2 = occurrences[0], occurrences[1]
-        sort_index = np.argsort(array2)
-        array1 = array1[sort_index]
-        array2 = array2[sort_index]
-
-        # Regroup occurrences together so that each group contains the position of all of the
-        # symbols of a single pattern
-        occurrences = [(array1[i:i+len(pattern.symbols)], array2[i:i+len(pattern.symbols)])
-                       for i in range(0, len(occurrences[0]), len(pattern.symbols))]
-        # print('\nRegrouped occurrences', occurrences)
-
-        # For each pattern in the cover
-        for occurrence in occurrences:
-            # print('\nPositions of the symbols in the cover =', occurrence)
-
-            # Find the limits of the positions of the symbols
-            min_row = np.min(occurrence[0])
-            max_row = np.max(occurrence[0])
-            min_col = np.min(occurrence[1])
-            max_col = np.max(occurrence[1])
-            # print(f'Start = {min_col}, End = {max_col}')
-
-            # Check if the pattern contains a gap
-            # There are two cases :
-            #   - If the symbols of the pattern are all on the same line, the formula is easy
-            #   - If the symbols are not on the same line, it's more complicated
-            gap = True
-            # First case
-            if max_row-min_row == 0:
-                if (max_col-min_col+1) == pattern.t:
-                    gap = False
-                    # print('No Gap')
-                    continue
-            # Second case
-            else:
-                if np.all(np.unique(occurrence[1]) == np.arange(min_col, max_col+1)):
-                    gap = False
-                    # print('No Gap')
-                elif (max_col-min_col+1) == pattern.t:
-                    # Not sure if this condition is truly useful, it might be included in the former
-                    gap = False
-                    # print('No Gap')
-                else:
-                    pass
-                    # print('Gap')
-
-            # If there is a gap, create a variation, otherwise we move on
-            if gap:
-                # Define the subset of C that contains the pattern
-                C_cut = MDL.C[min_row:max_row+1, min_col:max_col+1]
-                # print('C_cut =\n', C_cut)
-
-                # Gap symbols are contained in the columns where there are no pattern symbol
-                row_diff = [
-                    j-i for i, j in zip(occurrence[1][:-1], occurrence[1][1:])]
-                gap_symbols = []
-                c_cut_col_count = 0
-                occurrence_col_count = 0
-                for i_diff in row_diff:
-                    if i_diff == 1:
-                        c_cut_col_count += 1
-                    if i_diff == 2:
-                        c_cut_id = c_cut_col_count + 1
-                        gap_symbols += [(C_cut[:, c_cut_id][symb], occurrence_col_count+1, row)
-                                        for row, symb in enumerate(range(len(C_cut[:, c_cut_id])))]
-                        c_cut_col_count = 0
-                    occurrence_col_count += 1
-                # print('Gap symbols =', gap_symbols)
-
-                # Here, if two patterns are intertwined, this could result in problems.
-                # For instance if a pattern ends after the start of another, then their
-                # occurrences will be regrouped differently leading to one of the pattern
-                # being badly cut in C_cut
-                # We solve this issue rather lazily: if there is an issue, we just move on
-                if len(gap_symbols) == 0:
-                    print('Two successive patterns are intertwined, we move on.')
-                    continue
-
-                # Gap symbols are saved in gap_symbols as a list of sets
-                # (gap_symbol, column in occurrence[1], row in c_cut)
-                # We must create a new variant with each gap symbol
-                for symbol in gap_symbols:
-                    # Variant is start of the pattern + gap symbol + end of pattern
-                    variant = pattern[:2*len(occurrence[1][:symbol[1]])] +\
-                        symbol[0][-1] + str(np.min(occurrence[0])+symbol[2]) +\
-                        pattern[2*len(occurrence[1][:symbol[1]]):]
-                    # print('Original pattern =', pattern,
-                    #       '; Variant created =', variant)
-
-                    # Check if the variant already exists in the candidate array
-                    if variant in candidates:
-                        # We update the usage of this variant
-                        candidates_usage[candidates == variant] += 1
-                    else:
-                        # We add it to the array
-                        # print("Variant added!")
-                        candidates.append(variant)
-                        candidates_usage.append(1)
-
-            else:
-                continue
-
-    #####################################
-
-    # Now we have a (new or updated) set of candidate variants
-    # print('\nSet of candidate variants =', candidates)
-    # print('with the following usages =', candidates_usage)
-
-    if candidates == []:
-        print('No variants of this pattern in the data.')
-        return
+    # Variants evaluated since the last change of the CT, and added to it
+    evaluated, accepted = set(), set()
 
-    ########################
-    # Order the candidates #
-    ########################
+    def _push(variants, depth):
+        for variant, count in variants.items():
+            counts[variant] = counts.get(variant, 0) + count
 
-    i_order = np.argsort(candidates_usage)[::-1]
-    candidates = [candidates[i] for i in i_order]
-    candidates_usage = [candidates_usage[i] for i in i_order]
-    # print('After ordering, variants =', candidates)
-    # print('with usages =', candidates_usage)
+            # A variant found again at a lower depth keeps the lowest one
+            number, old_depth = entries.get(variant, (len(entries), depth))
+            entries[variant] = (number, min(old_depth, depth))
 
-    ##################
-    # Encoded length #
-    ##################
+            heapq.heappush(worklist, (-counts[variant], number, variant))
+
+    _push(_variants(MDL, pattern), 1)
 
     # We don't re-compute the initial length everytime if the CT did not change
     CT.has_changed = True
 
-    # Iterate over each variant
-    for i_variant, variant in enumerate(candidates):
+    n_evaluated = 0
+    while worklist and (budget is None or n_evaluated < budget):
+
+        # Entries of a variant which count has changed since are outdated
+        count, _, symbols = heapq.heappop(worklist)
+        if (-count != counts[symbols]) or (symbols in evaluated) or \
+                (symbols in accepted):
+            continue
+
+        # Variants are stored as tuples of symbol codes
+        variant = Pattern(symbols, CT.vocabulary)
 
         # MDL computations
         MDL.compare(CT, variant)
+        evaluated.add(symbols)
+        n_evaluated += 1
 
         # If this variant decreases the encoded lengt we add it to the CT
         if MDL.is_beneficial:
@@ -185,10 +81,82 @@ def variations(MDL, CT, pattern, candidates=[], candidates_usage=[]):
             print(f'{variant} is a good variant, it will be added to the CT.')
 
             # Prune CT
-            prune(CT, MDL)
+            prune(CT, MDL, evaluator)
+            CT.has_changed = True
+            evaluated.clear()
+            accepted.add(symbols)
 
-            # Recursively use the variation algorithm
-            variations(MDL, CT, variant, candidates[i_variant+1:],
-                       candidates_usage[i_variant+1:])
+            # Explore the variations of the variant
+            depth = entries[symbols][1]
+            if (max_depth is None) or (depth < max_depth):
+                _push(_variants(MDL, variant), depth + 1)
 
     return
+
+
+def _variants(MDL, pattern):
+    """
+    Counter of the variants of a pattern in the current cover.
+    """
+
+    print(f'\tVariations on pattern = {pattern}')
+
+    # If the length of the pattern is 1, we can't compute variations
+    if pattern.t == 1:
+        print('No variations: pattern size is 1.')
+        return Counter()
+
+    # If the length of the pattern is >= 5 we stop creating variants (UNJUSTIFIED CAP FOR NOW)
+    if len(pattern.symbols) >= 5:
+        print('Pattern has >= 5 symbols, we do not allow more variations.')
+        return Counter()
+
+    variants = _gap_variants(MDL.cover, pattern)
+    if not variants:
+        print('No variants of this pattern in the data.')
+
+    return variants
+
+
+def _gap_variants(cover, pattern):
+    """
+    Variants of a pattern with one of the symbols found in its gaps.
+
+    The occurrences of the pattern are taken from the cover, see the 
+    Occurrences class, as arrays of shape (occurrences x symbols) with 
+    the symbols in pattern order, i.e. with sorted columns. An 
+    occurrence has a gap if its columns are not contiguous and it spans 
+    more than pattern.t columns. Each gap of one column between the 
+    symbols k and k+1 gives a variant per row spanned by the pattern: 
+    the symbol of D in that row and column inserted after the k-th 
+    symbol.
+
+    The gap cells of all occurrences are gathered at once. Returns a 
+    Counter of the variants, as tuples of symbol codes, in order of 
+    first occurrence.
+    """
+
+    occurrences = cover.occurrences(pattern)
+    cols = occurrences.cols
+
+    # Occurrences with a gap
+    steps = np.diff(cols, axis=1)
+    n_cols = 1 + np.count_nonzero(steps, axis=1)
+    gap = (n_cols != occurrences.gaps + pattern.t) & (occurrences.gaps != 0)
+
+    # Gaps of one column between two consecutive symbols
+    i_occurrence, k = np.nonzero((steps == 2) & gap[:, None])
+
+    # One gap cell per row spanned by the pattern
+    rows = np.arange(pattern.channels.min(), pattern.channels.max() + 1)
+    row = np.tile(rows, len(k))
+    col = np.repeat(cols[i_occurrence, k] + 1, len(rows))
+    position = np.repeat(k + 1, len(rows))
+
+    # Count the (position, symbol) pairs, then the variants they give
+    counts = Counter(zip(position.tolist(), cover.D[row, col].tolist()))
+    variants = Counter()
+    for (i, symbol), count in counts.items():
+        variants[tuple(np.insert(pattern.symbols, i, symbol).tolist())] += count
+
+    return variants
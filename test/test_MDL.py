@@ -0,0 +1,100 @@
+from ditto import Ditto
+from ditto.classes.index import SymbolIndex
+from ditto.cover import Cover
+
+from test_cover import _database, _random_patterns
+
+import numpy as np
+import copy
+
+
+def _lengths(ST, CT):
+    """
+    Encoded lengths L(D|CT) and L(CT|D) of a covered CT, computed
+    pattern by pattern.
+    """
+
+    L_code, L_gap, L_pattern_code, L_pattern = 0, 0, 0, 0
+    S = np.sum(CT.usage)
+
+    for pattern in CT.patterns:
+
+        if pattern.usage > 0:
+            L_code += -pattern.usage*np.log10(pattern.usage/S)
+            L_pattern_code += -np.log10(pattern.usage/S)
+            L_pattern += -np.sum(np.log10(ST.usage[pattern.symbols]/ST.usage_sum))
+
+        if pattern.gaps > 0:
+            L_gap += -pattern.gaps*np.log10(
+                pattern.gaps/(pattern.gaps + pattern.fills))
+
+    return L_code + L_gap, L_pattern_code + L_pattern
+
+
+def _trial_lengths(ditto, candidate, removed=False):
+    """
+    Lengths of the CT of ditto with a candidate added, or removed, from
+    a cover from scratch.
+    """
+
+    CT, candidate = copy.deepcopy((ditto.CT, candidate))
+    if removed:
+        CT.remove_candidate(CT[candidate.id])
+    else:
+        CT.add_candidate(candidate)
+    Cover(ditto.D, SymbolIndex.from_database(ditto.D, len(CT.vocabulary))).cover(CT)
+
+    return _lengths(ditto.ST, CT)
+
+
+def test_running_sums_match_lengths():
+    """
+    The lengths of the trials and of the CT kept as running sums are
+    the lengths computed from scratch.
+    """
+
+    rng = np.random.default_rng(4)
+
+    for _ in range(5):
+
+        ditto = Ditto(_database(rng, 3, 60))
+        for pattern in _random_patterns(rng, ditto.vocabulary, 4):
+            ditto.CT.add_candidate(pattern)
+
+        for _ in range(20):
+
+            larger = [pattern for pattern in ditto.CT.patterns if len(pattern) > 1]
+
+            if larger and rng.random() < 0.4:
+                pattern = larger[rng.integers(len(larger))]
+                expected = _trial_lengths(ditto, pattern, removed=True)
+                ditto.MDL.prune(ditto.CT, pattern,
+                                np.zeros(len(ditto.CT.patterns)), np.arange(0))
+
+            else:
+                pattern = _random_patterns(rng, ditto.vocabulary, 1)[0]
+                expected = _trial_lengths(ditto, pattern)
+                ditto.MDL.compare(ditto.CT, pattern)
+
+            np.testing.assert_allclose((ditto.MDL.L_D, ditto.MDL.L_CT), expected)
+            np.testing.assert_allclose(
+                (ditto.MDL.lengths.L_D, ditto.MDL.lengths.L_CT),
+                _lengths(ditto.ST, ditto.CT))
+
+
+def test_pattern_stream_without_gaps():
+    """
+    L(D|CT) encodes the pattern stream when no pattern has gaps.
+    """
+
+    ditto = Ditto(np.array([list('abccca'), list('dhehed')]))
+    ditto.MDL.lengths.reset(ditto.CT)
+
+    assert not np.any(ditto.CT.gaps)
+    usage = ditto.CT.usage[ditto.CT.usage > 0]
+    np.testing.assert_allclose(
+        ditto.MDL.lengths.L_D, -np.sum(usage*np.log10(usage/np.sum(usage))))
+    np.testing.assert_allclose(
+        (ditto.MDL.lengths.L_D, ditto.MDL.lengths.L_CT),
+        _lengths(ditto.ST, ditto.CT))
+    assert ditto.MDL.lengths.L_D > 0
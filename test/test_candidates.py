@@ -0,0 +1,184 @@
+from ditto import Ditto
+from ditto.classes.candidates import Candidates
+from ditto.classes.index import CoOccurrences
+from ditto.cover import Cover
+
+from test_cover import _database, _random_patterns
+
+import numpy as np
+import copy
+
+
+def _gain(ST, CT, X, Y):
+    """
+    Estimated gain of the candidate X U Y, computed for this pair only.
+    """
+
+    symbols = np.concatenate([X.symbols, Y.symbols])
+    if (len(symbols) > 5) or (X.usage == 0) or (Y.usage == 0):
+        return np.inf
+
+    x, y, s = X.usage, Y.usage, np.sum(CT.usage)
+    cost = -np.sum(np.log10(ST.usage[symbols]/ST.usage_sum))
+
+    if x == y:
+        z = x/2
+        return x*np.log10(x/s) + y*np.log10(y/s) - z*np.log10(z/(s-x+z)) \
+            + np.log10(x/s) + np.log10(y/s) - np.log10(z/(s-x+z)) + cost
+
+    z = min(x, y)
+    delta_xy = max(x, y) - z
+    return x*np.log10(x/s) + y*np.log10(y/s) \
+        - delta_xy*np.log10(delta_xy/(s-z)) - z*np.log10(z/(s-z)) \
+        + np.log10(x/s) + np.log10(y/s) \
+        - np.log10(delta_xy/(s-z)) - np.log10(z/(s-z)) + cost
+
+
+def _covered_ditto(rng, n_patterns=6):
+    """
+    Ditto object with random patterns in its CT, covered.
+    """
+
+    ditto = Ditto(_database(rng, 3, 60))
+    for pattern in _random_patterns(rng, ditto.vocabulary, n_patterns):
+        ditto.CT.add_candidate(pattern)
+    ditto.cover.cover(ditto.CT)
+
+    return ditto
+
+
+def test_estimated_gain_matches_pairs():
+    """
+    The grid of estimated gains holds the gain of each pair of patterns
+    of the CT.
+    """
+
+    rng = np.random.default_rng(5)
+
+    for _ in range(5):
+
+        ditto = _covered_ditto(rng)
+        candidates = Candidates(ditto.ST, ditto.CT)
+
+        expected = [_gain(ditto.ST, ditto.CT, X, Y)
+                    for X in ditto.CT.patterns for Y in ditto.CT.patterns]
+        np.testing.assert_allclose(candidates.estimated_gain, expected)
+
+
+def test_stream_matches_sort():
+    """
+    The candidates come in the order of a full sort of the grid by
+    estimated gain, ties broken by position, whatever the block size.
+    """
+
+    rng = np.random.default_rng(6)
+
+    for block_size in [1, 4, 64]:
+
+        ditto = _covered_ditto(rng)
+        candidates = Candidates(ditto.ST, ditto.CT)
+        candidates.block_size = block_size
+
+        gain = candidates.estimated_gain
+        order = np.lexsort((np.arange(len(gain)), gain))
+        order = order[gain[order] < np.inf]
+
+        streamed = list(candidates)
+        assert len(streamed) == len(order) == len(candidates)
+
+        P = len(ditto.CT.patterns)
+        for candidate, index in zip(streamed, order):
+            X, Y = ditto.CT.patterns[index // P], ditto.CT.patterns[index % P]
+            np.testing.assert_array_equal(
+                candidate.symbols, np.concatenate([X.symbols, Y.symbols]))
+            assert candidate.gain == gain[index]
+
+
+def test_update_matches_new_candidates():
+    """
+    The candidates updated after the CT changed are those built from
+    scratch for the new CT.
+    """
+
+    rng = np.random.default_rng(7)
+    ditto = _covered_ditto(rng)
+    candidates = Candidates(ditto.ST, ditto.CT)
+
+    for _ in range(10):
+
+        larger = [pattern for pattern in ditto.CT.patterns if len(pattern) > 1]
+        ditto.CT.remove_candidate(larger[rng.integers(len(larger))])
+        for pattern in _random_patterns(rng, ditto.vocabulary, 2):
+            ditto.CT.add_candidate(pattern)
+        ditto.cover.cover(ditto.CT)
+
+        candidates.update(ditto.CT)
+        expected = Candidates(ditto.ST, ditto.CT)
+
+        np.testing.assert_array_equal(candidates.estimated_gain,
+                                      expected.estimated_gain)
+        assert [c.name for c in candidates] == [c.name for c in expected]
+
+
+def test_stream_max_gain():
+    """
+    With a max_gain, the stream is the head of the full stream that
+    stops before the first estimated gain above max_gain, and the
+    candidates left out are counted.
+    """
+
+    rng = np.random.default_rng(8)
+
+    for _ in range(5):
+
+        ditto = _covered_ditto(rng)
+        candidates = Candidates(ditto.ST, ditto.CT)
+        streamed = [(c.name, c.gain) for c in candidates.stream()]
+        assert candidates.skipped == 0
+
+        max_gain = np.median([gain for _, gain in streamed])
+        bounded = [(c.name, c.gain) for c in candidates.stream(max_gain)]
+
+        assert bounded == [(name, gain) for name, gain in streamed
+                           if gain <= max_gain]
+        assert bounded == streamed[:len(bounded)]
+        assert candidates.skipped == len(streamed) - len(bounded) > 0
+
+
+def test_support_filter_drops_unused_candidates():
+    """
+    The candidates dropped by the co-occurrence filter are those of the
+    full stream which are not used when added to the CT, and the filter
+    is kept across updates.
+    """
+
+    rng = np.random.default_rng(9)
+    dropped = 0
+
+    for _ in range(5):
+
+        ditto = _covered_ditto(rng)
+        candidates = Candidates(ditto.ST, ditto.CT)
+        filtered = Candidates(ditto.ST, ditto.CT, CoOccurrences(ditto.index))
+
+        for _ in range(2):
+
+            kept = {c.name for c in filtered}
+            for candidate in candidates:
+                if candidate.name not in kept:
+                    CT = copy.deepcopy(ditto.CT)
+                    CT.add_candidate(candidate)
+                    Cover(ditto.D, ditto.index).cover(CT)
+                    assert CT.patterns[-1].name == candidate.name
+                    assert CT.patterns[-1].usage == 0
+                    dropped += 1
+
+            assert kept <= {c.name for c in candidates}
+
+            # Update both after a change of the CT
+            ditto.CT.add_candidate(_random_patterns(rng, ditto.vocabulary, 1)[0])
+            ditto.cover.cover(ditto.CT)
+            candidates.update(ditto.CT)
+            filtered.update(ditto.CT)
+
+    assert dropped > 0
@@ -0,0 +1,275 @@
+from ditto import Ditto, StreamingDitto, WindowedDitto
+from ditto.classes.index import SymbolIndex
+from ditto.classes.pattern import Pattern
+from ditto.classes.vocabulary import Vocabulary
+from ditto.cover import Cover
+
+import numpy as np
+import copy
+
+
+def _database(rng, N, n, period=5):
+    """
+    Random database of N time series of length n over the alphabet
+    'abcd', with two motifs planted every period columns.
+    """
+
+    D = rng.choice(list('abcd'), size=(N, n))
+    for start in range(0, n-4, period):
+        draw = rng.random()
+        if draw < 0.5:
+            D[0, start], D[0, start+2], D[1, start+1] = 'a', 'b', 'c'
+        elif draw < 0.8:
+            D[0, start], D[0, start+1], D[-1, start+3] = 'a', 'b', 'd'
+
+    return D
+
+
+def _random_patterns(rng, vocabulary, n_patterns):
+    """
+    Random patterns of 2 to 4 symbols.
+    """
+
+    return [Pattern(rng.integers(0, len(vocabulary), size=rng.integers(2, 5)),
+                    vocabulary) for _ in range(n_patterns)]
+
+
+def test_planes_match_patterns():
+    """
+    Each cell of the planes is covered by the symbol of its pattern
+    given by C_index, and each symbol of a pattern covers usage cells.
+    """
+
+    rng = np.random.default_rng(0)
+
+    for _ in range(10):
+
+        ditto = Ditto(_database(rng, 3, 60))
+        for pattern in _random_patterns(rng, ditto.vocabulary, 5):
+            ditto.CT.add_candidate(pattern)
+        ditto.cover.cover(ditto.CT)
+
+        C, C_index = ditto.cover.C, ditto.cover.C_index
+        assert np.all(C >= 0)
+
+        for pattern in ditto.CT.patterns:
+            for k, symbol in enumerate(pattern.symbols):
+                cells = (C == pattern.id) & (C_index == k)
+                assert np.count_nonzero(cells) == pattern.usage
+                assert np.all(ditto.D[cells] == symbol)
+                assert np.all(np.nonzero(cells)[0] == pattern.channels[k])
+
+
+def _loop_prune(C, pattern_pos, pattern):
+    """
+    Occurrences of a pattern in lexicographic order, built with nested
+    loops over the positions of its symbols.
+    """
+
+    occurrences = [[]]
+    for k, (row, positions) in enumerate(pattern_pos):
+        occurrences = [
+            occurrence + [position]
+            for occurrence in occurrences for position in positions
+            if (C[row, position] < 0)
+            and ((k == 0) or ((position >= occurrence[-1]) and
+                              (position - occurrence[0] + 1 < 2*pattern.t)))
+            and not any((pattern.channels[j] == row) and (occurrence[j] == position)
+                        for j in range(k))
+        ]
+
+    return occurrences
+
+
+def test_prune_occurrences_matches_loops():
+    """
+    The join of _prune_occurrences gives the occurrences of the nested
+    loops, in the same order.
+    """
+
+    rng = np.random.default_rng(3)
+
+    for _ in range(30):
+
+        D = rng.choice(list('ab'), size=(2, 25))
+        vocabulary, codes = Vocabulary.from_database(D)
+        C = np.where(rng.random(D.shape) < 0.2, 0, -1).astype(np.int32)
+
+        for pattern in _random_patterns(rng, vocabulary, 5):
+            pattern_pos = [(row, np.flatnonzero(codes[row] == symbol))
+                           for row, symbol in zip(pattern.channels, pattern.symbols)]
+
+            pruned_pos = Cover._prune_occurrences(C, pattern_pos, pattern)
+
+            assert pruned_pos.tolist() == _loop_prune(C, pattern_pos, pattern)
+
+
+def test_overlapping_occurrences_leftmost_first():
+    """
+    Among overlapping occurrences, the cover keeps the leftmost one.
+    """
+
+    ditto = Ditto(np.array([list('bcaaab'), list('cccccc')]))
+    a, c = ditto.vocabulary.encode(0, 'a'), ditto.vocabulary.encode(1, 'c')
+    ditto.CT.add_candidate(Pattern([a, a], ditto.vocabulary))
+    ditto.CT.add_candidate(Pattern([a, c], ditto.vocabulary))
+    ditto.cover.cover(ditto.CT)
+
+    np.testing.assert_array_equal(ditto.cover.C[0], [1, 2, 4, 4, 5, 1])
+    np.testing.assert_array_equal(ditto.cover.C_index[0], [0, 0, 0, 1, 0, 0])
+
+
+def _state(cover, CT):
+    """
+    Planes of a cover, usage, gaps and fills of the patterns of a CT and
+    the cells of their occurrences in the store.
+    """
+
+    cells = [cover.occurrences(pattern).cells(cover.size[1]).ravel()
+             for pattern in CT.patterns if len(pattern) > 1]
+
+    return cover.C, cover.C_index, np.stack([CT.usage, CT.gaps, CT.fills]), \
+        np.concatenate([np.zeros(0, dtype=np.intp)] + cells)
+
+
+def _from_scratch(D, CT):
+    """
+    State of a cover of D from scratch, see _state(). The CT is copied
+    so that its patterns are left untouched.
+    """
+
+    CT = copy.deepcopy(CT)
+    cover = Cover(D, SymbolIndex.from_database(D, len(CT.vocabulary)))
+    cover.cover(CT)
+
+    return _state(cover, CT)
+
+
+def _assert_same(state, other):
+    for array, other_array in zip(state, other):
+        np.testing.assert_array_equal(array, other_array)
+
+
+def test_update_matches_cover():
+    """
+    Incremental updates with a pattern added or removed, then rolled
+    back or committed, give the same cover as a cover from scratch.
+    """
+
+    rng = np.random.default_rng(0)
+
+    for _ in range(10):
+
+        ditto = Ditto(_database(rng, 3, 60))
+        cover, CT = ditto.cover, ditto.CT
+        cover.cover(CT)
+
+        for _ in range(15):
+
+            before = _state(cover, CT)
+            larger = [pattern for pattern in CT.patterns if len(pattern) > 1]
+
+            if larger and rng.random() < 0.4:
+                pattern = larger[rng.integers(len(larger))]
+                view = CT.without_pattern(pattern)
+            else:
+                pattern = _random_patterns(rng, ditto.vocabulary, 1)[0]
+                view = CT.with_candidate(pattern)
+
+            cover.update(view)
+            _assert_same(_state(cover, view), _from_scratch(ditto.D, view))
+
+            if rng.random() < 0.5:
+                cover.rollback()
+                _assert_same(_state(cover, CT), before)
+
+            else:
+                if view.added is not None:
+                    CT.add_candidate(pattern)
+                else:
+                    CT.remove_candidate(pattern)
+                cover.commit(CT)
+                _assert_same(_state(cover, CT), _from_scratch(ditto.D, CT))
+
+
+def test_occurrences_match_planes():
+    """
+    The occurrences in the store cover the cells of their pattern in
+    the planes, sorted by start column, with the gaps of the pattern.
+    """
+
+    rng = np.random.default_rng(1)
+
+    for _ in range(10):
+
+        ditto = Ditto(_database(rng, 3, 60))
+        for pattern in _random_patterns(rng, ditto.vocabulary, 5):
+            ditto.CT.add_candidate(pattern)
+        ditto.cover.cover(ditto.CT)
+        C, C_index = ditto.cover.C, ditto.cover.C_index
+
+        for pattern in ditto.CT.patterns:
+
+            occurrences = ditto.cover.occurrences(pattern)
+            rows, cols = occurrences.rows, occurrences.cols
+
+            assert len(occurrences) == pattern.usage
+            assert np.all(np.diff(occurrences.start) > 0)
+            assert np.all(ditto.D[rows, cols] == pattern.symbols)
+
+            if len(pattern) > 1:
+                assert np.all(C[rows, cols] == pattern.id)
+                assert np.all(C_index[rows, cols] == np.arange(len(pattern)))
+                assert np.count_nonzero(C == pattern.id) == rows.size
+                assert np.sum(occurrences.gaps) == pattern.gaps
+
+
+def test_extend_matches_cover():
+    """
+    The cover extended to new columns is the same as a cover from
+    scratch of the extended database.
+    """
+
+    rng = np.random.default_rng(1)
+
+    for _ in range(3):
+
+        D = _database(rng, 3, 400)
+        ditto = StreamingDitto(D[:, :150], drift=np.inf)
+        ditto.process()
+
+        start = 150
+        for k in [1, 7, 30, 62, 150]:
+            ditto.append(D[:, start:start+k])
+            start += k
+
+            np.testing.assert_array_equal(
+                ditto.D, ditto.vocabulary.encode_database(D[:, :start]))
+            _assert_same(_state(ditto.cover, ditto.CT),
+                         _from_scratch(ditto.D, ditto.CT))
+
+
+def test_evict_matches_cover():
+    """
+    The cover of a window after its first columns were evicted is the
+    same as a cover from scratch of the window.
+    """
+
+    rng = np.random.default_rng(2)
+
+    for slack in [0, None]:
+
+        D = _database(rng, 3, 800)
+        ditto = WindowedDitto(D[:, :300], window=200, slack=slack, drift=np.inf)
+        ditto.process()
+
+        start = 300
+        for k in [1, 5, 17, 40, 80, 3, 120, 60, 33]:
+            ditto.append(D[:, start:start+k])
+            start += k
+
+            np.testing.assert_array_equal(
+                ditto.D,
+                ditto.vocabulary.encode_database(D[:, start-ditto.size[1]:start]))
+            _assert_same(_state(ditto.cover, ditto.CT),
+                         _from_scratch(ditto.D, ditto.CT))
@@ -0,0 +1,119 @@
+from ditto import Ditto
+from ditto.classes.index import SymbolIndex, CoOccurrences
+from ditto.classes.vocabulary import Vocabulary
+
+import numpy as np
+
+
+def _codes(rng, N, n, n_values=4):
+    """
+    Encoded random database of N time series of length n.
+    """
+
+    vocabulary, codes = Vocabulary.from_database(
+        rng.choice(list('abcdef'[:n_values]), size=(N, n)))
+
+    return vocabulary, codes
+
+
+def _assert_positions(index, codes):
+    """
+    The index gives the sorted columns of each code.
+    """
+
+    assert len(index) == codes.max() + 1
+    for code in range(len(index)):
+        np.testing.assert_array_equal(index[code],
+                                      np.nonzero(codes == code)[1])
+
+
+def test_index_positions():
+    """
+    The positions of each code in the index are its columns in the
+    database.
+    """
+
+    rng = np.random.default_rng(0)
+
+    for N, n in [(1, 1), (3, 50), (5, 200)]:
+        _, codes = _codes(rng, N, n)
+        _assert_positions(SymbolIndex.from_database(codes, codes.max() + 1),
+                          codes)
+
+
+def test_tree_built_on_access():
+    """
+    The suffix tree is only built when it is read.
+    """
+
+    D = np.random.default_rng(1).choice(list('abc'), size=(2, 20))
+    ditto = Ditto(D)
+    assert ditto._tree is None
+
+    counts, positions = ditto.tree.find_motifs([ditto.D[0, 3]])
+    assert ditto._tree is not None
+    assert 3 in positions
+
+
+def _support(D, d, c1, c2):
+    """
+    Number of cells of c1 with c2 in some time series at most d columns
+    after it, the cell itself excluded, counted cell by cell.
+    """
+
+    support = 0
+    for row, a in zip(*np.nonzero(D == c1)):
+        window = D[:, a:a+d+1] == c2
+        window[row, 0] = False
+        support += np.any(window)
+
+    return support
+
+
+def test_cooccurrences_match_brute_force():
+    """
+    The support computed from the index is the one counted cell by
+    cell, whatever the chunk size.
+    """
+
+    rng = np.random.default_rng(2)
+
+    for _ in range(20):
+
+        N, n = rng.integers(1, 4), rng.integers(1, 30)
+        vocabulary, codes = _codes(rng, N, n, n_values=3)
+        cooccurrences = CoOccurrences(
+            SymbolIndex.from_database(codes, len(vocabulary)))
+        cooccurrences.chunk_size = rng.integers(1, 20)
+
+        d = rng.integers(0, 9, size=50)
+        c1, c2 = rng.integers(0, len(vocabulary), size=(2, 50))
+
+        assert cooccurrences[d, c1, c2].tolist() == \
+            [_support(codes, *triple) for triple in zip(d, c1, c2)]
+
+
+def test_extend_matches_from_database():
+    """
+    An index extended with new columns is the index of the extended
+    database, and its compact arrays are those of an index from scratch.
+    """
+
+    rng = np.random.default_rng(3)
+    vocabulary, codes = _codes(rng, 3, 300)
+    index = SymbolIndex.from_database(codes[:, :20], len(vocabulary))
+
+    start = 20
+    for k in [1, 1, 5, 40, 3, 100, 130]:
+        index.extend(codes[:, start:start+k], start)
+        start += k
+        _assert_positions(index, codes[:, :start])
+
+        expected = SymbolIndex.from_database(codes[:, :start], len(vocabulary))
+        for name, array in index.to_arrays().items():
+            np.testing.assert_array_equal(array, getattr(expected, name))
+
+        columns = rng.integers(0, start + 2, size=30)
+        np.testing.assert_array_equal(
+            index.following(codes[0, :30], columns),
+            expected.following(codes[0, :30], columns))
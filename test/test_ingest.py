@@ -0,0 +1,71 @@
+from ditto import Ditto
+from ditto.ingest import array_chunks, csv_chunks
+
+import numpy as np
+import pandas as pd
+
+
+def test_array_chunks():
+    """
+    The blocks of an array, e.g. memory-mapped, are its consecutive
+    columns, and a .npy file gives the codes of the array.
+    """
+
+    rng = np.random.default_rng(0)
+    D = rng.choice(list('abcd'), size=(3, 50))
+
+    for chunk_size in [1, 7, 50, 64]:
+        blocks = list(array_chunks(D, chunk_size)())
+        assert all(block.shape[1] <= chunk_size for block in blocks)
+        np.testing.assert_array_equal(np.concatenate(blocks, axis=1), D)
+
+
+def test_npy_file(tmp_path):
+    """
+    A Ditto object built from a .npy file, by blocks, has the codes and
+    vocabulary of the one built from the array.
+    """
+
+    D = np.random.default_rng(1).choice(list('abcd'), size=(3, 50))
+    np.save(tmp_path / 'D.npy', D)
+
+    ditto = Ditto(D)
+    from_file = Ditto(str(tmp_path / 'D.npy'), chunk_size=7)
+
+    np.testing.assert_array_equal(from_file.D, ditto.D)
+    assert from_file.vocabulary.values.tolist() == ditto.vocabulary.values.tolist()
+
+
+def test_csv_chunks(tmp_path):
+    """
+    The blocks of a CSV file are its rows as time series of strings,
+    without the column 't', even if pandas would infer a different type
+    for some blocks.
+    """
+
+    # Digits only in the first rows, then letters
+    frame = pd.DataFrame({'t': np.arange(12),
+                          'x': list('123412341234'),
+                          'y': list('1212') + list('abcabcab')})
+    frame.to_csv(tmp_path / 'D.csv', index=False)
+
+    for chunk_size in [1, 4, 5, 20]:
+        blocks = list(csv_chunks(tmp_path / 'D.csv', chunk_size)())
+        np.testing.assert_array_equal(np.concatenate(blocks, axis=1),
+                                      frame[['x', 'y']].to_numpy().T)
+
+    ditto = Ditto(str(tmp_path / 'D.csv'), chunk_size=4)
+    expected = Ditto(frame[['x', 'y']].to_numpy().T)
+
+    np.testing.assert_array_equal(ditto.D, expected.D)
+    assert ditto.vocabulary.values.tolist() == expected.vocabulary.values.tolist()
+
+
+def test_list_of_strings():
+    """
+    Strings of the same length are split into characters.
+    """
+
+    D = ['abcab', 'cabba']
+    np.testing.assert_array_equal(Ditto(D).D,
+                                  Ditto(np.array([list(s) for s in D])).D)
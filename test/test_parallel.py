@@ -0,0 +1,84 @@
+from ditto import Ditto
+from ditto.classes.candidates import Candidates
+from ditto.parallel import SpeculativeEvaluator
+from ditto.prune import prune
+
+from test_cover import _database, _random_patterns
+
+import numpy as np
+import copy
+
+
+def _results(D, n_jobs):
+    """
+    Patterns of the final CT of Ditto on D, with their usage.
+    """
+
+    ditto = Ditto(D)
+    ditto.process(n_jobs=n_jobs)
+
+    return [(pattern.name, len(pattern), pattern.usage)
+            for pattern in ditto.CT.patterns]
+
+
+def test_parallel_matches_serial(capsys):
+    """
+    The speculative evaluation in a process pool accepts the same
+    candidates as the serial algorithm.
+    """
+
+    rng = np.random.default_rng(8)
+    accepted = 0
+
+    for _ in range(3):
+
+        D = _database(rng, 3, 80)
+        serial = _results(D, 1)
+        serial_output = capsys.readouterr().out
+
+        assert _results(D, 2) == serial
+        assert capsys.readouterr().out == serial_output
+        accepted += sum(size > 1 for _, size, _ in serial)
+
+    assert accepted > 0
+
+
+def test_parallel_prune_matches_serial(capsys):
+    """
+    The removals evaluated in a process pool leave the same CT as the
+    serial pruning.
+    """
+
+    rng = np.random.default_rng(9)
+    removed = 0
+
+    for _ in range(5):
+
+        ditto = Ditto(_database(rng, 3, 80))
+        for pattern in _random_patterns(rng, ditto.vocabulary, 8):
+            ditto.CT.add_candidate(pattern)
+        ditto.cover.cover(ditto.CT)
+        ditto.MDL.lengths.reset(ditto.CT)
+
+        # Accept a pattern so that the usage of others decreases
+        for candidate in Candidates(ditto.ST, ditto.CT):
+            ditto.MDL.compare(ditto.CT, candidate)
+            if ditto.MDL.is_beneficial:
+                break
+
+        serial, parallel = copy.deepcopy(ditto), copy.deepcopy(ditto)
+        prune(serial.CT, serial.MDL)
+
+        evaluator = SpeculativeEvaluator(parallel.MDL, 2)
+        try:
+            prune(parallel.CT, parallel.MDL, evaluator)
+        finally:
+            evaluator.close()
+
+        assert [p.name for p in parallel.CT.patterns] == \
+            [p.name for p in serial.CT.patterns]
+        np.testing.assert_array_equal(parallel.cover.C, serial.cover.C)
+        removed += len(ditto.CT.patterns) - len(serial.CT.patterns)
+
+    capsys.readouterr()
+    assert removed > 0
@@ -0,0 +1,71 @@
+from ditto import Ditto
+
+from test_cover import _database
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _results(ditto):
+    """
+    Final CT of Ditto with the usage, gaps and fills of its patterns,
+    and the cover.
+    """
+
+    ditto.process()
+
+    return [(pattern.name, pattern.usage, pattern.gaps, pattern.fills)
+            for pattern in ditto.CT.patterns], ditto.cover.C
+
+
+@pytest.mark.parametrize('suffix_index', ['compact_tree', 'suffix_array'])
+def test_save_load_round_trip(tmp_path, capsys, suffix_index):
+    """
+    A loaded Ditto object has the memory-mapped arrays of the saved one,
+    the same suffix structure and gives the same results.
+    """
+
+    rng = np.random.default_rng(10)
+    D = _database(rng, 3, 80)
+
+    ditto = Ditto(D, suffix_index=suffix_index)
+    ditto.save(tmp_path)
+    loaded = Ditto.load(tmp_path)
+
+    assert isinstance(loaded.D, np.memmap)
+    np.testing.assert_array_equal(loaded.D, ditto.D)
+    np.testing.assert_array_equal(loaded.ST.usage, ditto.ST.usage)
+    assert loaded.vocabulary.name(ditto.D[1, 3]) == ditto.vocabulary.name(ditto.D[1, 3])
+
+    motif = ditto.D[0, 10:13]
+    assert loaded.tree.find_motifs(motif)[0] == ditto.tree.find_motifs(motif)[0]
+    if suffix_index == 'suffix_array':
+        np.testing.assert_array_equal(loaded.tree.lcp, ditto.tree.lcp)
+
+    patterns, C = _results(ditto)
+    loaded_patterns, loaded_C = _results(loaded)
+    capsys.readouterr()
+
+    assert loaded_patterns == patterns
+    np.testing.assert_array_equal(loaded_C, C)
+
+
+def test_save_load_dataframe(tmp_path, capsys):
+    """
+    The symbols of a DataFrame, which are Python objects, are saved too.
+    """
+
+    D = _database(np.random.default_rng(11), 3, 60)
+    ditto = Ditto(pd.DataFrame(D.T), suffix_index='suffix_array')
+    ditto.save(tmp_path)
+    loaded = Ditto.load(tmp_path)
+
+    assert list(loaded.vocabulary.values) == list(ditto.vocabulary.values)
+    assert _results(loaded)[0] == _results(ditto)[0]
+    capsys.readouterr()
+
+
+def test_tree_can_not_be_saved(tmp_path):
+    with pytest.raises(ValueError):
+        Ditto(_database(np.random.default_rng(12), 2, 20)).save(tmp_path)
@@ -0,0 +1,107 @@
+from ditto import StreamingDitto, WindowedDitto
+
+from test_cover import _database, _state, _from_scratch, _assert_same
+
+import numpy as np
+import warnings
+
+
+def test_append_after_load(tmp_path, capsys):
+    """
+    A loaded stream keeps growing: the appended columns are encoded and
+    covered as with a cover from scratch, and it can search again.
+    """
+
+    D = _database(np.random.default_rng(13), 3, 300)
+
+    ditto = StreamingDitto(D[:, :150], suffix_index='suffix_array')
+    ditto.process()
+    ditto.append(D[:, 150:200])
+    ditto.save(tmp_path)
+
+    loaded = StreamingDitto.load(tmp_path, drift=np.inf)
+    start = 200
+    for k in [1, 30, 69]:
+        assert not loaded.append(D[:, start:start+k])
+        start += k
+
+        np.testing.assert_array_equal(
+            loaded.D, loaded.vocabulary.encode_database(D[:, :start]))
+        _assert_same(_state(loaded.cover, loaded.CT),
+                     _from_scratch(loaded.D, loaded.CT))
+
+    loaded.process()
+    capsys.readouterr()
+    assert any(len(pattern) > 1 for pattern in loaded.CT.patterns)
+
+
+def test_append_runs_search_on_drift(capsys):
+    """
+    The candidate search is run again after an append only when the
+    compression ratio drifted by more than drift.
+    """
+
+    D = _database(np.random.default_rng(14), 3, 300)
+
+    for drift, searched in [(np.inf, False), (0, True)]:
+
+        ditto = StreamingDitto(D[:, :100], drift=drift)
+        assert not ditto.append(D[:, 100:150])
+
+        ditto.process()
+        assert ditto.append(D[:, 150:300]) == searched
+        if searched:
+            assert ditto.ratio == ditto.compression_ratio()
+
+    capsys.readouterr()
+
+
+def test_window_after_load(tmp_path, capsys):
+    """
+    A window loaded from a saved stream only keeps its last columns and
+    slides over the next ones.
+    """
+
+    D = _database(np.random.default_rng(15), 3, 400)
+
+    ditto = StreamingDitto(D[:, :200], suffix_index='suffix_array')
+    ditto.process()
+    ditto.save(tmp_path)
+    capsys.readouterr()
+
+    window = WindowedDitto.load(tmp_path, window=100, slack=20, drift=np.inf)
+    assert window.size[1] == 100
+
+    start = 200
+    for k in [15, 15, 15, 60]:
+        window.append(D[:, start:start+k])
+        start += k
+
+        assert 100 <= window.size[1] <= 120
+        np.testing.assert_array_equal(
+            window.D,
+            window.vocabulary.encode_database(D[:, start-window.size[1]:start]))
+        _assert_same(_state(window.cover, window.CT),
+                     _from_scratch(window.D, window.CT))
+
+
+def test_evicted_symbols_without_warnings(capsys):
+    """
+    Symbols which only occur in the evicted columns have no usage left,
+    which neither warns nor breaks the search.
+    """
+
+    D = _database(np.random.default_rng(16), 3, 300)
+    D[:, :20] = 'e'
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+
+        ditto = WindowedDitto(D[:, :100], window=60, drift=0)
+        ditto.process()
+        ditto.append(D[:, 100:300])
+
+    capsys.readouterr()
+    e = [ditto.vocabulary.encode(channel, 'e') for channel in range(3)]
+    assert np.all(ditto.ST.usage[e] == 0)
+    assert np.all(np.isfinite([ditto.MDL.lengths.L_D, ditto.MDL.lengths.L_CT]))
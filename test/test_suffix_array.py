@@ -0,0 +1,63 @@
+from ditto.classes.suffix_array import SuffixArray
+from ditto.tree import Tree
+
+import numpy as np
+
+
+def _common_prefix(a, b):
+    """
+    Length of the longest common prefix of two lists.
+    """
+
+    length = 0
+    while (length < min(len(a), len(b))) and (a[length] == b[length]):
+        length += 1
+
+    return length
+
+
+def test_suffix_array_matches_sort():
+    """
+    The suffix array, ranks and LCP array are those of a plain sort of
+    the suffixes of the joined text.
+    """
+
+    rng = np.random.default_rng(0)
+
+    for _ in range(100):
+
+        N, n = rng.integers(1, 4), rng.integers(0, 25)
+        index = SuffixArray.from_database(
+            rng.integers(0, rng.integers(1, 4), size=(N, n)))
+
+        text = index.text.tolist()
+        order = sorted(range(len(text)), key=lambda i: text[i:])
+
+        assert index.sa.tolist() == order
+        assert index.rank[order].tolist() == list(range(len(text)))
+        assert index.lcp.tolist() == [0] + [
+            _common_prefix(text[i:], text[j:]) for i, j in zip(order, order[1:])]
+
+
+def test_find_motifs_matches_tree():
+    """
+    The counts and offsets of the motifs are those of the generalized
+    suffix tree.
+    """
+
+    rng = np.random.default_rng(1)
+
+    for _ in range(50):
+
+        N, n = rng.integers(1, 4), rng.integers(1, 25)
+        D = rng.integers(0, 3, size=(N, n))
+        index = SuffixArray.from_database(D)
+        tree = Tree({f'S{i}': time_series.tolist()
+                     for i, time_series in enumerate(D)})
+
+        for motif in rng.integers(0, 3, size=(10, 3)):
+            for m in range(1, 4):
+                counts, positions = index.find_motifs(motif[:m])
+                expected_counts, expected = tree.find_motifs(motif[:m].tolist())
+                assert counts == expected_counts
+                assert positions.tolist() == sorted(expected)
@@ -0,0 +1,118 @@
+from ditto.classes.suffix_array import SuffixArray
+from ditto.tree import Tree, CompactTree
+
+import numpy as np
+
+
+def _occurrences(D, motif):
+    """
+    Offsets of the matches of a motif in the time series of D, found
+    by a scan of every offset.
+    """
+
+    m = len(motif)
+
+    return sorted(start for time_series in D.tolist()
+                  for start in range(len(time_series) - m + 1)
+                  if time_series[start:start+m] == list(motif))
+
+
+def _trees(rng, N, n, n_values=3):
+    """
+    Pointer and array-backed generalized suffix trees of the same
+    random database.
+    """
+
+    D = rng.integers(0, n_values, size=(N, n))
+    strings = {f'S{i}': time_series.tolist() for i, time_series in enumerate(D)}
+
+    return Tree(strings), CompactTree(strings)
+
+
+def test_compact_tree_matches_tree():
+    """
+    The array-backed tree finds the same motifs, with the same counts
+    and offsets, as the pointer tree.
+    """
+
+    rng = np.random.default_rng(0)
+
+    for _ in range(50):
+
+        tree, compact = _trees(rng, rng.integers(1, 4), rng.integers(1, 25))
+
+        for motif in rng.integers(0, 4, size=(10, 4)):
+            for m in range(1, 5):
+
+                assert compact.find(motif[:m]) == tree.find(motif[:m].tolist())
+
+                counts, positions = compact.find_motifs(motif[:m])
+                expected_counts, expected = tree.find_motifs(motif[:m].tolist())
+                assert counts == expected_counts
+                assert sorted(positions.tolist()) == sorted(expected)
+
+
+def test_find_motifs_matches_scan():
+    """
+    The leaf intervals give the offsets of every match in both trees,
+    also after a string is added to the tree.
+    """
+
+    rng = np.random.default_rng(1)
+
+    for _ in range(30):
+
+        N, n = rng.integers(1, 4), rng.integers(1, 25)
+        D = rng.integers(0, 3, size=(N, n))
+        strings = {f'S{i}': time_series.tolist() for i, time_series in enumerate(D)}
+        tree, compact = Tree(strings), CompactTree(strings)
+
+        for motif in rng.integers(0, 3, size=(10, 3)):
+            for m in range(1, 4):
+
+                counts, positions = tree.find_motifs(motif[:m].tolist())
+                assert counts == len(positions)
+                assert not positions.flags.writeable
+                assert sorted(positions.tolist()) == _occurrences(D, motif[:m])
+                assert sorted(compact.find_motifs(motif[:m])[1].tolist()) == \
+                    sorted(positions.tolist())
+                assert tree.find_all(motif[:m].tolist())[1].tolist() == \
+                    (positions + 1).tolist()
+
+        # The leaf intervals are computed again after add()
+        extra = rng.integers(0, 3, size=(1, n))
+        tree.add(f'S{N}', extra[0].tolist())
+        D = np.concatenate([D, extra])
+        for motif in rng.integers(0, 3, size=(5, 2)):
+            assert sorted(tree.find_motifs(motif.tolist())[1].tolist()) == \
+                _occurrences(D, motif)
+
+
+def test_find_motifs_batch_matches_find_motifs():
+    """
+    The batch lookup gives the result of find_motifs for each motif,
+    in order, for the trees and the suffix array.
+    """
+
+    rng = np.random.default_rng(2)
+
+    for _ in range(30):
+
+        N, n = rng.integers(1, 4), rng.integers(1, 25)
+        D = rng.integers(0, 3, size=(N, n))
+        strings = {f'S{i}': time_series.tolist() for i, time_series in enumerate(D)}
+
+        # Motifs sharing prefixes, repeated, and the empty motif
+        motifs = [motif[:m].tolist() for motif in rng.integers(0, 4, size=(10, 4))
+                  for m in rng.integers(1, 5, size=2)]
+        motifs += motifs[:3] + [[]]
+
+        for index in [Tree(strings), CompactTree(strings),
+                      SuffixArray.from_database(D)]:
+            results = index.find_motifs_batch(motifs)
+            assert len(results) == len(motifs)
+            for motif, (counts, positions) in zip(motifs, results):
+                expected_counts, expected = index.find_motifs(motif)
+                assert counts == expected_counts
+                assert sorted(np.asarray(positions).tolist()) == \
+                    sorted(np.asarray(expected).tolist())
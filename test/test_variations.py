@@ -0,0 +1,159 @@
+from ditto import Ditto
+from ditto.classes.pattern import Pattern
+from ditto.variations import variations, _gap_variants
+import ditto.variations as variations_module
+
+from test_cover import _database, _random_patterns
+
+from collections import Counter
+
+import numpy as np
+
+
+def _loop_variants(cover, pattern):
+    """
+    Variants of a pattern with one of the symbols found in its gaps,
+    built occurrence by occurrence.
+    """
+
+    occurrences = cover.occurrences(pattern)
+    variants = Counter()
+
+    for occurrence_rows, occurrence_cols in zip(occurrences.rows.tolist(),
+                                                occurrences.cols.tolist()):
+
+        span = max(occurrence_cols) - min(occurrence_cols) + 1
+        if (len(set(occurrence_cols)) == span) or (span == pattern.t):
+            continue
+
+        for k in range(len(pattern) - 1):
+            if occurrence_cols[k+1] - occurrence_cols[k] == 2:
+                for row in range(min(occurrence_rows), max(occurrence_rows) + 1):
+                    symbols = list(pattern.symbols)
+                    symbols.insert(k+1, cover.D[row, occurrence_cols[k] + 1])
+                    variants[tuple(symbols)] += 1
+
+    return variants
+
+
+def test_gap_variants():
+    """
+    The symbols in the gaps of the occurrences of a pattern are
+    inserted at the position of their gap.
+    """
+
+    ditto = Ditto(np.array([list('abaxaca'), list('xxxxxxx')]))
+    a, b, c = [ditto.vocabulary.encode(0, value) for value in 'abc']
+    ditto.CT.add_candidate(Pattern([a, a], ditto.vocabulary))
+    ditto.cover.cover(ditto.CT)
+
+    assert _gap_variants(ditto.cover, ditto.CT.patterns[-1]) == \
+        Counter({(a, b, a): 1, (a, c, a): 1})
+
+    # Each gap of an occurrence is read in its own column
+    ditto = Ditto(np.array([list('abaca'), list('xxxxx')]))
+    a, b, c = [ditto.vocabulary.encode(0, value) for value in 'abc']
+    ditto.CT.add_candidate(Pattern([a, a, a], ditto.vocabulary))
+    ditto.cover.cover(ditto.CT)
+
+    assert _gap_variants(ditto.cover, ditto.CT.patterns[-1]) == \
+        Counter({(a, b, a, a): 1, (a, a, c, a): 1})
+
+
+def test_gap_variants_match_loops():
+    """
+    The gap cells gathered at once give the variants, and counts, of a
+    loop over the occurrences.
+    """
+
+    rng = np.random.default_rng(0)
+    n_variants = 0
+
+    for _ in range(20):
+
+        ditto = Ditto(_database(rng, 3, 60))
+        for pattern in _random_patterns(rng, ditto.vocabulary, 5):
+            ditto.CT.add_candidate(pattern)
+        ditto.cover.cover(ditto.CT)
+
+        for pattern in ditto.CT.patterns:
+            if len(pattern) > 1:
+                variants = _gap_variants(ditto.cover, pattern)
+                assert variants == _loop_variants(ditto.cover, pattern)
+                n_variants += len(variants)
+
+    assert n_variants > 0
+
+
+class _MDL:
+    """
+    MDL stand-in that accepts a fixed set of variants.
+    """
+
+    def __init__(self, beneficial):
+        self.beneficial = beneficial
+        self.compared = []
+        self.cover = None
+
+    def compare(self, CT, candidate):
+        self.compared.append(tuple(candidate.symbols.tolist()))
+        self.is_beneficial = self.compared[-1] in self.beneficial
+
+
+def _explore(monkeypatch, found, beneficial, **kwargs):
+    """
+    Run variations() with the variants of each pattern given by found
+    and the variants of beneficial accepted. Returns the variants
+    evaluated, in order, and the patterns whose variants were looked up.
+    """
+
+    ditto = Ditto(np.array([list('abcdefgh'), list('abcdefgh')]))
+    looked_up = []
+
+    def _variants(MDL, pattern):
+        looked_up.append(tuple(pattern.symbols.tolist()))
+        return Counter(found.get(looked_up[-1], {}))
+
+    monkeypatch.setattr(variations_module, '_variants', _variants)
+    monkeypatch.setattr(variations_module, 'prune', lambda CT, MDL, evaluator: None)
+
+    MDL = _MDL(beneficial)
+    variations(MDL, ditto.CT, Pattern([0, 1], ditto.vocabulary), **kwargs)
+
+    return MDL.compared, looked_up
+
+
+def test_variation_budget(monkeypatch):
+    """
+    At most budget variants are evaluated, most frequent first.
+    """
+
+    found = {(0, 1): {(0, 2): 1, (0, 3): 3, (0, 4): 2}}
+
+    assert _explore(monkeypatch, found, set())[0] == [(0, 3), (0, 4), (0, 2)]
+    assert _explore(monkeypatch, found, set(), budget=2)[0] == [(0, 3), (0, 4)]
+
+
+def test_variation_depth(monkeypatch):
+    """
+    The variants of variants are explored up to max_depth levels. A
+    variant found at several depths keeps the lowest one.
+    """
+
+    A, B, A2, C, D = (0, 2), (0, 3), (0, 4), (0, 5), (0, 6)
+    found = {(0, 1): {A: 10, B: 8}, A: {A2: 9}, A2: {C: 1}, B: {C: 1}, C: {D: 1}}
+    beneficial = {A, B, A2, C}
+
+    # C is first found at depth 3 from A2, then at depth 2 from B, so
+    # its own variants are at depth 3
+    compared, looked_up = _explore(monkeypatch, found, beneficial, max_depth=3)
+    assert compared == [A, A2, B, C, D]
+    assert looked_up == [(0, 1), A, A2, B, C]
+
+    compared, looked_up = _explore(monkeypatch, found, beneficial, max_depth=2)
+    assert compared == [A, A2, B, C]
+    assert looked_up == [(0, 1), A, B]
+
+    compared, looked_up = _explore(monkeypatch, found, beneficial, max_depth=1)
+    assert compared == [A, B]
+    assert looked_up == [(0, 1)]
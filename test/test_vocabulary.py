@@ -0,0 +1,46 @@
+from ditto.classes.vocabulary import Vocabulary
+from ditto.classes.pattern import Pattern
+
+import numpy as np
+
+
+def test_encode_round_trip():
+    """
+    The codes of an encoded database give back its symbols and channels,
+    and encode() gives back the code of each cell.
+    """
+
+    rng = np.random.default_rng(0)
+    D = np.stack([rng.choice(list(alphabet), size=50)
+                  for alphabet in ['abc', 'xy', 'abcdef']])
+
+    vocabulary, codes = Vocabulary.from_database(D)
+
+    np.testing.assert_array_equal(vocabulary.values[codes], D)
+    np.testing.assert_array_equal(vocabulary.channels[codes],
+                                  np.repeat(np.arange(3)[:, None], 50, axis=1))
+    for (channel, column), code in np.ndenumerate(codes):
+        assert vocabulary.encode(channel, D[channel, column]) == code
+
+    # Codes are contiguous per channel and sorted by value
+    assert len(vocabulary) == 2 + 3 + 6
+    assert list(vocabulary.offsets) == [0, 3, 5, 11]
+    assert list(vocabulary.values[:3]) == ['a', 'b', 'c']
+
+
+def test_names():
+    """
+    Names are 'symbol' + 'channel' for single letters, and separated
+    otherwise so that they can not be mistaken for one another.
+    """
+
+    D = np.array([['a', 'b'], ['b', 'c']])
+    vocabulary, codes = Vocabulary.from_database(D)
+    assert Pattern(codes[:, 0], vocabulary).name == 'a0b1'
+
+    D = np.full((11, 2), '1', dtype='<U2')
+    D[0] = ['1', '11']
+    vocabulary, codes = Vocabulary.from_database(D)
+    names = {Pattern([codes[0, 1], codes[10, 0]], vocabulary).name,
+             Pattern([codes[0, 0], codes[10, 0]], vocabulary).name}
+    assert names == {'11_0 1_10', '1_0 1_10'}